@@ -1,78 +1,181 @@
 import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from src.path import DataPaths
-from src.merge import merge_dataframe_rows
+from src.merge import select_parquet_engine
+from src.optimize import optimized_merge
+from src.profiling import AggregationProfiler
+from src.planner import plan_merge
+from src.shards import run_shards
 from src.process_columns import clean_columns
-from tools.save_data import export_dataframe
-
-
-def optimized_merge(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Product-centric optimized merge that consolidates products regardless of vendor.
-
-    Args:
-        df: Input DataFrame
-
-    Returns:
-        DataFrame with merged rows
-    """
-    # Create a product-focused key using only product_title
-    df['product_key'] = df['product_title']
-
-    # Identify duplicate products
-    # keep=False marks all duplicates
-    duplicates_mask = df.duplicated(subset=['product_key'], keep=False)
-
-    # Split the dataframe
-    duplicates_df = df[duplicates_mask].copy()
-    # Use the ~ operator to invert the duplicates_mask
-    unique_df = df[~duplicates_mask].copy()
-
-    # Process duplicates if they exist
-    if len(duplicates_df) > 0:
-        merged_df = merge_dataframe_rows(duplicates_df, key_column='product_key')
-    else:
-        # If no duplicates, use empty DataFrame with same columns
-        merged_df = pd.DataFrame(columns=df.columns)
-
-    # Remove the temporary product_key from all DataFrames before concatenation
-    if 'product_key' in merged_df.columns:
-        merged_df = merged_df.drop(columns=['product_key'])
-    unique_df = unique_df.drop(columns=['product_key'])
-
-    # Combine merged duplicates with unique products
-    final_df = pd.concat([merged_df, unique_df])
-
-    return final_df
-
-
-def main() -> pd.DataFrame:
+from src.extract_identifiers import extract_description_identifiers
+from src.similarity import similarity_merge
+from src.normalization import load_normalization_caches, save_normalization_caches
+from tools.save_data import export_dataframe, add_unspsc_segment, QUERY_PARQUET_LAYOUT, UNSPSC_SEGMENT_COLUMN
+from tools.load_data import load_dataframe
+
+# Seconds between the stack samples of main(profile=True)
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+
+def main(
+        extract_identifiers: bool = False,
+        similarity_threshold: Optional[float] = None,
+        engine: Optional[str] = None,
+        workers: int = 1,
+        arrow_native: bool = False,
+        normalization_cache: bool = False,
+        parquet_layout: str = 'default',
+        lineage: bool = False,
+        dry_run: bool = False,
+        inputs: Optional[str] = None,
+        duplicate_report: bool = False,
+        report_sample: Optional[int] = None,
+        report_csv: bool = False,
+        profile: bool = False
+) -> Optional[pd.DataFrame]:
     """
     Main function to perform deduplication on the dataset using the optimized approach.
 
     This function:
     1. Loads the original data
     2. Cleans the columns using the clean_columns function
-    3. Applies the optimized merge function to deduplicate the data
-    4. Saves the final deduplicated dataset
+    3. Optionally extracts model numbers and years from product_description
+    4. Applies the optimized merge function to deduplicate the data
+    5. Optionally merges the remaining rows with similar product_description text
+    6. Saves the final deduplicated dataset (and optionally its row lineage sidecar)
+
+    Args:
+        extract_identifiers: Add extracted_model_number / extracted_year columns mined from product_description,
+            similarity_merge does not merge rows whose identifiers differ
+        similarity_threshold: If set, merge rows whose description similarity (hashed TF-IDF) reaches it
+        engine: Merge engine used for duplicate groups (see src.merge.MERGE_ENGINES),
+            default: 'arrow' when arrow_native is set, 'groupby' otherwise. With 'duckdb' the
+            parquet file is read, cleaned and merged by src.duckdb_engine.duckdb_merge_parquet
+            unless an option needs the rows in pandas (extract_identifiers, lineage,
+            duplicate_report, profile). 'auto' does the same for a file too large to load
+            (src.merge.select_parquet_engine), otherwise it picks an in-memory engine
+        workers: Number of threads aggregating columns in parallel
+        arrow_native: Load the data with Arrow-backed dtypes and keep nested columns as Arrow lists/structs
+        normalization_cache: Reuse the unspsc parsing cache saved by the previous run
+        parquet_layout: Layout of the final Parquet output:
+            'default': single Snappy file
+            'query': single file sorted by unspsc / product_title, zstd, small row groups (tools.save_data.QUERY_PARQUET_LAYOUT)
+            'partitioned': 'query' layout as a Hive partitioned directory, one folder per top-level unspsc category
+        lineage: Save the RowLineage of the final rows (raw parquet row numbers) next to the final parquet,
+            not available with the 'partitioned' layout
+        dry_run: Only print the plan (group statistics, conflict rate, estimated time and memory,
+            recommended workers / chunk size) computed by src.planner.plan_merge, nothing is merged or saved
+        inputs: Directory or glob of parquet shards to deduplicate together (see src.shards.run_shards)
+            instead of DataPaths.file_parquet_original
+        duplicate_report: Write the duplicates before / after merge reports to DataPaths.duplicate_report_dir
+            (single input file only)
+        report_sample: Limit the duplicate reports to this many merged groups
+        report_csv: Also write the duplicate reports as CSV
+        profile: Profile the aggregation functions of the merge and sample its stacks, the collapsed
+            stacks are saved to DataPaths.profile_dir (single input file only)
 
     Returns:
-        pd.DataFrame: The deduplicated DataFrame
+        pd.DataFrame: The deduplicated DataFrame (None for a dry run)
     """
-    # Load the original data
-    df = pd.read_parquet(DataPaths.file_parquet_original)
-
-    # Clean the columns
-    df = clean_columns(df)
-
-    # Apply the optimized merge
-    result_df = optimized_merge(df)
+    if parquet_layout not in ['default', 'query', 'partitioned']:
+        raise ValueError("parquet_layout must be 'default', 'query' or 'partitioned'")
+    if lineage and parquet_layout == 'partitioned':
+        raise ValueError("lineage rows follow the final file order, use the 'default' or 'query' layout")
+    if inputs is not None and (lineage or dry_run or profile or duplicate_report):
+        raise ValueError("lineage, dry_run, profile and duplicate_report need a single input file")
+
+    if engine is None:
+        engine = 'arrow' if arrow_native else 'groupby'
+
+    # Filled by the merge: engine selection of engine='auto', shard and partition failures of inputs
+    run_report: Dict[str, Any] = {}
+    in_memory_only = extract_identifiers or lineage or duplicate_report or profile
+
+    if dry_run:
+        plan_merge(DataPaths.file_parquet_original, engine=engine, arrow_native=arrow_native)
+        return None
+
+    if normalization_cache:
+        load_normalization_caches()
+
+    if engine == 'auto' and inputs is None and not in_memory_only:
+        # A file too large to load is merged by DuckDB straight from the parquet file
+        selection = select_parquet_engine(DataPaths.file_parquet_original, workers, arrow_native)
+        if selection is not None:
+            run_report['engine_selection'] = selection
+            engine, workers = selection['engine'], selection['workers']
+
+    if inputs is not None:
+        # Shards are cleaned, shuffled by key and merged partition by partition
+        result_df = run_shards(inputs, engine=engine, workers=workers, arrow_native=arrow_native,
+                               extract_identifiers=extract_identifiers, report=run_report)
+        row_lineage = None
+    elif engine == 'duckdb' and not in_memory_only:
+        # Imported here, duckdb is only needed by this engine
+        from src.duckdb_engine import duckdb_merge_parquet
+
+        # DuckDB scans the parquet file itself, the rows are never loaded into pandas
+        result_df = duckdb_merge_parquet(DataPaths.file_parquet_original, threads=workers if workers > 1 else None,
+                                         arrow_native=arrow_native)
+        row_lineage = None
+    else:
+        # Load the original data
+        df = load_dataframe(DataPaths.file_parquet_original, arrow_native=arrow_native)
+
+        # Clean the columns
+        df = clean_columns(df)
+
+        if extract_identifiers:
+            df = extract_description_identifiers(df)
+
+        # Apply the optimized merge
+        profiler = AggregationProfiler(sample_interval=PROFILE_SAMPLE_INTERVAL) if profile else None
+        merged = optimized_merge(
+            df, engine=engine, workers=workers, return_lineage=lineage,
+            report_dir=DataPaths.duplicate_report_dir if duplicate_report else None,
+            report_sample=report_sample, report_csv=report_csv, run_report=run_report, profile=profiler
+        )
+        result_df, row_lineage = merged if lineage else (merged, None)
+        if profiler is not None:
+            profiler.print_summary()
+            profiler.export_collapsed_stacks(DataPaths.profile_dir / 'merge_stacks.txt')
+
+    if 'engine_selection' in run_report:
+        selection = run_report['engine_selection']
+        print(f"Engine auto: {selection['engine']} (workers={selection['workers']}), {selection['reason']}")
+
+    if similarity_threshold is not None:
+        if lineage:
+            result_df, similarity_lineage = similarity_merge(result_df, threshold=similarity_threshold, return_lineage=True)
+            row_lineage = similarity_lineage.compose(row_lineage)
+        else:
+            result_df = similarity_merge(result_df, threshold=similarity_threshold)
+
+    if normalization_cache:
+        save_normalization_caches()
+
+    if parquet_layout == 'query':
+        # Sort here so the lineage can follow the row order of the file
+        sort_order = result_df.reset_index(drop=True).sort_values(
+            QUERY_PARQUET_LAYOUT['sort_by'], kind='stable', na_position='last'
+        ).index.to_numpy()
+        result_df = result_df.iloc[sort_order]
+        row_lineage = row_lineage.take(sort_order) if row_lineage is not None else None
 
     # Export the final data
-    export_dataframe(result_df, DataPaths.parquet_final_dir, 'final_data', file_format='parquet')
+    if parquet_layout == 'query':
+        export_dataframe(result_df, DataPaths.parquet_final_dir, 'final_data', file_format='parquet', **QUERY_PARQUET_LAYOUT)
+    elif parquet_layout == 'partitioned':
+        export_dataframe(add_unspsc_segment(result_df.copy()), DataPaths.parquet_final_dir, 'final_data',
+                         file_format='parquet', partition_cols=[UNSPSC_SEGMENT_COLUMN], **QUERY_PARQUET_LAYOUT)
+    else:
+        export_dataframe(result_df, DataPaths.parquet_final_dir, 'final_data', file_format='parquet')
     export_dataframe(result_df, DataPaths.visualization_final_dir, 'final_data', file_format='csv')
+
+    if lineage:
+        row_lineage.save(DataPaths.lineage_final_dir)
     return result_df
 
 
@@ -0,0 +1,562 @@
+"""
+DuckDB Merge Engine
+------------------------------
+Runs the product-key grouping and the column aggregations of src.merge as one
+SQL query in an in-process DuckDB database, which is vectorized, uses all cores
+and spills to disk when the data does not fit in memory.
+
+Every aggregation function of src.merge has an SQL equivalent in
+DUCKDB_AGGREGATIONS (shortest URL per domain is a window over key and domain,
+eco_friendly conflicts are a HAVING-like flag per group). Groups the SQL can't
+express exactly (URLs urlparse() may rewrite, columns of an unexpected type)
+are aggregated by the Python function, like the fallbacks of the arrow engine.
+
+Merged list columns keep the first occurrence of every element, like
+merge_array_simple. Dictionary columns whose dictionaries don't share one key
+set are merged by merge_arrays_dictionary, DuckDB structs would give every
+dictionary the keys of all the others.
+
+Usage:
+   from src.duckdb_engine import duckdb_merge_parquet
+
+   * Clean and deduplicate a parquet file in DuckDB (same output as src.optimize.optimized_merge)
+   result_df = duckdb_merge_parquet(DataPaths.file_parquet_original, memory_limit='2GB')
+
+   * As a merge engine
+   merged_df = merge_dataframe_rows(df, key_column='product_key', engine='duckdb')
+
+   * Compare with the pandas engine on a parquet file
+   python -m src.duckdb_engine [path/to/file.parquet]
+"""
+
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import duckdb
+
+from src.path import DataPaths
+from src.merge import (
+    merge_unspsc, merge_root_domain, merge_page_url, merge_text_longest, merge_text_shortest,
+    merge_eco_friendly, merge_max_year, merge_first, merge_array_simple, merge_arrays_dictionary,
+    build_aggregation_dict, get_array_aggregation_dict, ValueSeries, CONFLICT_AGGREGATIONS, MERGE_CONFLICT_MESSAGES,
+    shared_key_set, _conflict_info, _error_rows_frame, _log_merge_errors, _NETLOC_PATTERN, _PLAIN_URL_PATTERN
+)
+
+# Row number column added to the source, keeps the row order of every group
+ROW_COLUMN = '__row'
+
+# Characters str.strip() removes (no braces, the pattern goes into str.format templates)
+_STRIP_PATTERN = r'^[\s\v\x1c-\x1f\x85\pZ]+|[\s\v\x1c-\x1f\x85\pZ]+$'
+
+# Macros created on every connection
+DUCKDB_MACROS: List[str] = [
+    # Distinct elements in the order of their first occurrence (NULL included, once)
+    "CREATE TEMP MACRO list_first_distinct(l) AS list_filter(l, (x, i) -> list_position(l, x) = i)",
+]
+
+# SQL aggregate of every aggregation function, {col} is the quoted column and {helper} its row helper column
+DUCKDB_AGGREGATIONS: Dict[Callable[[ValueSeries], Any], str] = {
+    merge_unspsc: (
+        "coalesce(array_to_string(list_sort(list_distinct(list_filter("
+        f"list_transform(flatten(list(string_split({{col}}, ' | '))), part -> regexp_replace(part, '{_STRIP_PATTERN}', '', 'g')), "
+        "part -> part <> '' AND part <> 'nan'))), ' | '), '')"
+    ),
+    merge_root_domain: "coalesce(array_to_string(list_sort(list(DISTINCT {col}) FILTER (WHERE {col} <> '')), ' | '), '')",
+    merge_page_url: "coalesce(string_agg({col}, ' | ' ORDER BY {col}) FILTER (WHERE {helper}), '')",
+    merge_text_longest: f"first({{col}} ORDER BY length({{col}}) DESC, {ROW_COLUMN}) FILTER (WHERE length({{col}}) > 0)",
+    merge_text_shortest: f"first({{col}} ORDER BY length({{col}}), {ROW_COLUMN}) FILTER (WHERE length({{col}}) > 0)",
+    merge_eco_friendly: "CASE WHEN bool_or({col}::BOOLEAN) THEN true WHEN bool_or(NOT {col}::BOOLEAN) THEN false END",
+    merge_max_year: "max({col})",
+    merge_first: f"first({{col}} ORDER BY {ROW_COLUMN})",
+    merge_array_simple: f"list_first_distinct(flatten(list({{col}} ORDER BY {ROW_COLUMN})))",
+    merge_arrays_dictionary: f"list_first_distinct(list_filter(flatten(list({{col}} ORDER BY {ROW_COLUMN})), d -> d IS NOT NULL))",
+}
+
+# Per row helper columns (window expressions over the rows of the groups), {key} is the quoted key column
+DUCKDB_ROW_HELPERS: Dict[Callable[[ValueSeries], Any], str] = {
+    # Shortest URL (earliest row on ties) of every (group, domain)
+    merge_page_url: (
+        f"regexp_extract({{col}}, '{_NETLOC_PATTERN}', 1) <> '' AND row_number() OVER ("
+        f"PARTITION BY {{key}}, regexp_extract({{col}}, '{_NETLOC_PATTERN}', 1) ORDER BY length({{col}}), {ROW_COLUMN}) = 1"
+    ),
+}
+
+# Column types (DuckDB type names) the SQL of an aggregation function is written for
+DUCKDB_COLUMN_TYPES: Dict[Callable[[ValueSeries], Any], Callable[[str], bool]] = {
+    merge_unspsc: lambda column_type: column_type == 'VARCHAR',
+    merge_root_domain: lambda column_type: column_type == 'VARCHAR',
+    merge_page_url: lambda column_type: column_type == 'VARCHAR',
+    merge_text_longest: lambda column_type: column_type == 'VARCHAR',
+    merge_text_shortest: lambda column_type: column_type == 'VARCHAR',
+    merge_eco_friendly: lambda column_type: column_type in ['BOOLEAN', 'INTEGER', 'VARCHAR'],
+    merge_max_year: lambda column_type: not column_type.endswith(']') and not column_type.startswith(('STRUCT', 'MAP')),
+    merge_first: lambda column_type: True,
+    merge_array_simple: lambda column_type: column_type.endswith('[]') and not column_type.startswith(('STRUCT', 'MAP')),
+    merge_arrays_dictionary: lambda column_type: column_type.startswith('STRUCT') and column_type.endswith(')[]'),
+}
+
+# Groups matching the condition are aggregated by the Python function instead
+DUCKDB_PYTHON_FALLBACKS: Dict[Callable[[ValueSeries], Any], str] = {
+    # URLs urlparse() may rewrite, same check as the arrow kernel
+    merge_page_url: f"NOT regexp_matches({{col}}, '{_PLAIN_URL_PATTERN}')",
+}
+
+# SQL conflict checks of the CONFLICT_AGGREGATIONS and the error message they stand for
+DUCKDB_CONFLICT_CHECKS: Dict[Callable[[ValueSeries], Any], Tuple[str, str]] = {
+    merge_eco_friendly: ("bool_or({col}::BOOLEAN) AND bool_or(NOT {col}::BOOLEAN)", 'Different eco_friendly values'),
+}
+
+
+def _quote(name: str) -> str:
+    """Quoted SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _connect(threads: Optional[int] = None, memory_limit: Optional[str] = None,
+             temp_directory: Optional[Union[str, Path]] = None) -> duckdb.DuckDBPyConnection:
+    """
+    In-memory DuckDB connection.
+
+    Parameters:
+        threads: Number of DuckDB threads (default: all cores)
+        memory_limit: DuckDB memory limit, e.g. '2GB' (default: 80% of RAM), larger intermediates spill to disk
+        temp_directory: Where spilled data is written (default: DuckDB's .tmp directory)
+    """
+    config: Dict[str, Any] = {}
+    if threads is not None:
+        config['threads'] = int(threads)
+    if memory_limit is not None:
+        config['memory_limit'] = memory_limit
+    if temp_directory is not None:
+        config['temp_directory'] = Path(temp_directory).as_posix()
+
+    # Settings go through the config, no value is pasted into SQL
+    con = duckdb.connect(config=config)
+    con.execute("SET enable_progress_bar = false")
+    for macro in DUCKDB_MACROS:
+        con.execute(macro)
+    return con
+
+
+def _column_types(con: duckdb.DuckDBPyConnection, source: str) -> Dict[str, str]:
+    """DuckDB type name of every column of a relation."""
+    relation = con.sql(f"SELECT * FROM {source} LIMIT 0")
+    return {col: str(column_type) for col, column_type in zip(relation.columns, relation.types)}
+
+
+def _aggregate_groups(
+        con: duckdb.DuckDBPyConnection,
+        source: str,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        column_types: Dict[str, str],
+        python_columns: Optional[Dict[str, np.ndarray]] = None
+) -> Tuple[pa.Table, Dict[str, Tuple[np.ndarray, np.ndarray]], List[np.ndarray], List[Dict[str, Any]]]:
+    """
+    Merge the rows of a relation by key in one GROUP BY query.
+
+    Parameters:
+        con: DuckDB connection
+        source: Relation (table, view or subquery) holding the rows and the ROW_COLUMN
+        key_column: Column to use as the grouping key, rows with a missing key are left out
+        agg_dict: Aggregation function per column
+        column_types: DuckDB type of every column of source
+        python_columns: Values (indexed by ROW_COLUMN) of the columns DuckDB can't hold,
+            aggregated by their Python function
+
+    Returns:
+        Tuple of (merged groups sorted by key without the conflicting groups,
+        (group mask, values) of the groups merged by Python per column,
+        ROW_COLUMN values of every conflicting group, conflict metadata of every conflicting group)
+    """
+    python_columns = python_columns or {}
+    key = _quote(key_column)
+    helpers: List[str] = []
+    selects: List[str] = [key]
+    conflict_checks: List[Tuple[str, str]] = []
+    fallbacks: List[str] = []
+
+    # Conflict checks run before the other columns, like in _aggregate_columns
+    for col, agg_func in agg_dict.items():
+        if agg_func in DUCKDB_CONFLICT_CHECKS and col not in python_columns:
+            condition, error_message = DUCKDB_CONFLICT_CHECKS[agg_func]
+            flag = f"__conflict_{len(conflict_checks)}"
+            selects.append(f"{condition.format(col=_quote(col))} AS {_quote(flag)}")
+            selects.append(f"CASE WHEN {_quote(flag)} THEN list({_quote(col)} ORDER BY {ROW_COLUMN}) END AS {_quote(flag + '_values')}")
+            conflict_checks.append((col, error_message))
+
+    for col, agg_func in agg_dict.items():
+        quoted = _quote(col)
+        supported = (col not in python_columns and agg_func in DUCKDB_AGGREGATIONS
+                     and DUCKDB_COLUMN_TYPES[agg_func](column_types[col]))
+        helper = _quote(f"__helper_{col}")
+        if supported and agg_func in DUCKDB_ROW_HELPERS:
+            helpers.append(f"{DUCKDB_ROW_HELPERS[agg_func].format(col=quoted, key=key)} AS {helper}")
+
+        selects.append(f"{DUCKDB_AGGREGATIONS[agg_func].format(col=quoted, helper=helper) if supported else 'NULL'} AS {quoted}")
+        if col in python_columns:
+            fallbacks.append(col)
+        elif not supported or agg_func in DUCKDB_PYTHON_FALLBACKS:
+            condition = DUCKDB_PYTHON_FALLBACKS[agg_func].format(col=quoted) if supported else 'true'
+            selects.append(f"CASE WHEN bool_or({condition}) THEN list({quoted} ORDER BY {ROW_COLUMN}) END AS {_quote('__python_' + col)}")
+            fallbacks.append(col)
+
+    # Row numbers of every group: needed for the conflicting groups and for the python_columns
+    if python_columns:
+        selects.append(f"list({ROW_COLUMN} ORDER BY {ROW_COLUMN}) AS __rows")
+    elif conflict_checks:
+        any_conflict = ' OR '.join(_quote(f"__conflict_{i}") for i in range(len(conflict_checks)))
+        selects.append(f"CASE WHEN {any_conflict} THEN list({ROW_COLUMN} ORDER BY {ROW_COLUMN}) END AS __rows")
+
+    query = (
+        f"WITH rows AS (SELECT *{''.join(', ' + helper for helper in helpers)} FROM {source} WHERE {key} IS NOT NULL) "
+        f"SELECT {', '.join(selects)} FROM rows GROUP BY {key} ORDER BY {key}"
+    )
+    groups = con.sql(query).to_arrow_table()
+
+    # The first conflict column (in column order) reporting a conflict for a group is the one logged
+    error_infos: Dict[int, Dict[str, Any]] = {}
+    for i, (col, error_message) in enumerate(conflict_checks):
+        flags = pc.fill_null(groups[f"__conflict_{i}"], False).to_numpy(zero_copy_only=False)
+        values = groups[f"__conflict_{i}_values"]
+        for group_index in np.flatnonzero(flags).tolist():
+            if group_index not in error_infos:
+                error_infos[group_index] = _conflict_info(error_message, col, values[group_index].as_py())
+
+    # Groups the SQL can't express: call the aggregation function on their values (conflict columns first)
+    python_outputs: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for col in sorted(fallbacks, key=lambda c: agg_dict[c] not in CONFLICT_AGGREGATIONS):
+        if col in python_columns:
+            group_values = groups['__rows']
+        else:
+            group_values = groups['__python_' + col]
+
+        mask = pc.is_valid(group_values).to_numpy(zero_copy_only=False)
+        output = np.empty(len(groups), dtype=object)
+        for group_index in np.flatnonzero(mask).tolist():
+            if group_index in error_infos:
+                continue
+            if col in python_columns:
+                values = python_columns[col][group_values[group_index].as_py()]
+            else:
+                values = np.empty(len(group_values[group_index]), dtype=object)
+                values[:] = group_values[group_index].as_py()
+            try:
+                output[group_index] = agg_dict[col](values)
+            except ValueError as e:
+                if str(e) not in MERGE_CONFLICT_MESSAGES:
+                    raise
+                error_infos[group_index] = _conflict_info(str(e), col, values)
+        python_outputs[col] = (mask, output)
+
+    error_indices = sorted(error_infos)
+    group_rows = [np.asarray(groups['__rows'][group_index].as_py()) for group_index in error_indices]
+
+    keep = np.ones(len(groups), dtype=bool)
+    keep[error_indices] = False
+    merged_groups = groups.select([key_column, *agg_dict]).filter(pa.array(keep))
+    python_outputs = {col: (mask[keep], output[keep]) for col, (mask, output) in python_outputs.items()}
+    return merged_groups, python_outputs, group_rows, [error_infos[group_index] for group_index in error_indices]
+
+
+def _groups_to_pandas(
+        merged_groups: pa.Table,
+        python_outputs: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        arrow_native: bool
+) -> pd.DataFrame:
+    """
+    Merged groups as a DataFrame, with the values of the groups merged by Python filled in.
+
+    Without arrow_native, merged lists are Python lists (dictionaries as dicts), the types
+    the aggregation functions of the other engines return.
+    """
+    result_df = _to_pandas(merged_groups, arrow_native)
+    if not arrow_native:
+        for field in merged_groups.schema:
+            if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                values = np.empty(merged_groups.num_rows, dtype=object)
+                values[:] = merged_groups[field.name].to_pylist()
+                result_df[field.name] = values
+    for col, (mask, output) in python_outputs.items():
+        if not mask.any():
+            continue
+        values = result_df[col].to_numpy(dtype=object).copy()
+        values[mask] = output[mask]
+        if isinstance(result_df[col].dtype, pd.ArrowDtype) and not pa.types.is_null(result_df[col].dtype.pyarrow_dtype):
+            try:
+                result_df[col] = pd.arrays.ArrowExtensionArray(pa.array(values, type=result_df[col].dtype.pyarrow_dtype))
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+        result_df[col] = values
+    return result_df.infer_objects()
+
+
+def _to_pandas(table: pa.Table, arrow_native: bool) -> pd.DataFrame:
+    """Arrow table to DataFrame, nested values as numpy arrays like pd.read_parquet (or Arrow-backed)."""
+    return table.to_pandas(types_mapper=pd.ArrowDtype if arrow_native else None)
+
+
+def _merge_duckdb(
+        df: pd.DataFrame,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        workers: int = 1
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Merge engine running the grouping and the aggregations in DuckDB.
+
+    The DataFrame is handed to DuckDB as an Arrow table. Object columns Arrow can't hold
+    (mixed value types, dictionaries with different keys) are aggregated by their Python
+    function. DuckDB uses all cores, or `workers` threads when workers > 1.
+
+    Returns:
+        Tuple of (merged DataFrame, rows of the conflicting groups or None, number of conflicting groups)
+    """
+    arrays: Dict[str, pa.Array] = {}
+    python_columns: Dict[str, np.ndarray] = {}
+    for col in df.columns:
+        if (agg_dict.get(col) == merge_arrays_dictionary and df[col].dtype == object
+                and not shared_key_set(df[col].to_numpy(dtype=object))):
+            python_columns[col] = df[col].to_numpy(dtype=object)
+            arrays[col] = pa.nulls(len(df))
+            continue
+        try:
+            arrays[col] = pa.Array.from_pandas(df[col])
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            if col == key_column:
+                raise ValueError(f"Key column '{key_column}' has mixed value types, DuckDB can't group it")
+            python_columns[col] = df[col].to_numpy(dtype=object)
+            arrays[col] = pa.nulls(len(df))
+    arrays[ROW_COLUMN] = pa.array(np.arange(len(df), dtype=np.int64))
+
+    con = _connect(threads=workers if workers > 1 else None)
+    con.register('source', pa.table(arrays))
+    merged_groups, python_outputs, group_rows, error_infos = _aggregate_groups(
+        con, 'source', key_column, agg_dict, _column_types(con, 'source'), python_columns
+    )
+    con.close()
+
+    error_df = _error_rows_frame(df, group_rows, error_infos) if error_infos else None
+    if merged_groups.num_rows == 0:
+        return pd.DataFrame(columns=df.columns), error_df, len(error_infos)
+
+    arrow_native = any(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
+    return _groups_to_pandas(merged_groups, python_outputs, arrow_native), error_df, len(error_infos)
+
+
+def _clean_select(schema: pa.Schema) -> List[str]:
+    """
+    SQL select list of src.process_columns.clean_columns: same transformations, same column order.
+    """
+    names = schema.names
+    selects = {name: _quote(name) for name in names}
+
+    if 'product_summary' in names and 'description' in names:
+        del selects['description'], selects['product_summary']
+        # Longest of the two, a missing value counts as len(str(nan)) = 3 characters like in the pandas version
+        selects['product_description'] = (
+            "coalesce(CASE WHEN coalesce(length(description), 3) >= coalesce(length(product_summary), 3) "
+            "THEN description ELSE product_summary END, '') AS product_description"
+        )
+    if 'materials' in names and 'ingredients' in names:
+        del selects['materials'], selects['ingredients']
+        selects['components'] = (
+            "CASE WHEN len(materials) = 0 AND len(ingredients) > 0 THEN ingredients ELSE materials END AS components"
+        )
+    if 'energy_efficiency' in names:
+        energy_type = schema.field('energy_efficiency').type
+        if pa.types.is_list(energy_type) or pa.types.is_large_list(energy_type):
+            selects['energy_efficiency'] = (
+                "CASE WHEN energy_efficiency IS NULL OR (len(energy_efficiency) = 1 AND energy_efficiency[1] IS NULL) "
+                "THEN [] ELSE energy_efficiency END AS energy_efficiency"
+            )
+        else:
+            selects['energy_efficiency'] = (
+                "CASE WHEN energy_efficiency IS NULL THEN [] ELSE [energy_efficiency] END AS energy_efficiency"
+            )
+
+    for name in ['product_name', 'manufacturing_year']:
+        selects.pop(name, None)
+    return list(selects.values())
+
+
+def duckdb_merge_parquet(
+        path: Optional[Union[str, Path]] = None,
+        key_column: str = 'product_title',
+        threads: Optional[int] = None,
+        memory_limit: Optional[str] = None,
+        temp_directory: Optional[Union[str, Path]] = None,
+        arrow_native: bool = False,
+        error_folder: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Clean and deduplicate a parquet file entirely in DuckDB, reading the file directly.
+
+    Same steps and output as clean_columns + src.optimize.optimized_merge: merged duplicate groups
+    (sorted by key) followed by the rows whose key is unique (file order), with a new RangeIndex.
+    Conflicting groups are appended to the merge error log.
+
+    Parameters:
+        path: Parquet file (default: DataPaths.file_parquet_original)
+        key_column: Column the duplicates are grouped by
+        threads: Number of DuckDB threads (default: all cores)
+        memory_limit: DuckDB memory limit, e.g. '2GB', larger intermediates spill to disk
+        temp_directory: Where spilled data is written
+        arrow_native: Return Arrow-backed columns (as main(arrow_native=True))
+        error_folder: Folder of the merge error log (default: DataPaths.error_folder)
+
+    Returns:
+        Deduplicated DataFrame
+    """
+    path = Path(path or DataPaths.file_parquet_original)
+    schema = pq.read_schema(path)
+    if key_column not in schema.names:
+        raise ValueError(f"Key column '{key_column}' not found in {path}")
+
+    start = time.perf_counter()
+    con = _connect(threads, memory_limit, temp_directory)
+    # The path is passed to the scan as a value, not pasted into the SQL
+    con.read_parquet(str(path), file_row_number=True).create_view('source')
+    con.execute(
+        f"CREATE TEMP VIEW cleaned AS SELECT {', '.join(_clean_select(schema))}, "
+        f"{_quote(key_column)} AS product_key, file_row_number AS {ROW_COLUMN} FROM source"
+    )
+    # Rows with a missing key are unique rows, like in optimized_merge
+    con.execute(
+        "CREATE TEMP VIEW sized AS SELECT *, CASE WHEN product_key IS NULL THEN 1 "
+        "ELSE count(*) OVER (PARTITION BY product_key) END AS __group_size FROM cleaned"
+    )
+
+    column_types = _column_types(con, 'cleaned')
+    columns = [col for col in column_types if col != ROW_COLUMN]
+    agg_dict = build_aggregation_dict(pd.DataFrame(columns=columns), 'product_key')
+
+    merged_groups, python_outputs, group_rows, error_infos = _aggregate_groups(
+        con, "(SELECT * FROM sized WHERE __group_size > 1)", 'product_key', agg_dict, column_types
+    )
+    unique_table = con.sql(
+        f"SELECT * EXCLUDE (product_key, __group_size) FROM sized WHERE __group_size = 1 ORDER BY {ROW_COLUMN}"
+    ).to_arrow_table()
+
+    if error_infos:
+        # Original (cleaned) rows of the conflicting groups
+        error_rows = np.concatenate(group_rows)
+        error_table = con.sql(
+            # The rows as the pandas pipeline logs them, without the product_key copy of the key
+            f"SELECT * EXCLUDE (product_key) FROM cleaned WHERE {ROW_COLUMN} IN (SELECT unnest($rows)) ORDER BY {ROW_COLUMN}",
+            params={'rows': error_rows.tolist()}
+        ).to_arrow_table()
+        error_source = _to_pandas(error_table.drop_columns([ROW_COLUMN]), arrow_native)
+        positions = pd.Index(error_table[ROW_COLUMN].to_numpy())
+        _log_merge_errors(
+            _error_rows_frame(error_source, [positions.get_indexer(rows) for rows in group_rows], error_infos),
+            len(error_infos), error_folder
+        )
+    con.close()
+
+    merged_df = _groups_to_pandas(merged_groups, python_outputs, arrow_native).drop(columns=['product_key'])
+    unique_df = _to_pandas(unique_table.drop_columns([ROW_COLUMN]), arrow_native)
+
+    # Same empty array for missing lists as merge_dataframe_rows
+    for col in get_array_aggregation_dict():
+        if col in merged_df.columns and not arrow_native:
+            merged_df[col] = merged_df[col].apply(lambda x: np.array([]) if x is None else x)
+
+    result_df = pd.concat([merged_df, unique_df], ignore_index=True)
+    print(f"DuckDB merge: {merged_groups.num_rows:,} merged groups and {unique_table.num_rows:,} unique rows "
+          f"in {time.perf_counter() - start:.2f}s")
+    return result_df
+
+
+def _comparable(value: Any) -> Any:
+    """Value in a form two engines can be compared with (lists as sorted JSON strings, missing values as None)."""
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, list):
+        return sorted(json.dumps(item, sort_keys=True, default=str) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True, default=str)
+    if value is None or pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def compare_results(first_df: pd.DataFrame, second_df: pd.DataFrame, key_column: str = 'product_title') -> List[str]:
+    """
+    Compare two deduplicated DataFrames row by row (rows matched by key, list order ignored).
+
+    Returns:
+        Names of the columns that differ (all columns if the row counts or column sets differ)
+    """
+    if len(first_df) != len(second_df) or set(first_df.columns) != set(second_df.columns):
+        return sorted(set(first_df.columns) | set(second_df.columns))
+
+    def rows(df: pd.DataFrame) -> pd.DataFrame:
+        return df.reset_index(drop=True).sort_values(key_column, kind='stable', na_position='last').reset_index(drop=True)
+
+    first_df, second_df = rows(first_df), rows(second_df)
+    return [col for col in first_df.columns
+            if [_comparable(v) for v in first_df[col]] != [_comparable(v) for v in second_df[col]]]
+
+
+def compare_with_pandas(path: Optional[Union[str, Path]] = None, engine: str = 'groupby') -> Dict[str, Any]:
+    """
+    Deduplicate a parquet file with the pandas pipeline and with duckdb_merge_parquet and compare the results.
+
+    Both runs log their merge errors to temporary folders, which are compared too (timestamps excluded).
+
+    Parameters:
+        path: Parquet file (default: DataPaths.file_parquet_original)
+        engine: Merge engine of the pandas run
+
+    Returns:
+        Dictionary with the row counts, run times, differing columns and whether the error logs match
+    """
+    # Imported here, the pandas pipeline is only needed for the comparison
+    from src.optimize import optimized_merge
+    from src.process_columns import clean_columns
+    from tools.load_data import load_dataframe
+
+    path = Path(path or DataPaths.file_parquet_original)
+    with tempfile.TemporaryDirectory() as pandas_folder, tempfile.TemporaryDirectory() as duckdb_folder:
+        start = time.perf_counter()
+        pandas_df = optimized_merge(clean_columns(load_dataframe(path)), engine=engine, error_folder=Path(pandas_folder))
+        pandas_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        duckdb_df = duckdb_merge_parquet(path, error_folder=Path(duckdb_folder))
+        duckdb_seconds = time.perf_counter() - start
+
+        error_logs = {'pandas': Path(pandas_folder) / 'merge_errors.csv', 'duckdb': Path(duckdb_folder) / 'merge_errors.csv'}
+        errors = {name: pd.read_csv(log).drop(columns=['timestamp']) if log.exists() else None
+                  for name, log in error_logs.items()}
+    errors_equal = (errors['pandas'] is None and errors['duckdb'] is None) or (
+        errors['pandas'] is not None and errors['duckdb'] is not None and errors['pandas'].equals(errors['duckdb'])
+    )
+
+    comparison = {
+        'rows': {'pandas': len(pandas_df), 'duckdb': len(duckdb_df)},
+        'seconds': {'pandas': pandas_seconds, 'duckdb': duckdb_seconds},
+        'differing_columns': compare_results(pandas_df, duckdb_df),
+        'error_logs_equal': errors_equal,
+    }
+    print(f"pandas ({engine}): {len(pandas_df):,} rows in {pandas_seconds:.2f}s, "
+          f"duckdb: {len(duckdb_df):,} rows in {duckdb_seconds:.2f}s")
+    print(f"Differing columns: {comparison['differing_columns'] or 'none'}, error logs equal: {errors_equal}")
+    return comparison
+
+
+if __name__ == "__main__":
+    result = compare_with_pandas(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.exit(0 if not result['differing_columns'] and result['error_logs_equal'] else 1)
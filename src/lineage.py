@@ -0,0 +1,138 @@
+"""
+Row Lineage
+------------------------------
+Maps every row of a merged DataFrame back to the source rows it was built from.
+
+The mapping is stored CSR-style as two int32 arrays: source_rows holds the source
+row positions of all output rows one after the other, offsets[i]:offsets[i + 1]
+is the slice belonging to output row i. Saved as .npy files next to the final
+parquet, they are memory-mapped on load so lookups never read the whole sidecar.
+
+Source rows are positions (0 based) in the DataFrame handed to the merge, for the
+pipeline that is the row number in the raw parquet file.
+
+Usage:
+   from src.lineage import RowLineage
+
+   * Source rows of the 10th final row
+   lineage = RowLineage.load(DataPaths.lineage_final_dir)
+   source_rows = lineage.sources(10)
+
+   * Final rows built from some source rows (e.g. rows changed upstream)
+   final_rows = lineage.affected_rows(np.array([4, 8, 15]))
+"""
+
+import numpy as np
+
+from pathlib import Path
+from typing import List, Union
+
+OFFSETS_FILE = 'offsets.npy'
+SOURCE_ROWS_FILE = 'source_rows.npy'
+
+
+class RowLineage:
+    """
+    CSR mapping from output rows to source row positions.
+    """
+
+    def __init__(self, offsets: np.ndarray, source_rows: np.ndarray):
+        if len(offsets) == 0 or offsets[0] != 0 or offsets[-1] != len(source_rows):
+            raise ValueError("offsets must start at 0 and end at len(source_rows)")
+        self.offsets = offsets
+        self.source_rows = source_rows
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __repr__(self) -> str:
+        return f"RowLineage({len(self):,} rows, {len(self.source_rows):,} source rows)"
+
+    @classmethod
+    def identity(cls, source_rows: np.ndarray) -> 'RowLineage':
+        """Lineage of rows that were not merged, output row i comes from source_rows[i] only."""
+        return cls(np.arange(len(source_rows) + 1, dtype=np.int32), np.asarray(source_rows, dtype=np.int32))
+
+    @classmethod
+    def from_groups(cls, order: np.ndarray, offsets: np.ndarray, groups: np.ndarray) -> 'RowLineage':
+        """
+        Lineage of merged groups.
+
+        Parameters:
+            order: Source row positions sorted by group (see src.merge.group_offsets)
+            offsets: Group boundaries in order
+            groups: Group index of every output row
+
+        Returns:
+            RowLineage where output row i comes from the rows of group groups[i]
+        """
+        starts, sizes = offsets[:-1][groups], np.diff(offsets)[groups]
+        lineage_offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int32)
+        # Position in order of every (output row, source row) entry
+        positions = np.arange(lineage_offsets[-1]) - np.repeat(lineage_offsets[:-1] - starts, sizes)
+        return cls(lineage_offsets, np.asarray(order, dtype=np.int32)[positions])
+
+    @classmethod
+    def concat(cls, lineages: List['RowLineage']) -> 'RowLineage':
+        """Lineage of pd.concat() of the outputs, in the same order."""
+        sizes = np.concatenate([np.diff(lineage.offsets) for lineage in lineages])
+        return cls(
+            np.concatenate(([0], np.cumsum(sizes))).astype(np.int32),
+            np.concatenate([lineage.source_rows for lineage in lineages]).astype(np.int32)
+        )
+
+    def sources(self, row: int) -> np.ndarray:
+        """Source row positions of output row `row`."""
+        return self.source_rows[self.offsets[row]:self.offsets[row + 1]]
+
+    def take(self, rows: np.ndarray) -> 'RowLineage':
+        """Lineage of the output rows reordered / selected by rows (positions)."""
+        return RowLineage.from_groups(self.source_rows, self.offsets, np.asarray(rows))
+
+    def compose(self, inner: 'RowLineage') -> 'RowLineage':
+        """
+        Chain two merges: self maps output rows to intermediate rows, inner maps
+        intermediate rows to source rows.
+
+        Returns:
+            RowLineage from the output rows of self to the source rows of inner
+        """
+        expanded = inner.take(self.source_rows)
+        return RowLineage(expanded.offsets[self.offsets], expanded.source_rows)
+
+    def affected_rows(self, source_rows: np.ndarray) -> np.ndarray:
+        """
+        Output rows built from at least one of the given source rows.
+
+        Parameters:
+            source_rows: Source row positions (e.g. rows changed since the last run)
+
+        Returns:
+            Sorted array of output row positions
+        """
+        entries = np.flatnonzero(np.isin(self.source_rows, source_rows))
+        return np.unique(np.searchsorted(self.offsets, entries, side='right') - 1)
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """
+        Write the lineage as a directory with offsets.npy and source_rows.npy.
+
+        Returns:
+            Path to the directory
+        """
+        path = Path(path)
+        path.mkdir(exist_ok=True, parents=True)
+        np.save(path / OFFSETS_FILE, np.asarray(self.offsets, dtype=np.int32))
+        np.save(path / SOURCE_ROWS_FILE, np.asarray(self.source_rows, dtype=np.int32))
+
+        print(f"Saved lineage of {len(self):,} rows to: {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> 'RowLineage':
+        """
+        Read a lineage saved with save(), memory-mapped by default.
+        """
+        path = Path(path)
+        mmap_mode = 'r' if mmap else None
+        return cls(np.load(path / OFFSETS_FILE, mmap_mode=mmap_mode), np.load(path / SOURCE_ROWS_FILE, mmap_mode=mmap_mode))
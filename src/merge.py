@@ -13,17 +13,31 @@ Usage:
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import csv
+import importlib.util
 import json
+import os
+import time
 
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from urllib.parse import urlparse
 
-from typing import Dict, Callable, List, Union, Set, Optional, Any, TypeVar
+from typing import Dict, Callable, List, Union, Set, Optional, Any, Tuple, TypeVar
 
 from src.path import DataPaths
+from src.normalization import UNSPSC_CACHE
+from src.lineage import RowLineage
+from src.process_columns import to_arrow_array
+from src.profiling import AggregationProfiler
 
 # Type aliases for better readability
 ArrayLike = Union[np.ndarray, List[Any]]
-ValueSeries = pd.Series
+# Aggregation functions receive either a group Series or a plain numpy slice of the group values
+ValueSeries = Union[pd.Series, np.ndarray]
 ScalarValue = Union[str, int, float, bool, None]
 T = TypeVar('T')
 
@@ -42,21 +56,19 @@ def merge_unspsc(values: ValueSeries) -> Optional[str]:
     Returns:
         String of unique UNSPSC codes separated by '|', or None if no valid values
     """
-    if values.empty:
+    if len(values) == 0:
         return ""
 
-    # Split any values that already contain ' | '
-    all_values: List[str] = []
+    # Parts of every value are parsed once (memoized) and unioned
+    parts: Set[str] = set()
     for val in values:
-        if pd.notna(val):
-            if isinstance(val, str) and ' | ' in val:
-                all_values.extend([v.strip() for v in val.split(' | ')])
-            else:
-                all_values.append(str(val).strip())
+        if isinstance(val, str):
+            parts.update(UNSPSC_CACHE.parts(val))
+        elif pd.notna(val):
+            parts.update(UNSPSC_CACHE.parts(str(val)))
 
-    # Remove duplicates and empty values
-    unique_values: List[str] = sorted(set(v for v in all_values if v and v != 'nan'))
-    return ' | '.join(unique_values) if unique_values else ""
+    # Sorted unique values, rebuilt once per group
+    return UNSPSC_CACHE.join(parts)
 
 def merge_root_domain(values: ValueSeries) -> str:
     """
@@ -69,7 +81,7 @@ def merge_root_domain(values: ValueSeries) -> str:
     Returns:
         String of unique domain values separated by " | ", empty string if no valid values
     """
-    if values.empty:
+    if len(values) == 0:
         return ""
 
     # Filter out nulls and get unique values
@@ -91,7 +103,7 @@ def merge_page_url(values: ValueSeries) -> str:
        Returns:
            String of unique shortest URLs separated by " | ", empty string if no valid values
        """
-    if values.empty:
+    if len(values) == 0:
         return ""
 
     # Filter out nulls
@@ -138,7 +150,7 @@ def merge_text_longest(values: ValueSeries) -> Optional[str]:
     Returns:
         The longest text string, or None if no valid strings
     """
-    if values.empty:
+    if len(values) == 0:
         return None
 
     valid_strings: List[str] = [s for s in values if pd.notna(s) and isinstance(s, str) and s]
@@ -156,7 +168,7 @@ def merge_text_shortest(values: ValueSeries) -> Optional[str]:
     Returns:
         The shortest text string, or None if no valid strings
     """
-    if values.empty:
+    if len(values) == 0:
         return None
 
     valid_strings: List[str] = [s for s in values if pd.notna(s) and isinstance(s, str) and s]
@@ -175,7 +187,7 @@ def merge_eco_friendly(values: ValueSeries) -> Optional[bool]:
         None if all values are null or empty
         Raises ValueError if both True and False values are present
     """
-    if values.empty:
+    if len(values) == 0:
         return None
 
     # Filter out nulls
@@ -212,12 +224,29 @@ def merge_max_year(values: ValueSeries) -> Optional[int]:
     Returns:
         The maximum year value, or None if no valid years
     """
-    if values.empty:
+    if len(values) == 0:
         return None
 
     non_null: List[int] = [y for y in values if pd.notna(y)]
     return max(non_null) if non_null else None
 
+def merge_first(values: ValueSeries) -> Any:
+    """
+    Return the first value of a series.
+
+    Used for columns that don't have a specialized aggregation function.
+
+    Parameters:
+        values: Series of values
+
+    Returns:
+        The first value, or None if the series is empty
+    """
+    if len(values) == 0:
+        return None
+
+    return values.iloc[0] if isinstance(values, pd.Series) else values[0]
+
 
 def get_scalar_aggregation_dict() -> Dict[str, Callable[[ValueSeries], Optional[ScalarValue]]]:
     """
@@ -245,6 +274,8 @@ def get_scalar_aggregation_dict() -> Dict[str, Callable[[ValueSeries], Optional[
         'eco_friendly',  # column 10
         'manufacturing_year',  # column 17
         'description',  # column 30
+        'extracted_model_number',  # src.extract_identifiers
+        'extracted_year',  # src.extract_identifiers
     ]
 
     # Create a dictionary mapping column names (strings) to their specific aggregation functions
@@ -256,11 +287,11 @@ def get_scalar_aggregation_dict() -> Dict[str, Callable[[ValueSeries], Optional[
             agg_dict[col] = merge_root_domain
         elif col == 'page_url':
             agg_dict[col] = merge_page_url
-        elif col in ['product_title', 'product_description', 'brand']:
+        elif col in ['product_title', 'product_description', 'brand', 'extracted_model_number']:
             agg_dict[col] = merge_text_longest
         elif col in ['eco_friendly']:
             agg_dict[col] = merge_eco_friendly
-        elif col == 'manufacturing_year':
+        elif col in ['manufacturing_year', 'extracted_year']:
             agg_dict[col] = merge_max_year
     return agg_dict
 
@@ -270,7 +301,9 @@ def merge_array_simple(values: ValueSeries) -> List[Any]:
     """
     Merge arrays by concatenating all elements and removing duplicates.
 
-    Returns a list instead of numpy array to avoid PyArrow conversion issues.
+    Elements keep the order of their first occurrence, so every merge engine
+    returns the same list. Returns a list instead of numpy array to avoid
+    PyArrow conversion issues.
 
     Parameters:
         values: Series containing arrays (numpy arrays or lists)
@@ -278,7 +311,7 @@ def merge_array_simple(values: ValueSeries) -> List[Any]:
     Returns:
         List with all unique elements merged
     """
-    if values.empty:
+    if len(values) == 0:
         return []
 
     # Collect all non-empty arrays
@@ -291,9 +324,9 @@ def merge_array_simple(values: ValueSeries) -> List[Any]:
         elif isinstance(arr, list) and len(arr) > 0:
             all_elements.extend(arr)
 
-    # Remove duplicates by converting to set (if elements are hashable)
+    # Remove duplicates, keeping the first occurrence (if elements are hashable)
     try:
-        unique_elements: List[Any] = list(set(all_elements))
+        unique_elements: List[Any] = list(dict.fromkeys(all_elements))
     except TypeError:
         # If set conversion fails (elements are unhashable like lists or dicts),
         # fallback to manual deduplication
@@ -317,7 +350,7 @@ def merge_arrays_dictionary(values: ValueSeries) -> List[Any]:
     Returns:
         List with all unique dictionaries merged
     """
-    if values.empty:
+    if len(values) == 0:
         return []
 
     # Collect all non-empty arrays of dictionaries
@@ -399,31 +432,467 @@ def get_array_aggregation_dict() -> Dict[str, Callable[[ValueSeries], List[Any]]
     return agg_dict
 
 
-def merge_dataframe_rows(df: pd.DataFrame, key_column: str) -> pd.DataFrame:
+# ========== Pairwise Kernels (two-row groups) ==========
+# Each kernel merges two aligned object arrays (first and second row of every pair) in one
+# vectorized call and must give the same result as its aggregation function on each pair.
+# Pairs a kernel can't express are passed to the aggregation function one by one.
+
+def _pair_values(first_value: Any, second_value: Any) -> np.ndarray:
+    """Build the two-element value array of a single pair (safe for list/array values)."""
+    values = np.empty(2, dtype=object)
+    values[0] = first_value
+    values[1] = second_value
+    return values
+
+def _apply_per_pair(
+        agg_func: Callable[[ValueSeries], Any],
+        first: np.ndarray,
+        second: np.ndarray,
+        rows: np.ndarray,
+        result: np.ndarray
+) -> np.ndarray:
+    """Fallback: fill result[rows] by calling agg_func on each selected pair."""
+    for i in rows:
+        result[i] = agg_func(_pair_values(first[i], second[i]))
+    return result
+
+def _as_text_array(values: np.ndarray) -> Optional[pa.Array]:
+    """Convert an object array to an Arrow string array, None if it holds non-string values."""
+    try:
+        return pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+def _text_lengths(text: pa.Array) -> np.ndarray:
+    """Character length of every string, 0 for null values."""
+    return pc.fill_null(pc.utf8_length(text), 0).to_numpy()
+
+def _is_true(values: np.ndarray, target: bool) -> np.ndarray:
+    """Boolean mask of the non-null values equal to target."""
+    mask = np.zeros(len(values), dtype=bool)
+    valid = ~pd.isna(values)
+    mask[valid] = values[valid] == target
+    return mask
+
+def _join_sorted_pair(first: pa.Array, second: pa.Array, first_valid: np.ndarray, second_valid: np.ndarray) -> np.ndarray:
     """
-    Merge rows in a DataFrame that share the same key value.
-    Logs any merging errors to a CSV file in the error folder for later analysis.
-    Appends to the existing error log if one exists.
-    Handles missing columns by skipping them.
+    Pairwise equivalent of " | ".join(sorted(set(valid values))) for two strings.
+    """
+    both = pc.if_else(
+        pc.equal(first, second),
+        first,
+        pc.if_else(
+            pc.less(first, second),
+            pc.binary_join_element_wise(first, second, ' | '),
+            pc.binary_join_element_wise(second, first, ' | ')
+        )
+    )
+    joined = pc.if_else(
+        pa.array(first_valid & second_valid),
+        both,
+        pc.if_else(pa.array(first_valid), first, pc.if_else(pa.array(second_valid), second, ''))
+    )
+    return joined.to_numpy(zero_copy_only=False)
+
+def _pairwise_text_longest(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_text_longest: the longer string, the first one on ties."""
+    first_text, second_text = _as_text_array(first), _as_text_array(second)
+    if first_text is None or second_text is None:
+        return _apply_per_pair(merge_text_longest, first, second, np.arange(len(first)), np.empty(len(first), dtype=object))
+
+    first_length, second_length = _text_lengths(first_text), _text_lengths(second_text)
+    result = np.where(first_length >= second_length, first, second)
+    result[(first_length == 0) & (second_length == 0)] = None
+    return result
+
+def _pairwise_text_shortest(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_text_shortest: the shorter non-empty string, the first one on ties."""
+    first_text, second_text = _as_text_array(first), _as_text_array(second)
+    if first_text is None or second_text is None:
+        return _apply_per_pair(merge_text_shortest, first, second, np.arange(len(first)), np.empty(len(first), dtype=object))
+
+    first_length, second_length = _text_lengths(first_text), _text_lengths(second_text)
+    first_wins = (first_length > 0) & ((first_length <= second_length) | (second_length == 0))
+    result = np.where(first_wins, first, second)
+    result[(first_length == 0) & (second_length == 0)] = None
+    return result
+
+def _pairwise_root_domain(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_root_domain: sorted union of the two domains."""
+    first_text, second_text = _as_text_array(first), _as_text_array(second)
+    if first_text is None or second_text is None:
+        return _apply_per_pair(merge_root_domain, first, second, np.arange(len(first)), np.empty(len(first), dtype=object))
+
+    return _join_sorted_pair(first_text, second_text, _text_lengths(first_text) > 0, _text_lengths(second_text) > 0)
+
+def _pairwise_unspsc(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_unspsc: sorted union of the two stripped codes."""
+    first_text, second_text = _as_text_array(first), _as_text_array(second)
+    if first_text is None or second_text is None:
+        return _apply_per_pair(merge_unspsc, first, second, np.arange(len(first)), np.empty(len(first), dtype=object))
+
+    # Values that are already ' | ' joined need splitting, leave them to merge_unspsc
+    already_joined = (
+        pc.fill_null(pc.match_substring(first_text, ' | '), False).to_numpy(zero_copy_only=False) |
+        pc.fill_null(pc.match_substring(second_text, ' | '), False).to_numpy(zero_copy_only=False)
+    )
+
+    first_text = pc.utf8_trim_whitespace(first_text)
+    second_text = pc.utf8_trim_whitespace(second_text)
+    first_valid = (_text_lengths(first_text) > 0) & pc.fill_null(pc.not_equal(first_text, 'nan'), False).to_numpy(zero_copy_only=False)
+    second_valid = (_text_lengths(second_text) > 0) & pc.fill_null(pc.not_equal(second_text, 'nan'), False).to_numpy(zero_copy_only=False)
+
+    result = _join_sorted_pair(first_text, second_text, first_valid, second_valid)
+    return _apply_per_pair(merge_unspsc, first, second, np.flatnonzero(already_joined), result)
+
+# Same netloc urlparse() finds: optional scheme, then '//' and everything up to the first '/', '?' or '#'
+_NETLOC_PATTERN = r'^(?:[A-Za-z][A-Za-z0-9+.\-]*:)?//(?P<netloc>[^/?#]*)'
+# Printable ASCII without '[' / ']', urlparse() may strip, normalize or reject anything else
+_PLAIN_URL_PATTERN = r'^[\x21-\x5a\x5c\x5e-\x7e]*$'
+
+def _pairwise_page_url(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_page_url: the shorter URL when both share a domain, sorted union otherwise."""
+    first_text, second_text = _as_text_array(first), _as_text_array(second)
+    if first_text is None or second_text is None:
+        return _apply_per_pair(merge_page_url, first, second, np.arange(len(first)), np.empty(len(first), dtype=object))
+
+    irregular = np.zeros(len(first), dtype=bool)
+    domains, valid, lengths = [], [], []
+    for text in [first_text, second_text]:
+        plain = pc.fill_null(pc.match_substring_regex(text, _PLAIN_URL_PATTERN), True).to_numpy(zero_copy_only=False)
+        irregular |= ~plain
+
+        domain = pc.struct_field(pc.extract_regex(text, _NETLOC_PATTERN), 'netloc')
+        domains.append(domain)
+        valid.append(_text_lengths(domain) > 0)
+        lengths.append(_text_lengths(text))
+
+    same_domain = valid[0] & valid[1] & pc.fill_null(pc.equal(domains[0], domains[1]), False).to_numpy(zero_copy_only=False)
+
+    result = _join_sorted_pair(first_text, second_text, valid[0], valid[1])
+    result[same_domain] = np.where(lengths[1] < lengths[0], second, first)[same_domain]
+    return _apply_per_pair(merge_page_url, first, second, np.flatnonzero(irregular), result)
+
+def _pairwise_eco_friendly(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_eco_friendly, conflicting pairs are detected by _pairwise_eco_conflicts."""
+    result = np.full(len(first), None, dtype=object)
+    result[_is_true(first, False) | _is_true(second, False)] = False
+    result[_is_true(first, True) | _is_true(second, True)] = True
+    return result
+
+def _pairwise_eco_conflicts(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Mask of pairs holding both a True and a False eco_friendly value."""
+    has_true = _is_true(first, True) | _is_true(second, True)
+    has_false = _is_true(first, False) | _is_true(second, False)
+    return has_true & has_false
+
+def _pairwise_max_year(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_max_year: the larger non-null value."""
+    first_missing, second_missing = pd.isna(first), pd.isna(second)
+    both = ~first_missing & ~second_missing
+
+    first_wins = second_missing.copy()
+    first_wins[both] = first[both] >= second[both]
+
+    result = np.where(first_wins, first, second)
+    result[first_missing & second_missing] = None
+    return result
+
+def _pairwise_first(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Pairwise merge_first."""
+    return first.copy()
+
+def union_lists(
+        lists: pa.Array,
+        row_groups: np.ndarray,
+        n_groups: int,
+        dictionaries: bool = False
+) -> Optional[pa.Array]:
+    """
+    Union the list values of each group with Arrow kernels, keeping the first occurrence of every element.
 
     Parameters:
-        df: DataFrame to merge
-        key_column: Column to use as the grouping key
+        lists: Arrow list array (one list per row)
+        row_groups: Group index of every row, rows are visited in array order
+        n_groups: Number of groups
+        dictionaries: Deduplicate dictionaries (null elements dropped) instead of simple values
 
     Returns:
-        DataFrame with merged rows (problematic groups excluded)
+        Arrow list array with one list per group (same type as lists), or None if the
+        elements can't be compared by Arrow (e.g. nested values)
     """
-    # Check if key_column exists in DataFrame
-    if key_column not in df.columns:
-        raise ValueError(f"Key column '{key_column}' not found in DataFrame")
+    if not (pa.types.is_list(lists.type) or pa.types.is_large_list(lists.type)):
+        return None
 
-    # Handle empty DataFrame
-    if df.empty:
-        return df.copy()
+    elements = pc.list_flatten(lists)
+    element_groups = row_groups[pc.list_parent_indices(lists).to_numpy()]
+
+    if dictionaries:
+        if not (pa.types.is_struct(elements.type) or pa.types.is_null(elements.type)):
+            return None
+        present = pc.is_valid(elements).to_numpy(zero_copy_only=False)
+        elements = elements.filter(pa.array(present))
+        element_groups = element_groups[present]
+        # Two dictionaries are equal when all of their fields are equal
+        key_columns = {f'field_{i}': child for i, child in enumerate(elements.flatten())} if len(elements) else {}
+    else:
+        key_columns = {'value': elements}
+
+    if len(elements):
+        table = pa.table({'group': element_groups, 'position': np.arange(len(elements)), **key_columns})
+        try:
+            firsts = table.group_by(['group', *key_columns]).aggregate([('position', 'min')])
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return None
 
-    # Set up error log path
-    error_log_path = DataPaths.error_folder / "merge_errors.csv"
+        positions = firsts['position_min'].to_numpy()
+        positions = positions[np.lexsort((positions, element_groups[positions]))]
+    else:
+        positions = np.array([], dtype=np.int64)
 
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(element_groups[positions], minlength=n_groups))))
+    merged = pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), elements.take(pa.array(positions)))
+    return merged.cast(lists.type)
+
+def shared_key_set(lists: np.ndarray) -> bool:
+    """
+    Check that all dictionaries in a column of dictionary lists have the same keys.
+
+    Arrow stores the dictionaries as structs with the union of all keys, so a dictionary
+    missing a key would come back with that key set to None. The struct kernels are only
+    used when this returns True.
+
+    Parameters:
+        lists: Object array of dictionary lists (numpy arrays or lists)
+
+    Returns:
+        True if every dictionary has the same key set (or there are no dictionaries)
+    """
+    keys = None
+    for values in lists:
+        if not isinstance(values, (list, np.ndarray)):
+            continue
+        for dictionary in values:
+            if not isinstance(dictionary, dict):
+                continue
+            if keys is None:
+                keys = dictionary.keys()
+            elif dictionary.keys() != keys:
+                return False
+    return True
+
+def _pairwise_union(agg_func: Callable[[ValueSeries], List[Any]], dictionaries: bool) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    """Build the pairwise kernel of a list aggregation function on top of union_lists."""
+    def kernel(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        n_pairs = len(first)
+        if dictionaries and not shared_key_set(np.concatenate([first, second])):
+            return _apply_per_pair(agg_func, first, second, np.arange(n_pairs), np.empty(n_pairs, dtype=object))
+        try:
+            lists = pa.array(np.concatenate([first, second]), from_pandas=True)
+            merged = union_lists(lists, np.concatenate([np.arange(n_pairs), np.arange(n_pairs)]), n_pairs, dictionaries)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            merged = None
+
+        if merged is None:
+            return _apply_per_pair(agg_func, first, second, np.arange(n_pairs), np.empty(n_pairs, dtype=object))
+        return np.fromiter(merged.to_pylist(), dtype=object, count=n_pairs)
+    return kernel
+
+PAIRWISE_KERNELS: Dict[Callable[[ValueSeries], Any], Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    merge_unspsc: _pairwise_unspsc,
+    merge_root_domain: _pairwise_root_domain,
+    merge_page_url: _pairwise_page_url,
+    merge_text_longest: _pairwise_text_longest,
+    merge_text_shortest: _pairwise_text_shortest,
+    merge_eco_friendly: _pairwise_eco_friendly,
+    merge_max_year: _pairwise_max_year,
+    merge_first: _pairwise_first,
+    merge_array_simple: _pairwise_union(merge_array_simple, dictionaries=False),
+    merge_arrays_dictionary: _pairwise_union(merge_arrays_dictionary, dictionaries=True),
+}
+
+# Vectorized conflict checks of the CONFLICT_AGGREGATIONS and the error message they stand for
+PAIRWISE_CONFLICT_CHECKS: Dict[Callable[[ValueSeries], Any], Tuple[Callable[[np.ndarray, np.ndarray], np.ndarray], str]] = {
+    merge_eco_friendly: (_pairwise_eco_conflicts, 'Different eco_friendly values'),
+}
+
+# ========== Arrow Kernels (engine='arrow') ==========
+# Each kernel aggregates one Arrow column whose rows are sorted by group and returns one
+# value per group, without converting the values to Python objects.
+# Arguments: values (sorted by group), offsets (group boundaries), row_groups (group index of every row).
+
+def _apply_per_group(
+        agg_func: Callable[[ValueSeries], Any],
+        values: Union[pa.Array, np.ndarray],
+        offsets: np.ndarray
+) -> Union[pa.Array, np.ndarray]:
+    """Fallback: call agg_func on the Python values of every group (an object array stays an object array)."""
+    if isinstance(values, np.ndarray):
+        output = np.empty(len(offsets) - 1, dtype=object)
+        for group_index, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+            output[group_index] = agg_func(values[start:end])
+        return output
+
+    python_values = np.empty(len(values), dtype=object)
+    python_values[:] = values.to_pylist()
+    results = [agg_func(python_values[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+    try:
+        return pa.array(results, type=values.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array(results)
+
+def _group_aggregate(values: pa.Array, row_groups: np.ndarray, aggregation: str) -> pa.Array:
+    """Hash aggregate values by group (one output per group, in group order)."""
+    table = pa.table({'group': row_groups, 'value': values})
+    aggregated = table.group_by('group').aggregate([('value', aggregation)]).sort_by('group')
+    return aggregated[f'value_{aggregation}'].combine_chunks()
+
+def _join_unique_sorted(strings: pa.Array, string_groups: np.ndarray, n_groups: int) -> pa.Array:
+    """Arrow equivalent of " | ".join(sorted(set(strings))) for every group ("" for groups without strings)."""
+    if len(strings):
+        table = pa.table({'group': string_groups, 'value': strings})
+        unique = table.group_by(['group', 'value']).aggregate([]).sort_by([('group', 'ascending'), ('value', 'ascending')])
+        unique_groups, unique_strings = unique['group'].to_numpy(), unique['value'].combine_chunks()
+    else:
+        unique_groups, unique_strings = np.array([], dtype=np.int64), strings
+
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(unique_groups, minlength=n_groups))))
+    lists = pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), unique_strings)
+    return pc.binary_join(lists, ' | ')
+
+def _arrow_text_longest(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_text_longest: the first of the longest strings of every group."""
+    lengths = _text_lengths(values)
+    # Stable sort: on equal lengths the earlier row stays first
+    chosen = np.lexsort((-lengths, row_groups))[offsets[:-1]]
+    return pc.if_else(pa.array(lengths[chosen] > 0), values.take(pa.array(chosen)), pa.scalar(None, type=values.type))
+
+def _arrow_text_shortest(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_text_shortest: the first of the shortest non-empty strings of every group."""
+    lengths = _text_lengths(values)
+    sort_lengths = np.where(lengths > 0, lengths, lengths.max(initial=0) + 1)
+    chosen = np.lexsort((sort_lengths, row_groups))[offsets[:-1]]
+    return pc.if_else(pa.array(lengths[chosen] > 0), values.take(pa.array(chosen)), pa.scalar(None, type=values.type))
+
+def _arrow_root_domain(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_root_domain: sorted unique domains of every group."""
+    present = _text_lengths(values) > 0
+    return _join_unique_sorted(values.filter(pa.array(present)), row_groups[present], len(offsets) - 1)
+
+def _arrow_unspsc(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_unspsc: split on ' | ', strip, sorted unique codes of every group."""
+    parts = pc.split_pattern(values, ' | ')
+    codes = pc.utf8_trim_whitespace(pc.list_flatten(parts))
+    code_groups = row_groups[pc.list_parent_indices(parts).to_numpy()]
+
+    present = (_text_lengths(codes) > 0) & pc.fill_null(pc.not_equal(codes, 'nan'), False).to_numpy(zero_copy_only=False)
+    return _join_unique_sorted(codes.filter(pa.array(present)), code_groups[present], len(offsets) - 1)
+
+def _arrow_page_url(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_page_url: shortest URL per domain, sorted and joined for every group."""
+    n_groups = len(offsets) - 1
+    domains = pc.struct_field(pc.extract_regex(values, _NETLOC_PATTERN), 'netloc')
+    lengths = _text_lengths(values)
+    present = _text_lengths(domains) > 0
+
+    # Shortest URL (earliest row on ties) of every (group, domain)
+    domain_ids = pc.dictionary_encode(domains).indices.to_numpy(zero_copy_only=False)
+    rows = np.flatnonzero(present)
+    rows = rows[np.lexsort((rows, lengths[rows], domain_ids[rows], row_groups[rows]))]
+    first_of_domain = np.ones(len(rows), dtype=bool)
+    first_of_domain[1:] = (row_groups[rows][1:] != row_groups[rows][:-1]) | (domain_ids[rows][1:] != domain_ids[rows][:-1])
+    rows = rows[first_of_domain]
+
+    result = _join_unique_sorted(values.take(pa.array(rows)), row_groups[rows], n_groups)
+
+    # Groups with URLs urlparse() may rewrite are merged by merge_page_url itself
+    irregular = ~pc.fill_null(pc.match_substring_regex(values, _PLAIN_URL_PATTERN), True).to_numpy(zero_copy_only=False)
+    irregular_groups = np.unique(row_groups[irregular])
+    if len(irregular_groups):
+        replacements = [
+            merge_page_url(np.array(values.slice(offsets[g], offsets[g + 1] - offsets[g]).to_pylist(), dtype=object))
+            for g in irregular_groups
+        ]
+        mask = np.zeros(n_groups, dtype=bool)
+        mask[irregular_groups] = True
+        result = pc.replace_with_mask(result, pa.array(mask), pa.array(replacements, type=result.type))
+    return result
+
+def _arrow_eco_flags(values: pa.Array, row_groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per group: (has a True value, has a False value), missing values ignored."""
+    if pa.types.is_null(values.type):
+        # Column without any value (object columns of None only)
+        values = values.cast(pa.bool_())
+    has_true = pc.fill_null(_group_aggregate(values, row_groups, 'any'), False).to_numpy(zero_copy_only=False)
+    has_false = pc.fill_null(_group_aggregate(pc.invert(values), row_groups, 'any'), False).to_numpy(zero_copy_only=False)
+    return has_true, has_false
+
+def _arrow_eco_friendly(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_eco_friendly, conflicting groups are detected by _arrow_eco_conflicts."""
+    has_true, has_false = _arrow_eco_flags(values, row_groups)
+    return pc.if_else(pa.array(has_true), True, pc.if_else(pa.array(has_false), False, pa.scalar(None, type=pa.bool_())))
+
+def _arrow_eco_conflicts(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> np.ndarray:
+    """Mask of groups holding both a True and a False eco_friendly value."""
+    has_true, has_false = _arrow_eco_flags(values, row_groups)
+    return has_true & has_false
+
+def _arrow_max_year(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_max_year: maximum non-null value of every group."""
+    return _group_aggregate(values, row_groups, 'max')
+
+def _arrow_first(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+    """Arrow merge_first: value of the first row of every group."""
+    return values.take(pa.array(offsets[:-1]))
+
+def _arrow_union(agg_func: Callable[[ValueSeries], List[Any]], dictionaries: bool) -> Callable[[pa.Array, np.ndarray, np.ndarray], pa.Array]:
+    """Build the Arrow kernel of a list aggregation function on top of union_lists."""
+    def kernel(values: pa.Array, offsets: np.ndarray, row_groups: np.ndarray) -> pa.Array:
+        merged = union_lists(values, row_groups, len(offsets) - 1, dictionaries)
+        return merged if merged is not None else _apply_per_group(agg_func, values, offsets)
+    return kernel
+
+ARROW_KERNELS: Dict[Callable[[ValueSeries], Any], Callable[[pa.Array, np.ndarray, np.ndarray], pa.Array]] = {
+    merge_unspsc: _arrow_unspsc,
+    merge_root_domain: _arrow_root_domain,
+    merge_page_url: _arrow_page_url,
+    merge_text_longest: _arrow_text_longest,
+    merge_text_shortest: _arrow_text_shortest,
+    merge_eco_friendly: _arrow_eco_friendly,
+    merge_max_year: _arrow_max_year,
+    merge_first: _arrow_first,
+    merge_array_simple: _arrow_union(merge_array_simple, dictionaries=False),
+    merge_arrays_dictionary: _arrow_union(merge_arrays_dictionary, dictionaries=True),
+}
+
+ARROW_CONFLICT_CHECKS: Dict[Callable[[ValueSeries], Any], Tuple[Callable[[pa.Array, np.ndarray, np.ndarray], np.ndarray], str]] = {
+    merge_eco_friendly: (_arrow_eco_conflicts, 'Different eco_friendly values'),
+}
+
+# ========== Row Merging ==========
+
+MERGE_ENGINES: List[str] = ['groupby', 'sorted', 'pairwise', 'arrow', 'duckdb', 'auto']
+
+# ValueError messages that mark a group as conflicting: the group is logged and excluded instead of merged
+MERGE_CONFLICT_MESSAGES: List[str] = ['Different brand values', 'Different eco_friendly values']
+
+# Aggregation functions that can raise one of MERGE_CONFLICT_MESSAGES, their columns are processed first
+CONFLICT_AGGREGATIONS: List[Callable[[ValueSeries], Any]] = [merge_eco_friendly]
+
+ERROR_INFO_COLUMNS: List[str] = ['error_message', 'error_column', 'group_size', 'timestamp', 'conflicting_values']
+
+
+def build_aggregation_dict(df: pd.DataFrame, key_column: Optional[str]) -> Dict[str, Callable[[ValueSeries], Any]]:
+    """
+    Create the aggregation dictionary for the columns present in a DataFrame.
+
+    Parameters:
+        df: DataFrame to merge
+        key_column: Column used as the grouping key (excluded from the result), None keeps every column
+
+    Returns:
+        Dictionary mapping every non-key column to its aggregation function
+    """
     # Get aggregation dictionaries
     scalar_agg_dict = get_scalar_aggregation_dict()
     array_agg_dict = get_array_aggregation_dict()
@@ -445,8 +914,134 @@ def merge_dataframe_rows(df: pd.DataFrame, key_column: str) -> pd.DataFrame:
     # For any columns without an aggregation function, use first() aggregation
     for col in df.columns:
         if col != key_column and col not in agg_dict:
-            agg_dict[col] = lambda x: x.iloc[0] if not x.empty else None
+            agg_dict[col] = merge_first
+
+    return agg_dict
+
+
+def _conflict_info(error_message: str, col: str, values: ValueSeries) -> Dict[str, Any]:
+    """
+    Build the metadata logged for a group whose values conflict.
+
+    Parameters:
+        error_message: Message of the raised ValueError
+        col: Column whose aggregation raised the error
+        values: Values of the group for that column
+
+    Returns:
+        Dictionary with one entry per ERROR_INFO_COLUMNS
+    """
+    return {
+        'error_message': error_message,
+        'error_column': col,
+        'group_size': len(values),
+        'timestamp': pd.Timestamp.now(),
+        'conflicting_values': '|'.join(str(v) for v in pd.unique(np.asarray(values, dtype=object)) if pd.notna(v))
+    }
+
+
+def _error_group_frame(group: pd.DataFrame, error_info: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Copy the original rows of a conflicting group and prepend the error metadata columns.
+    """
+    group_copy = group.copy()
+
+    # Add error metadata columns at the beginning
+    for col_name in ERROR_INFO_COLUMNS:
+        group_copy.insert(0, col_name, error_info[col_name])
 
+    return group_copy
+
+
+def _error_rows_frame(
+        df: pd.DataFrame,
+        group_rows: List[np.ndarray],
+        error_infos: List[Dict[str, Any]]
+) -> pd.DataFrame:
+    """
+    Vectorized _error_group_frame for many groups: take all their rows at once
+    and repeat the metadata of every group over its rows.
+
+    Parameters:
+        df: DataFrame being merged
+        group_rows: Row positions of every conflicting group
+        error_infos: Conflict metadata of every conflicting group
+
+    Returns:
+        DataFrame with the rows of all groups and the error metadata columns at the beginning
+    """
+    error_df = df.iloc[np.concatenate(group_rows)].reset_index(drop=True)
+    group_sizes = [len(rows) for rows in group_rows]
+
+    for col_name in ERROR_INFO_COLUMNS:
+        values = pd.Series([error_info[col_name] for error_info in error_infos]).repeat(group_sizes)
+        error_df.insert(0, col_name, values.to_numpy())
+
+    return error_df
+
+
+def prepare_error_log(error_log_path: Path, columns: List[str]) -> bool:
+    """
+    Make sure rows with the given columns can be appended to the error log.
+
+    A log whose header has other columns (written by another version of the pipeline or
+    with other options) is renamed to merge_errors.<timestamp>.csv, so rows never land
+    under the wrong header.
+
+    Parameters:
+        error_log_path: Path of the error log CSV
+        columns: Columns of the rows about to be written
+
+    Returns:
+        True if the log has to be (re)started with a header, False if the rows can be appended
+    """
+    if not error_log_path.exists():
+        return True
+
+    with open(error_log_path, encoding='utf-8', newline='') as log_file:
+        header = next(csv.reader(log_file), None)
+    if header is None or header == columns:
+        return header is None
+
+    previous_log = error_log_path.with_name(f"{error_log_path.stem}.{time.strftime('%Y%m%d-%H%M%S')}{error_log_path.suffix}")
+    error_log_path.rename(previous_log)
+    print(f"Error log columns changed, previous log moved to {previous_log}")
+    return True
+
+
+def _log_merge_errors(error_df: pd.DataFrame, n_error_groups: int, error_folder: Optional[Path] = None) -> None:
+    """
+    Append the rows of conflicting groups to the error log CSV in the error folder.
+
+    Parameters:
+        error_df: Original rows of all conflicting groups with the error metadata columns
+        n_error_groups: Number of conflicting groups
+        error_folder: Folder of the error log (default: DataPaths.error_folder)
+    """
+    # Set up error log path
+    error_log_path = Path(error_folder or DataPaths.error_folder) / "merge_errors.csv"
+
+    # Add a warning message
+    print(f"WARNING: Found {n_error_groups} groups with merge conflicts!")
+
+    # Append to the error log file if its columns match, otherwise start a new file
+    header = prepare_error_log(error_log_path, [str(col) for col in error_df.columns])
+    error_df.to_csv(error_log_path, mode='w' if header else 'a', header=header, index=False)
+
+    print(f"Logged {len(error_df)} rows with merge errors to {error_log_path}")
+
+
+def _merge_groupby(
+        df: pd.DataFrame,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]]
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Merge engine iterating over df.groupby(), one row dictionary per group.
+
+    Returns:
+        Tuple of (merged DataFrame, rows of the conflicting groups or None, number of conflicting groups)
+    """
     # Process each group individually
     groups = df.groupby(key_column)
     result_rows = []
@@ -454,7 +1049,6 @@ def merge_dataframe_rows(df: pd.DataFrame, key_column: str) -> pd.DataFrame:
 
     for key, group in groups:
         row_data = {key_column: key}
-        error_found = False
         error_info = None
 
         for col, agg_func in agg_dict.items():
@@ -462,60 +1056,654 @@ def merge_dataframe_rows(df: pd.DataFrame, key_column: str) -> pd.DataFrame:
                 # Apply the aggregation function
                 row_data[col] = agg_func(group[col])
             except ValueError as e:
-                error_message = str(e)
-                if error_message in ['Different brand values', 'Different eco_friendly values']:
-                    # Create error metadata
-                    error_info = {
-                        'error_message': error_message,
-                        'error_column': col,
-                        'group_size': len(group),
-                        'timestamp': pd.Timestamp.now(),
-                        'conflicting_values': '|'.join(str(v) for v in group[col].unique() if pd.notna(v))
-                    }
-
-                    error_found = True
-                    break
-                else:
+                if str(e) not in MERGE_CONFLICT_MESSAGES:
                     # Re-raise unexpected errors
                     raise
+                error_info = _conflict_info(str(e), col, group[col])
+                break
 
-        if error_found and error_info is not None:
+        if error_info is not None:
             # For error groups, save all original rows with additional error info columns
-            group_copy = group.copy()
+            error_groups.append(_error_group_frame(group, error_info))
+        else:
+            result_rows.append(row_data)
+
+    # Convert the result rows to a DataFrame
+    result_df = pd.DataFrame(result_rows) if result_rows else pd.DataFrame(columns=df.columns)
+
+    # Combine all error groups into one DataFrame
+    error_df = pd.concat(error_groups, ignore_index=True) if error_groups else None
+    return result_df, error_df, len(error_groups)
+
+
+def group_offsets(keys: pd.Series) -> Tuple[np.ndarray, np.ndarray, pd.Index]:
+    """
+    Sort rows by key once and compute the boundaries of every group.
+
+    Rows with a missing key are left out, like in DataFrame.groupby().
+
+    Parameters:
+        keys: Series of key values
+
+    Returns:
+        Tuple of (row positions sorted by key, group boundary offsets of length n_groups + 1, sorted unique keys)
+    """
+    codes, uniques = pd.factorize(keys, sort=True)
+
+    valid_rows = np.flatnonzero(codes >= 0)
+    order = valid_rows[np.argsort(codes[valid_rows], kind='stable')]
+
+    group_sizes = np.bincount(codes[order], minlength=len(uniques))
+    offsets = np.concatenate(([0], np.cumsum(group_sizes)))
+
+    return order, offsets, uniques
+
+
+def _aggregate_columns(
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        aggregate_column: Callable[[str, Set[int]], Tuple[np.ndarray, Dict[int, Dict[str, Any]]]],
+        workers: int = 1
+) -> Tuple[Dict[str, np.ndarray], Dict[int, Dict[str, Any]]]:
+    """
+    Run aggregate_column for every column: the conflict detection columns first, one after the other,
+    then the remaining columns in parallel on a thread pool when workers > 1.
+
+    Parameters:
+        agg_dict: Aggregation function per column
+        aggregate_column: Aggregates one column, skipping the given group indices;
+            returns (output array, conflict metadata per group index)
+        workers: Number of threads used for the columns without conflict detection
+
+    Returns:
+        Tuple of (output array per column, conflict metadata per group index)
+    """
+    outputs: Dict[str, np.ndarray] = {}
+    error_infos: Dict[int, Dict[str, Any]] = {}
+
+    def record_errors(errors: Dict[int, Dict[str, Any]]) -> None:
+        # The first column (in column order) reporting a conflict for a group is the one logged
+        for group_index, error_info in errors.items():
+            error_infos.setdefault(group_index, error_info)
+
+    # Conflicts decide which groups every other column can skip
+    for col in [c for c in agg_dict if agg_dict[c] in CONFLICT_AGGREGATIONS]:
+        outputs[col], errors = aggregate_column(col, set(error_infos))
+        record_errors(errors)
+
+    other_columns = [c for c in agg_dict if agg_dict[c] not in CONFLICT_AGGREGATIONS]
+    skip = set(error_infos)
+
+    def timed_column(col: str) -> Tuple[np.ndarray, Dict[int, Dict[str, Any]], float]:
+        # CPU time of the running thread, time spent waiting for the GIL is not counted
+        start = time.thread_time()
+        output, errors = aggregate_column(col, skip)
+        return output, errors, time.thread_time() - start
+
+    start = time.perf_counter()
+    if workers > 1 and len(other_columns) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(timed_column, other_columns))
+    else:
+        results = [timed_column(col) for col in other_columns]
+    wall_time = time.perf_counter() - start
+
+    for col, (output, errors, _) in zip(other_columns, results):
+        outputs[col] = output
+        record_errors(errors)
+
+    if workers > 1 and wall_time > 0:
+        speedup = sum(cpu_time for _, _, cpu_time in results) / wall_time
+        print(f"Aggregated {len(other_columns)} columns on {workers} threads in {wall_time:.2f}s "
+              f"(speedup {speedup:.2f}x, {speedup / workers:.2f}x per core)")
+
+    # Same column order as agg_dict
+    return {col: outputs[col] for col in agg_dict}, error_infos
+
+
+def _aggregate_slices(
+        df: pd.DataFrame,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        order: np.ndarray,
+        offsets: np.ndarray,
+        workers: int = 1
+) -> Tuple[Dict[str, np.ndarray], Dict[int, Dict[str, Any]]]:
+    """
+    Aggregate every column of the groups described by (order, offsets).
 
-            # Add error metadata columns at the beginning
-            for col_name in ['error_message', 'error_column', 'group_size', 'timestamp', 'conflicting_values']:
-                group_copy.insert(0, col_name, error_info[col_name])
+    Every column is taken once in group order; each group is then a contiguous
+    slice (a view, not a copy) of that array.
 
-            error_groups.append(group_copy)
+    Parameters:
+        df: DataFrame to merge
+        agg_dict: Aggregation function per column
+        order: Row positions sorted by group
+        offsets: Group boundaries in order (length n_groups + 1)
+        workers: Number of threads aggregating columns in parallel
+
+    Returns:
+        Tuple of (one preallocated output array per column, conflict metadata per group index)
+    """
+    n_groups = len(offsets) - 1
+    bounds = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+
+    def aggregate_column(col: str, skip: Set[int]) -> Tuple[np.ndarray, Dict[int, Dict[str, Any]]]:
+        agg_func = agg_dict[col]
+        values = df[col].to_numpy(dtype=object).take(order)
+        output = np.empty(n_groups, dtype=object)
+        errors: Dict[int, Dict[str, Any]] = {}
+
+        for group_index, (start, end) in enumerate(bounds):
+            if group_index in skip or group_index in errors:
+                continue
+            try:
+                output[group_index] = agg_func(values[start:end])
+            except ValueError as e:
+                if str(e) not in MERGE_CONFLICT_MESSAGES:
+                    raise
+                errors[group_index] = _conflict_info(str(e), col, values[start:end])
+
+        return output, errors
+
+    return _aggregate_columns(agg_dict, aggregate_column, workers)
+
+
+def _aggregate_pairs(
+        df: pd.DataFrame,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        first_rows: np.ndarray,
+        second_rows: np.ndarray,
+        workers: int = 1
+) -> Tuple[Dict[str, np.ndarray], Dict[int, Dict[str, Any]]]:
+    """
+    Aggregate every column of two-row groups with the vectorized PAIRWISE_KERNELS.
+
+    Parameters:
+        df: DataFrame to merge
+        agg_dict: Aggregation function per column
+        first_rows: Position of the first row of every pair
+        second_rows: Position of the second row of every pair
+        workers: Number of threads aggregating columns in parallel
+
+    Returns:
+        Tuple of (one output array per column, conflict metadata per pair index)
+    """
+    n_pairs = len(first_rows)
+
+    def aggregate_column(col: str, skip: Set[int]) -> Tuple[np.ndarray, Dict[int, Dict[str, Any]]]:
+        agg_func = agg_dict[col]
+        values = df[col].to_numpy(dtype=object)
+        first, second = values.take(first_rows), values.take(second_rows)
+        errors: Dict[int, Dict[str, Any]] = {}
+
+        if agg_func in PAIRWISE_CONFLICT_CHECKS:
+            conflict_check, error_message = PAIRWISE_CONFLICT_CHECKS[agg_func]
+            for pair_index in np.flatnonzero(conflict_check(first, second)).tolist():
+                if pair_index not in skip:
+                    errors[pair_index] = _conflict_info(
+                        error_message, col, _pair_values(first[pair_index], second[pair_index])
+                    )
+
+        if agg_func in PAIRWISE_KERNELS:
+            return PAIRWISE_KERNELS[agg_func](first, second), errors
+
+        # No kernel (custom aggregation): call the function pair by pair
+        output = np.empty(n_pairs, dtype=object)
+        for pair_index in range(n_pairs):
+            if pair_index in skip or pair_index in errors:
+                continue
+            try:
+                output[pair_index] = agg_func(_pair_values(first[pair_index], second[pair_index]))
+            except ValueError as e:
+                if str(e) not in MERGE_CONFLICT_MESSAGES:
+                    raise
+                errors[pair_index] = _conflict_info(str(e), col, _pair_values(first[pair_index], second[pair_index]))
+        return output, errors
+
+    return _aggregate_columns(agg_dict, aggregate_column, workers)
+
+
+def _assemble_result(
+        df: pd.DataFrame,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        uniques: pd.Index,
+        outputs: Dict[str, Union[np.ndarray, pa.Array]],
+        error_infos: Dict[int, Dict[str, Any]],
+        order: np.ndarray,
+        offsets: np.ndarray
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Build the merged DataFrame from the per-column outputs, leaving out conflicting groups.
+
+    Returns:
+        Tuple of (merged DataFrame, rows of the conflicting groups or None, number of conflicting groups)
+    """
+    error_df = None
+    if error_infos:
+        error_indices = sorted(error_infos)
+        error_df = _error_rows_frame(
+            df,
+            [order[offsets[group_index]:offsets[group_index + 1]] for group_index in error_indices],
+            [error_infos[group_index] for group_index in error_indices]
+        )
+
+    keep = np.ones(len(uniques), dtype=bool)
+    keep[list(error_infos)] = False
+    if not keep.any():
+        return pd.DataFrame(columns=df.columns), error_df, len(error_infos)
+
+    # Same column order as the row dictionaries of the groupby engine
+    result_df = pd.DataFrame({key_column: uniques[keep]})
+    for col in agg_dict:
+        if isinstance(outputs[col], pa.Array):
+            result_df[col] = pd.arrays.ArrowExtensionArray(outputs[col].filter(pa.array(keep)))
         else:
-            result_rows.append(row_data)
+            result_df[col] = outputs[col][keep]
 
-    # Save errors to CSV if any were found
-    if error_groups:
-        # Add a warning message
-        print(f"WARNING: Found {len(error_groups)} groups with merge conflicts!")
+    return result_df.infer_objects(), error_df, len(error_infos)
 
-        # Combine all error groups into one DataFrame
-        error_df = pd.concat(error_groups, ignore_index=True)
 
-        # Check if error log already exists
-        mode = 'a' if error_log_path.exists() else 'w'
-        header = not error_log_path.exists()
+def _merge_sorted(
+        df: pd.DataFrame,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        workers: int = 1,
+        groups: Optional[Tuple[np.ndarray, np.ndarray, pd.Index]] = None
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Merge engine that sorts the rows by key once and aggregates plain numpy slices.
 
-        # Append to the error log file if it exists, otherwise create new file
-        error_df.to_csv(error_log_path, mode=mode, header=header, index=False)
+    Results are written column by column into preallocated object arrays,
+    conflict detection columns first.
 
-        print(f"Logged {len(error_df)} rows with merge errors to {error_log_path}")
+    Parameters:
+        groups: (row order, group offsets, group keys) of df as returned by group_offsets, computed if None
 
-    # Convert the result rows to a DataFrame
-    result_df = pd.DataFrame(result_rows) if result_rows else pd.DataFrame(columns=df.columns)
+    Returns:
+        Tuple of (merged DataFrame, rows of the conflicting groups or None, number of conflicting groups)
+    """
+    order, offsets, uniques = groups if groups is not None else group_offsets(df[key_column])
+    outputs, error_infos = _aggregate_slices(df, agg_dict, order, offsets, workers)
+    return _assemble_result(df, key_column, agg_dict, uniques, outputs, error_infos, order, offsets)
+
+
+def _merge_pairwise(
+        df: pd.DataFrame,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        workers: int = 1,
+        groups: Optional[Tuple[np.ndarray, np.ndarray, pd.Index]] = None
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Merge engine that splits groups by size: all two-row groups are merged at once by the
+    vectorized PAIRWISE_KERNELS, the remaining groups go through the sorted engine path.
+
+    Parameters:
+        groups: group_offsets of df[key_column], computed if None
+
+    Returns:
+        Tuple of (merged DataFrame, rows of the conflicting groups or None, number of conflicting groups)
+    """
+    order, offsets, uniques = groups if groups is not None else group_offsets(df[key_column])
+    group_sizes = np.diff(offsets)
+    is_pair = group_sizes == 2
+
+    outputs = {col: np.empty(len(uniques), dtype=object) for col in agg_dict}
+    error_infos: Dict[int, Dict[str, Any]] = {}
+
+    # General path: groups that don't have exactly two rows
+    general_groups = np.flatnonzero(~is_pair)
+    if len(general_groups):
+        general_order = order[np.repeat(~is_pair, group_sizes)]
+        general_offsets = np.concatenate(([0], np.cumsum(group_sizes[general_groups])))
+        general_outputs, general_errors = _aggregate_slices(df, agg_dict, general_order, general_offsets, workers)
+
+        for col, output in general_outputs.items():
+            outputs[col][general_groups] = output
+        error_infos.update({int(general_groups[i]): info for i, info in general_errors.items()})
+
+    # Fast path: two aligned arrays holding the first and second row of every pair
+    pair_groups = np.flatnonzero(is_pair)
+    if len(pair_groups):
+        first_rows = order[offsets[pair_groups]]
+        second_rows = order[offsets[pair_groups] + 1]
+        pair_outputs, pair_errors = _aggregate_pairs(df, agg_dict, first_rows, second_rows, workers)
+
+        for col, output in pair_outputs.items():
+            outputs[col][pair_groups] = output
+        error_infos.update({int(pair_groups[i]): info for i, info in pair_errors.items()})
+
+    return _assemble_result(df, key_column, agg_dict, uniques, outputs, error_infos, order, offsets)
+
+
+def _merge_arrow(
+        df: pd.DataFrame,
+        key_column: str,
+        agg_dict: Dict[str, Callable[[ValueSeries], Any]],
+        workers: int = 1,
+        groups: Optional[Tuple[np.ndarray, np.ndarray, pd.Index]] = None
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Merge engine for Arrow-backed DataFrames (read with types_mapper=pd.ArrowDtype).
+
+    Every column is taken once in key order as an Arrow array and aggregated by its ARROW_KERNELS
+    entry, so list and list<struct> columns are never turned into Python objects.
+    Columns that are not Arrow-backed are converted first.
+
+    Parameters:
+        groups: group_offsets of df[key_column], computed if None
+
+    Returns:
+        Tuple of (merged DataFrame, rows of the conflicting groups or None, number of conflicting groups)
+    """
+    order, offsets, uniques = groups if groups is not None else group_offsets(df[key_column])
+    row_groups = np.repeat(np.arange(len(uniques)), np.diff(offsets))
+    take = pa.array(order)
+
+    def aggregate_column(col: str, skip: Set[int]) -> Tuple[pa.Array, Dict[int, Dict[str, Any]]]:
+        agg_func = agg_dict[col]
+        if isinstance(df[col].dtype, pd.ArrowDtype):
+            values = to_arrow_array(df[col]).take(take)
+        else:
+            objects = df[col].to_numpy(dtype=object).take(order)
+            if agg_func == merge_arrays_dictionary and not shared_key_set(objects):
+                # As structs every dictionary would get the keys of all the others
+                return _apply_per_group(agg_func, objects, offsets), {}
+            values = pa.array(objects, from_pandas=True)
+        errors: Dict[int, Dict[str, Any]] = {}
+
+        if agg_func in ARROW_CONFLICT_CHECKS:
+            conflict_check, error_message = ARROW_CONFLICT_CHECKS[agg_func]
+            for group_index in np.flatnonzero(conflict_check(values, offsets, row_groups)).tolist():
+                if group_index not in skip:
+                    group_values = values.slice(offsets[group_index], offsets[group_index + 1] - offsets[group_index])
+                    errors[group_index] = _conflict_info(error_message, col, group_values.to_pylist())
+
+        if agg_func in ARROW_KERNELS:
+            try:
+                return ARROW_KERNELS[agg_func](values, offsets, row_groups), errors
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                # Column type the kernel does not support (e.g. numbers in a text column)
+                pass
+        return _apply_per_group(agg_func, values, offsets), errors
+
+    outputs, error_infos = _aggregate_columns(agg_dict, aggregate_column, workers)
+    return _assemble_result(df, key_column, agg_dict, uniques, outputs, error_infos, order, offsets)
+
+
+# ========== Engine Selection (engine='auto') ==========
+
+# Share of the groups with exactly two rows from which the pairwise engine is chosen
+AUTO_PAIR_SHARE = 0.5
+
+# Share of the columns that must be Arrow-backed for the arrow engine
+AUTO_ARROW_SHARE = 0.5
+
+# Memory the in-memory engines need on top of the input (column arrays in key order plus the output), per byte of input
+AUTO_PEAK_FACTOR = 1.0
+
+# Share of the available memory the loaded frame and the in-memory engines may use before the parquet
+# file is merged by DuckDB instead (scanned from disk, spills to disk)
+AUTO_MEMORY_SHARE = 0.8
+
+# Rows from which the arrow engine aggregates columns on several threads (its kernels release the GIL)
+AUTO_PARALLEL_ROWS = 100_000
+
+# Rows sampled to measure the column widths
+AUTO_SAMPLE_ROWS = 1_000
+
+
+def _available_memory() -> Optional[int]:
+    """
+    Memory available to new allocations in bytes: MemAvailable of /proc/meminfo (free memory plus the
+    page cache and buffers the kernel can reclaim), psutil where there is no /proc (e.g. macOS, Windows),
+    None if neither can tell.
+    """
+    try:
+        with open('/proc/meminfo', encoding='ascii') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if importlib.util.find_spec('psutil'):
+        import psutil
+        return int(psutil.virtual_memory().available)
+    return None
+
+
+def select_parquet_engine(path: Union[str, Path], workers: int = 1, arrow_native: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Decide before loading a parquet file whether it is merged in memory or scanned by DuckDB.
+
+    The size of the loaded frame is estimated from the first AUTO_SAMPLE_ROWS rows (converted
+    like load_dataframe does) and the row count of the file metadata. DuckDB
+    (src.duckdb_engine.duckdb_merge_parquet) is chosen when the frame plus the extra memory of the
+    in-memory engines would not fit in AUTO_MEMORY_SHARE of the available memory: it reads the file
+    itself and spills to disk, the rows are never loaded into pandas.
+
+    Parameters:
+        path: Parquet file to deduplicate
+        workers: Worker count given by the caller, kept if > 1
+        arrow_native: The file would be loaded with Arrow-backed dtypes
+
+    Returns:
+        Selection dictionary like select_engine ('engine' is 'duckdb') when the file should be scanned
+        by DuckDB, None when it fits in memory (load it and use select_engine) or duckdb is not installed
+    """
+    parquet_file = pq.ParquetFile(path)
+    rows = parquet_file.metadata.num_rows
+    sample = next(parquet_file.iter_batches(batch_size=AUTO_SAMPLE_ROWS), None)
+    if sample is None or not importlib.util.find_spec('duckdb'):
+        return None
+
+    sample_df = sample.to_pandas(types_mapper=pd.ArrowDtype if arrow_native else None)
+    bytes_per_row = int(sample_df.memory_usage(deep=True, index=False).sum() / max(len(sample_df), 1))
+    frame_bytes = bytes_per_row * rows
+    stats: Dict[str, Any] = {
+        'rows': rows,
+        'bytes_per_row': bytes_per_row,
+        'working_set_bytes': int(frame_bytes * (1 + AUTO_PEAK_FACTOR)),
+        'available_memory_bytes': _available_memory(),
+    }
+    if stats['available_memory_bytes'] is None or stats['working_set_bytes'] <= stats['available_memory_bytes'] * AUTO_MEMORY_SHARE:
+        return None
+
+    reason = (f"loading and merging {rows:,} rows in memory needs ~{stats['working_set_bytes'] / 2 ** 20:,.0f} MB, "
+              f"more than {AUTO_MEMORY_SHARE:.0%} of the {stats['available_memory_bytes'] / 2 ** 20:,.0f} MB available, "
+              f"DuckDB scans the parquet file and spills to disk")
+    return {'engine': 'duckdb', 'workers': workers if workers > 1 else (os.cpu_count() or 1), 'reason': reason, **stats}
+
+
+def select_engine(df: pd.DataFrame, key_column: str, workers: int = 1) -> Dict[str, Any]:
+    """
+    Choose the merge engine and worker count from the shape of the data.
+
+    Group sizes are counted over all keys (one vectorized factorize), column widths
+    are measured on a sample of rows. Rules, first match wins:
+        1. mostly Arrow-backed columns -> 'arrow', several threads on large frames
+        2. mostly two-row groups -> 'pairwise'
+        3. otherwise -> 'sorted' (per-group loop over sorted slices)
+
+    DuckDB is never chosen here: the frame is already in memory and the duckdb engine
+    would copy it into Arrow. Files too large to load are sent to DuckDB before loading
+    by select_parquet_engine.
+
+    Parameters:
+        df: DataFrame to merge
+        key_column: Column to use as the grouping key
+        workers: Worker count given by the caller, kept if > 1
+
+    Returns:
+        Dictionary with the chosen 'engine', 'workers', the 'reason' and the statistics it is based on
+    """
+    codes, _ = pd.factorize(df[key_column])
+    group_sizes = np.bincount(codes[codes >= 0]) if (codes >= 0).any() else np.array([], dtype=np.int64)
+
+    sample = df.sample(n=min(len(df), AUTO_SAMPLE_ROWS), random_state=0)
+    bytes_per_row = int(sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1))
+    arrow_columns = sum(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
+    array_columns = get_array_aggregation_dict()
+    nested_columns = sum(col in array_columns for col in df.columns)
+
+    stats: Dict[str, Any] = {
+        'rows': len(df),
+        'groups': len(group_sizes),
+        'pair_share': float((group_sizes == 2).mean()) if len(group_sizes) else 0.0,
+        'mean_group_size': float(group_sizes.mean()) if len(group_sizes) else 0.0,
+        'largest_group': int(group_sizes.max()) if len(group_sizes) else 0,
+        'columns': len(df.columns),
+        'arrow_columns': int(arrow_columns),
+        'nested_columns': int(nested_columns),
+        'bytes_per_row': bytes_per_row,
+        'working_set_bytes': int(bytes_per_row * len(df) * AUTO_PEAK_FACTOR),
+    }
+
+    cpus = os.cpu_count() or 1
+    if arrow_columns >= AUTO_ARROW_SHARE * len(df.columns):
+        engine = 'arrow'
+        chosen_workers = min(cpus, 8) if len(df) >= AUTO_PARALLEL_ROWS else 1
+        reason = f"{arrow_columns} of {len(df.columns)} columns are Arrow-backed"
+    elif stats['pair_share'] >= AUTO_PAIR_SHARE:
+        engine, chosen_workers = 'pairwise', 1
+        reason = f"{stats['pair_share']:.0%} of the {stats['groups']:,} groups have two rows"
+    else:
+        engine, chosen_workers = 'sorted', 1
+        reason = (f"groups average {stats['mean_group_size']:.1f} rows (largest {stats['largest_group']:,}), "
+                  f"only {stats['pair_share']:.0%} are pairs")
+
+    return {'engine': engine, 'workers': workers if workers > 1 else chosen_workers, 'reason': reason, **stats}
+
+
+def merge_lineage(
+        df: pd.DataFrame,
+        key_column: str,
+        result_df: pd.DataFrame,
+        groups: Optional[Tuple[np.ndarray, np.ndarray, pd.Index]] = None
+) -> RowLineage:
+    """
+    Lineage of a merge: the row positions in df of every row of result_df, matched by key.
+
+    Parameters:
+        df: DataFrame that was merged
+        key_column: Grouping key of the merge
+        result_df: Output of the merge (one row per key, any order)
+        groups: group_offsets of df[key_column] if already computed
+
+    Returns:
+        RowLineage aligned with the rows of result_df
+    """
+    order, offsets, uniques = groups if groups is not None else group_offsets(df[key_column])
+    groups = uniques.get_indexer(pd.Index(result_df[key_column]))
+    if (groups < 0).any():
+        raise ValueError("Merged keys not found in the source DataFrame")
+    return RowLineage.from_groups(order, offsets, groups)
+
+
+def merge_dataframe_rows(
+        df: pd.DataFrame,
+        key_column: str,
+        engine: str = 'groupby',
+        workers: int = 1,
+        return_lineage: bool = False,
+        report: Optional[Dict[str, Any]] = None,
+        profile: Optional[AggregationProfiler] = None,
+        error_folder: Optional[Path] = None
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, RowLineage]]:
+    """
+    Merge rows in a DataFrame that share the same key value.
+    Logs any merging errors to a CSV file in the error folder for later analysis.
+    Appends to the existing error log if one exists.
+    Handles missing columns by skipping them.
+
+    Engines:
+        'groupby': iterate over df.groupby(), one sub-DataFrame per group (default)
+        'sorted': sort by key once and pass numpy slices of each column to the aggregation functions
+        'pairwise': vectorized merge of all two-row groups at once, other groups as in 'sorted'
+        'arrow': Arrow compute kernels on Arrow-backed columns, nested values stay Arrow lists/structs
+        'duckdb': one SQL query in an in-process DuckDB database (src.duckdb_engine, needs the duckdb package)
+        'auto': one of the above and the worker count chosen from the shape of the data (see select_engine)
+
+    Parameters:
+        df: DataFrame to merge
+        key_column: Column to use as the grouping key
+        engine: Name of the merge engine, one of MERGE_ENGINES
+        workers: Number of threads aggregating columns in parallel ('sorted', 'pairwise' and 'arrow' engines),
+            number of DuckDB threads if > 1 ('duckdb' engine, all cores otherwise)
+        return_lineage: Also return the RowLineage mapping every merged row to its row positions in df
+        report: Run report dictionary, the engine selection of engine='auto' is stored under 'engine_selection'
+            and the profile summary under 'profile'
+        profile: Profile the aggregation functions (and sample stacks) of this merge (see src.profiling),
+            the caller prints its summary (print_summary)
+        error_folder: Folder of the merge error log (default: DataPaths.error_folder)
+
+    Returns:
+        DataFrame with merged rows (problematic groups excluded),
+        or a tuple of (merged DataFrame, RowLineage) if return_lineage is set
+    """
+    # Check if key_column exists in DataFrame
+    if key_column not in df.columns:
+        raise ValueError(f"Key column '{key_column}' not found in DataFrame")
+
+    if engine not in MERGE_ENGINES:
+        raise ValueError(f"engine must be one of {MERGE_ENGINES}")
+
+    # Handle empty DataFrame
+    if df.empty:
+        return (df.copy(), RowLineage.identity(np.array([], dtype=np.int32))) if return_lineage else df.copy()
+
+    if engine == 'auto':
+        selection = select_engine(df, key_column, workers)
+        engine, workers = selection['engine'], selection['workers']
+        if report is not None:
+            report['engine_selection'] = selection
+
+    agg_dict = build_aggregation_dict(df, key_column)
+
+    # Key order and group offsets, computed once for the engine, the profiler and the lineage
+    groups = None
+    if engine in ('sorted', 'pairwise', 'arrow') or profile is not None or return_lineage:
+        groups = group_offsets(df[key_column])
+
+    # Nothing is wrapped or sampled without a profiler
+    if profile is not None:
+        agg_dict = profile.wrap(agg_dict)
+        profile.start()
+
+    try:
+        if engine == 'sorted':
+            result_df, error_df, n_error_groups = _merge_sorted(df, key_column, agg_dict, workers, groups)
+        elif engine == 'pairwise':
+            result_df, error_df, n_error_groups = _merge_pairwise(df, key_column, agg_dict, workers, groups)
+        elif engine == 'arrow':
+            result_df, error_df, n_error_groups = _merge_arrow(df, key_column, agg_dict, workers, groups)
+        elif engine == 'duckdb':
+            # Imported here, duckdb is only needed by this engine
+            from src.duckdb_engine import _merge_duckdb
+            result_df, error_df, n_error_groups = _merge_duckdb(df, key_column, agg_dict, workers)
+        else:
+            result_df, error_df, n_error_groups = _merge_groupby(df, key_column, agg_dict)
+    finally:
+        if profile is not None:
+            profile.stop()
+
+    if profile is not None:
+        profile.resolve_group_keys(df, groups)
+        if report is not None:
+            report['profile'] = profile.summary()
+
+    # Save errors to CSV if any were found
+    if error_df is not None:
+        _log_merge_errors(error_df, n_error_groups, error_folder)
 
-    # Handle potential None values in array columns
-    for col in array_agg_dict:
-        if col in result_df.columns:
+    # Handle potential None values in array columns (Arrow-backed columns hold empty lists instead)
+    for col in get_array_aggregation_dict():
+        if col in result_df.columns and not isinstance(result_df[col].dtype, pd.ArrowDtype):
             result_df[col] = result_df[col].apply(
                 lambda x: np.array([]) if x is None else x
             )
 
-    return result_df
\ No newline at end of file
+    if return_lineage:
+        return result_df, merge_lineage(df, key_column, result_df, groups)
+    return result_df
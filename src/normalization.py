@@ -0,0 +1,198 @@
+"""
+Normalization Cache
+------------------------------
+Memoizes the parsing of pipe-joined fields (unspsc).
+
+The same few thousand category strings show up again and again across groups
+and runs. Each raw string is parsed once into a tuple of canonical parts, so
+merging a group becomes a set union of already split and stripped parts and the
+joined string is only rebuilt once per output row.
+
+The raw string -> parts mapping is a bounded LRU (functools.lru_cache). Equal
+parts share one string object (sys.intern), which is freed with the last entry
+using it. The entries can be saved to and loaded from a JSON file to be reused
+by the next run.
+
+Usage:
+   from src.normalization import UNSPSC_CACHE, load_normalization_caches, save_normalization_caches
+
+   * Parse and join through a cache
+   parts = set(UNSPSC_CACHE.parts('Pumps | Valves'))
+   parts.update(UNSPSC_CACHE.parts('Valves'))
+   joined = UNSPSC_CACHE.join(parts)  # 'Pumps | Valves'
+
+   * Reuse the caches between runs
+   load_normalization_caches()
+   ...
+   save_normalization_caches()
+"""
+
+import functools
+import json
+import sys
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from src.path import DataPaths
+
+PIPE_SEPARATOR = ' | '
+
+
+class NormalizationCache:
+    """
+    Bounded LRU cache from a raw string to its canonical parts.
+
+    With a separator the raw string is split on it, every part is stripped and
+    empty / 'nan' parts are dropped (merge_unspsc rules). Without a separator
+    the whole string is a single part.
+
+    parts(raw) returns the tuple of unique parts of a raw string, it is a
+    functools.lru_cache so cache hits never leave C code.
+
+    The lru_cache cannot list its entries, so the most recently parsed ones are
+    also kept in _recent (for to_dict), and entries loaded from disk wait in
+    _loaded until their first lookup. Both point to the same tuples as the LRU
+    and hold at most maxsize entries each, so memory stays bounded by maxsize.
+    """
+
+    def __init__(self, separator: Optional[str] = PIPE_SEPARATOR, maxsize: int = 100_000):
+        self.separator = separator
+        self.maxsize = maxsize
+        self.parsed = 0
+
+        # Entries loaded from disk, used instead of parsing on their first lookup
+        self._loaded: Dict[str, Tuple[str, ...]] = {}
+        # Most recently added entries, the part of the cache that is saved to disk
+        self._recent: 'OrderedDict[str, Tuple[str, ...]]' = OrderedDict()
+        # Columns are aggregated by several threads, misses update shared state
+        self._lock = threading.Lock()
+
+        self.parts: Callable[[str], Tuple[str, ...]] = functools.lru_cache(maxsize=maxsize)(self._parse)
+
+    def __len__(self) -> int:
+        return self.parts.cache_info().currsize
+
+    @property
+    def hits(self) -> int:
+        return self.parts.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        return self.parts.cache_info().misses
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the lookups answered by the cache, 0.0 before the first lookup."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        """Drop every entry and reset the statistics (the entries loaded from disk too)."""
+        with self._lock:
+            self.parts.cache_clear()
+            self._loaded.clear()
+            self._recent.clear()
+            self.parsed = 0
+
+    def _parse(self, raw: str) -> Tuple[str, ...]:
+        with self._lock:
+            parts = self._loaded.pop(raw, None)
+            if parts is None:
+                self.parsed += 1
+                if self.separator is None:
+                    split = [raw] if raw else []
+                else:
+                    split = [part.strip() for part in raw.split(self.separator)]
+                    split = [part for part in split if part and part != 'nan']
+                parts = tuple(dict.fromkeys(sys.intern(part) for part in split))
+
+            self._recent[raw] = parts
+            if len(self._recent) > self.maxsize:
+                self._recent.popitem(last=False)
+            return parts
+
+    def join(self, parts: Iterable[str]) -> str:
+        """
+        Rebuild the joined string of a set of parts.
+
+        Parameters:
+            parts: Parts returned by parts()
+
+        Returns:
+            Sorted parts joined with " | ", empty string if there are none
+        """
+        return PIPE_SEPARATOR.join(sorted(parts))
+
+    def to_dict(self) -> Dict[str, list]:
+        """Serializable state: up to maxsize entries, oldest first."""
+        with self._lock:
+            entries = list(self._loaded.items()) + [item for item in self._recent.items() if item[0] not in self._loaded]
+            return {'entries': [[raw, list(parts)] for raw, parts in entries[-self.maxsize:]]}
+
+    def update_from_dict(self, state: Dict[str, list]) -> None:
+        """Add the entries of a state saved with to_dict()."""
+        with self._lock:
+            for raw, parts in state.get('entries', [])[-self.maxsize:]:
+                self._loaded[raw] = tuple(sys.intern(part) for part in parts)
+            # Several loads keep the newest maxsize entries
+            for raw in list(self._loaded)[:max(len(self._loaded) - self.maxsize, 0)]:
+                del self._loaded[raw]
+
+
+UNSPSC_CACHE = NormalizationCache(separator=PIPE_SEPARATOR)
+
+# Caches saved / loaded together, by name
+NORMALIZATION_CACHES: Dict[str, NormalizationCache] = {
+    'unspsc': UNSPSC_CACHE,
+}
+
+
+def load_normalization_caches(path: Optional[Path] = None) -> bool:
+    """
+    Fill the normalization caches from a file written by save_normalization_caches.
+
+    Parameters:
+        path: JSON file (default: DataPaths.file_normalization_cache)
+
+    Returns:
+        True if the file existed and was loaded
+    """
+    path = Path(path or DataPaths.file_normalization_cache)
+    if not path.exists():
+        return False
+
+    with open(path, encoding='utf-8') as file:
+        states = json.load(file)
+
+    for name, cache in NORMALIZATION_CACHES.items():
+        if name in states:
+            cache.update_from_dict(states[name])
+
+    print(f"Loaded normalization cache from: {path} "
+          f"({', '.join(f'{name}: {len(cache._loaded):,}' for name, cache in NORMALIZATION_CACHES.items())} entries)")
+    return True
+
+
+def save_normalization_caches(path: Optional[Path] = None) -> Path:
+    """
+    Write the normalization caches to a JSON file.
+
+    Parameters:
+        path: JSON file (default: DataPaths.file_normalization_cache)
+
+    Returns:
+        Path to the saved file
+    """
+    path = Path(path or DataPaths.file_normalization_cache)
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({name: cache.to_dict() for name, cache in NORMALIZATION_CACHES.items()}, file)
+
+    for name, cache in NORMALIZATION_CACHES.items():
+        print(f"Normalization cache {name}: {cache.hits:,} hits ({cache.hit_rate:.1%}), {cache.parsed:,} strings parsed")
+    print(f"Saved normalization cache to: {path}")
+    return path
@@ -0,0 +1,134 @@
+"""
+Optimized Merge
+------------------------------
+Product-centric deduplication of a cleaned DataFrame: rows with the same
+product_title are merged by src.merge.merge_dataframe_rows, the rows whose
+title is unique or missing are passed through (a missing title is no evidence
+that two rows are the same product).
+
+Only the duplicate rows are taken out of the input for the merge; the output
+is assembled column by column from the merged rows and the unique rows.
+
+Usage:
+   from src.optimize import optimized_merge
+
+   * Deduplicate a cleaned DataFrame
+   final_df = optimized_merge(clean_columns(df), engine='sorted')
+
+   * With the row lineage (positions in df of every output row)
+   final_df, lineage = optimized_merge(df, return_lineage=True)
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.merge import merge_dataframe_rows, build_aggregation_dict
+from src.lineage import RowLineage
+from src.profiling import AggregationProfiler
+from tools.duplicate_report import export_duplicate_report
+
+
+def _assemble_rows(merged_df: pd.DataFrame, df: pd.DataFrame, unique_rows: np.ndarray, columns: List[str]) -> pd.DataFrame:
+    """
+    Build the output frame: merged rows first, then the unique rows of df, one column at a time.
+
+    Object columns are written into a preallocated array, the unique rows are gathered
+    straight from df into it. Other columns (string, Arrow) are concatenated per column,
+    Arrow chunks are chained without copying the merged values. At most one column of
+    unique rows is copied besides the output.
+    """
+    n_merged = len(merged_df)
+    data: Dict[str, Any] = {}
+    for col in columns:
+        merged_values, source = merged_df[col], df[col]
+        if merged_values.dtype == object and source.dtype == object:
+            values = np.empty(n_merged + len(unique_rows), dtype=object)
+            values[:n_merged] = merged_values.to_numpy()
+            np.take(source.to_numpy(), unique_rows, out=values[n_merged:])
+            data[col] = values
+        else:
+            data[col] = pd.concat([merged_values, source.take(unique_rows)], ignore_index=True)
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def optimized_merge(
+        df: pd.DataFrame,
+        engine: str = 'groupby',
+        workers: int = 1,
+        return_lineage: bool = False,
+        report_dir: Optional[Path] = None,
+        report_sample: Optional[int] = None,
+        report_csv: bool = False,
+        run_report: Optional[Dict[str, Any]] = None,
+        profile: Optional[AggregationProfiler] = None,
+        error_folder: Optional[Path] = None
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, RowLineage]]:
+    """
+    Product-centric optimized merge that consolidates products regardless of vendor.
+
+    Rows are grouped by product_title, rows without a title are kept as unique rows. Only the
+    duplicate rows are taken out of df for the merge, df itself is not modified and the unique
+    rows are copied once, into the output.
+
+    Args:
+        df: Input DataFrame
+        engine: Merge engine passed to merge_dataframe_rows
+        workers: Number of threads aggregating columns in parallel
+        return_lineage: Also return the RowLineage mapping every output row to its row positions in df
+        report_dir: If set, write the duplicates_before_merge / duplicates_after_merge reports there
+        report_sample: Limit the reports to this many randomly chosen merged groups
+        report_csv: Also write the reports as CSV (parquet only by default)
+        run_report: Run report dictionary filled by merge_dataframe_rows (e.g. the engine chosen by engine='auto')
+        profile: Profiler of the aggregation functions passed to merge_dataframe_rows (see src.profiling)
+        error_folder: Folder of the merge error log (default: DataPaths.error_folder)
+
+    Returns:
+        DataFrame with merged rows (merged groups first, then the unique rows, new RangeIndex),
+        or a tuple of (DataFrame, RowLineage) if return_lineage is set
+    """
+    # Identify duplicate products
+    # keep=False marks all duplicates, duplicated() counts missing titles as one title
+    duplicates_mask = (df['product_title'].duplicated(keep=False) & df['product_title'].notna()).to_numpy()
+    duplicate_rows = np.flatnonzero(duplicates_mask)
+    unique_rows = np.flatnonzero(~duplicates_mask)
+
+    # The duplicate rows are the only part of df taken out, the merge groups them by product_title
+    duplicates_df = df.take(duplicate_rows)
+
+    # The merge groups are only mapped back to rows for the lineage and the duplicate reports
+    need_lineage = return_lineage or report_dir is not None
+    merged_lineage = None
+
+    # Process duplicates if they exist
+    if len(duplicates_df) > 0:
+        merged = merge_dataframe_rows(
+            duplicates_df, key_column='product_title', engine=engine, workers=workers, return_lineage=need_lineage,
+            report=run_report, profile=profile, error_folder=error_folder
+        )
+        merged_df, merged_lineage = merged if need_lineage else (merged, None)
+        # The key stands in for merge_text_longest of the (identical) titles, which drops empty titles
+        merged_df['product_title'] = merged_df['product_title'].mask(merged_df['product_title'] == '')
+    else:
+        # If no duplicates, use empty DataFrame with same columns
+        merged_df = pd.DataFrame(columns=df.columns)
+        merged_lineage = RowLineage.identity(np.array([], dtype=np.int32))
+
+    # Reports come from the merged groups, no second duplicated() / groupby() pass
+    if report_dir is not None:
+        export_duplicate_report(duplicates_df, merged_df, merged_lineage, report_dir,
+                                sample_groups=report_sample, csv=report_csv)
+    del duplicates_df
+
+    # Merged rows keep the column order of the aggregation, product_title at its own place
+    columns = list(build_aggregation_dict(df, key_column=None)) if len(merged_df) > 0 else list(df.columns)
+    final_df = _assemble_rows(merged_df, df, unique_rows, columns)
+
+    if return_lineage:
+        # Positions within duplicates_df back to positions within df
+        merged_lineage.source_rows = duplicate_rows[merged_lineage.source_rows].astype(np.int32)
+        unique_lineage = RowLineage.identity(unique_rows)
+        return final_df, RowLineage.concat([merged_lineage, unique_lineage])
+
+    return final_df
@@ -37,6 +37,9 @@ class DataPaths(types.SimpleNamespace):
     parquet_merge_url_title_dir = parquet_processed_dir / '2_merge_url_title'
     parquet_merge_title_domain_dir = parquet_processed_dir / '3_merge_title_domain'
 
+    # Duplicates before / after merge reports of optimized_merge
+    duplicate_report_dir = parquet_dir / 'report'
+
 
     # Visualization data (CSV)
     visualization_dir = data_dir / 'visualization'
@@ -55,10 +58,22 @@ class DataPaths(types.SimpleNamespace):
     # Error Folder
     error_folder = data_dir / 'error'
 
+    # Profiles of the merge (collapsed stacks of main(profile=True))
+    profile_dir = data_dir / 'profile'
+
+    # Cache Folder (reused between runs)
+    cache_dir = data_dir / 'cache'
+
     # File paths
     file_parquet_original = parquet_raw_dir / 'veridion_product_deduplication_challenge.snappy.parquet'
     file_parquet_clean = parquet_clean_data_dir / 'clean_data.snappy.parquet'
+    # Final data of main(), one path per parquet_layout ('default', 'query', 'partitioned' dataset directory)
     file_parquet_final = parquet_final_dir / 'final_data.snappy.parquet'
+    file_parquet_final_query = parquet_final_dir / 'final_data.zstd.parquet'
+    dir_parquet_final_partitioned = parquet_final_dir / 'final_data'
+    # Lineage sidecar of the final data (offsets.npy / source_rows.npy)
+    lineage_final_dir = parquet_final_dir / 'final_data_lineage'
+    file_normalization_cache = cache_dir / 'normalization_cache.json'
 
 
 
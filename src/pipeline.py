@@ -0,0 +1,249 @@
+"""
+Pipelined Batch Runner
+------------------------------
+Deduplicates a set of key-complete batches with reading, merging and writing
+overlapped instead of one after another.
+
+1. Reader thread: decodes the next batches from parquet (pyarrow releases the GIL while decoding)
+2. Compute stage (calling thread): clean_columns, identifier extraction, optimized_merge
+3. Writer thread: writes every merged batch as its own parquet file
+
+The stages are connected by bounded queues: the reader stays at most read_depth
+batches ahead of the merge, and at most write_depth merged batches wait for the
+writer, which caps the memory of the batches in flight.
+
+Batches must be key-complete (every row of a key in the same batch), otherwise
+duplicates across batches are not merged. The partition folders (partition=*)
+of a run_shards spill directory are key-complete, and so are files
+partitioned by key upstream.
+
+Every stage reports the time it was busy, starved (waiting for its input) and
+blocked (waiting for room in the next queue). The stage with the highest
+utilization (busy share of the run) is the bottleneck.
+
+Usage:
+   from src.pipeline import run_pipeline
+
+   * Merge the partitions of a kept run_shards spill directory (rows already cleaned)
+   stats = run_pipeline('data/spill/', 'data/parquet/final/batches/', clean=False)
+
+   * Key-partitioned raw files, read up to 4 batches ahead
+   stats = run_pipeline('data/parquet/by_key/*.parquet', output_dir, read_depth=4)
+
+   * From the command line
+   python -m src.pipeline <inputs> <output_dir> [engine]
+"""
+
+import queue
+import sys
+import threading
+import time
+
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from src.optimize import optimized_merge
+from src.process_columns import clean_columns
+from src.extract_identifiers import extract_description_identifiers
+from src.shards import PARTITION_FOLDER, resolve_shards, read_partition
+from tools.load_data import load_dataframe
+from tools.save_data import export_dataframe
+
+STAGES = ['reader', 'compute', 'writer']
+
+# How often a waiting stage checks whether another stage failed
+POLL_SECONDS = 0.1
+
+# End of the batch stream
+_DONE = object()
+
+
+def resolve_batches(inputs: Union[str, Path, List[Union[str, Path]]]) -> List[Path]:
+    """
+    Expand the pipeline input into key-complete batches.
+
+    Parameters:
+        inputs: run_shards spill directory (one batch per partition folder), or anything
+            resolve_shards accepts (one batch per parquet file)
+
+    Returns:
+        List of partition folders or parquet files, in processing order
+    """
+    if isinstance(inputs, (str, Path)) and Path(inputs).is_dir():
+        folders = sorted(Path(inputs).glob(PARTITION_FOLDER.format('*')), key=lambda folder: int(folder.name.split('=')[1]))
+        if folders:
+            return folders
+    return resolve_shards(inputs)
+
+
+def _new_stats() -> Dict[str, float]:
+    return {'batches': 0, 'busy_seconds': 0.0, 'starved_seconds': 0.0, 'blocked_seconds': 0.0}
+
+
+def _get(batch_queue: queue.Queue, stats: Dict[str, float], stop: threading.Event) -> Any:
+    """Next item of the queue, _DONE once another stage failed. Waiting counts as starved."""
+    start = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                return batch_queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+    finally:
+        stats['starved_seconds'] += time.perf_counter() - start
+
+
+def _put(batch_queue: queue.Queue, item: Any, stats: Dict[str, float], stop: threading.Event) -> bool:
+    """Put an item in the queue, False once another stage failed. Waiting counts as blocked."""
+    start = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                batch_queue.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+    finally:
+        stats['blocked_seconds'] += time.perf_counter() - start
+
+
+def _run_stage(
+        name: str,
+        work: Callable[[Any], Any],
+        source: Optional[queue.Queue],
+        items: Optional[List[Any]],
+        target: Optional[queue.Queue],
+        stats: Dict[str, float],
+        stop: threading.Event,
+        errors: Dict[str, Exception]
+) -> None:
+    """
+    Apply `work` to every item of `source` (or of `items`) and pass the results to `target`.
+
+    A failure is recorded in `errors` and sets `stop`, which ends the other stages.
+    """
+    try:
+        pending = iter(items) if items is not None else None
+        while True:
+            item = next(pending, _DONE) if pending is not None else _get(source, stats, stop)
+            if item is _DONE or stop.is_set():
+                break
+
+            start = time.perf_counter()
+            result = work(item)
+            stats['busy_seconds'] += time.perf_counter() - start
+            stats['batches'] += 1
+
+            if target is not None and not _put(target, result, stats, stop):
+                break
+    except Exception as error:
+        errors[name] = error
+        stop.set()
+    finally:
+        if target is not None:
+            _put(target, _DONE, stats, stop)
+
+
+def run_pipeline(
+        inputs: Union[str, Path, List[Union[str, Path]]],
+        output_dir: Union[str, Path],
+        read_depth: int = 2,
+        write_depth: int = 2,
+        engine: str = 'sorted',
+        workers: int = 1,
+        arrow_native: bool = False,
+        clean: bool = True,
+        extract_identifiers: bool = False
+) -> Dict[str, Any]:
+    """
+    Read, merge and write key-complete batches with the three stages overlapped.
+
+    Parameters:
+        inputs: Batches, see resolve_batches
+        output_dir: Directory of the merged batch files (batch-000000.snappy.parquet, ...)
+        read_depth: Number of decoded batches waiting for the merge
+        write_depth: Number of merged batches waiting for the writer
+        engine: Merge engine passed to optimized_merge
+        workers: Number of threads aggregating columns in parallel
+        arrow_native: Read batches with Arrow-backed dtypes
+        clean: Run clean_columns on every batch (False for run_shards partitions, they are cleaned)
+        extract_identifiers: Add the extracted_* identifier columns before merging
+
+    Returns:
+        Dictionary with the row counts, the written files, the statistics of every stage
+        and the bottleneck stage
+    """
+    if read_depth < 1 or write_depth < 1:
+        raise ValueError("read_depth and write_depth must be at least 1")
+
+    batches = resolve_batches(inputs)
+    output_dir = Path(output_dir)
+    report: Dict[str, Any] = {'batches': len(batches), 'rows_in': 0, 'rows_out': 0, 'files': []}
+
+    def read(batch: Path) -> pd.DataFrame:
+        return read_partition(batch, arrow_native) if batch.is_dir() else load_dataframe(batch, arrow_native=arrow_native)
+
+    def compute(df: pd.DataFrame) -> pd.DataFrame:
+        report['rows_in'] += len(df)
+        if clean:
+            df = clean_columns(df)
+        if extract_identifiers:
+            df = extract_description_identifiers(df, workers=workers)
+        return optimized_merge(df, engine=engine, workers=workers)
+
+    def write(df: pd.DataFrame) -> None:
+        report['rows_out'] += len(df)
+        report['files'].append(export_dataframe(df, output_dir, f"batch-{len(report['files']):06d}", file_format='parquet'))
+
+    stats = {stage: _new_stats() for stage in STAGES}
+    stop = threading.Event()
+    errors: Dict[str, Exception] = {}
+    read_queue: queue.Queue = queue.Queue(maxsize=read_depth)
+    write_queue: queue.Queue = queue.Queue(maxsize=write_depth)
+
+    print(f"Pipeline: {len(batches):,} batches, read_depth={read_depth}, write_depth={write_depth}")
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=_run_stage, name='pipeline-reader', daemon=True,
+                         args=('reader', read, None, batches, read_queue, stats['reader'], stop, errors)),
+        threading.Thread(target=_run_stage, name='pipeline-writer', daemon=True,
+                         args=('writer', write, write_queue, None, None, stats['writer'], stop, errors)),
+    ]
+    for thread in threads:
+        thread.start()
+    _run_stage('compute', compute, read_queue, None, write_queue, stats['compute'], stop, errors)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        stage, error = next(iter(errors.items()))
+        raise RuntimeError(f"Pipeline stage '{stage}' failed: {type(error).__name__}: {error}") from error
+
+    for stage_stats in stats.values():
+        stage_stats['utilization'] = stage_stats['busy_seconds'] / elapsed if elapsed > 0 else 0.0
+    report['seconds'] = elapsed
+    report['stages'] = stats
+    report['bottleneck'] = max(STAGES, key=lambda stage: stats[stage]['utilization'])
+
+    print_pipeline_report(report)
+    return report
+
+
+def print_pipeline_report(report: Dict[str, Any]) -> None:
+    """Print the stage statistics returned by run_pipeline."""
+    print(f"Pipeline: {report['rows_in']:,} rows in {report['batches']:,} batches -> {report['rows_out']:,} rows "
+          f"in {report['seconds']:.2f}s")
+    print(f"  {'stage':<8} {'batches':>8} {'busy':>9} {'starved':>9} {'blocked':>9} {'utilization':>12}")
+    for stage in STAGES:
+        stats = report['stages'][stage]
+        print(f"  {stage:<8} {stats['batches']:>8,} {stats['busy_seconds']:>8.2f}s {stats['starved_seconds']:>8.2f}s "
+              f"{stats['blocked_seconds']:>8.2f}s {stats['utilization']:>11.0%}")
+    print(f"  Bottleneck: {report['bottleneck']}")
+
+
+if __name__ == "__main__":
+    run_pipeline(sys.argv[1], sys.argv[2], engine=sys.argv[3] if len(sys.argv) > 3 else 'sorted')
@@ -0,0 +1,231 @@
+"""
+Dry-Run Planner
+------------------------------
+Estimates the cost of a deduplication run without running it.
+
+Only the key column (and eco_friendly, which decides merge conflicts) is read
+from the parquet file. Keys are hashed and counted with vectorized numpy
+operations to get the number of groups, the group-size distribution and the
+conflict rate. A small sample of duplicate groups is then read in full, cleaned
+and merged to measure the per-row cost, which is scaled to the whole file.
+
+Usage:
+   from src.planner import plan_merge
+
+   * Print and return the plan for the raw data
+   plan = plan_merge()
+
+   * From the command line
+   python -m src.planner [path/to/file.parquet] [engine]
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from src.path import DataPaths
+from src.merge import merge_dataframe_rows, MERGE_ENGINES
+from src.process_columns import clean_columns
+
+# Upper bounds (inclusive) of the group-size histogram buckets
+GROUP_SIZE_BUCKETS = [2, 3, 5, 10, 100]
+
+# optimized_merge holds the cleaned frame, the duplicate rows taken out of it and the output
+PEAK_MEMORY_FACTOR = 2.0
+
+
+def _group_statistics(keys: pd.Series, eco_friendly: Optional[pd.Series]) -> Dict[str, Any]:
+    """
+    Vectorized group counts over hashed keys.
+
+    Parameters:
+        keys: Key value of every row
+        eco_friendly: eco_friendly value of every row (None if the column is missing)
+
+    Returns:
+        Dictionary of group statistics
+    """
+    missing = keys.isna().to_numpy()
+    hashes = pd.util.hash_array(keys[~missing].to_numpy(dtype=object))
+    _, inverse, sizes = np.unique(hashes, return_inverse=True, return_counts=True)
+
+    duplicate_sizes = sizes[sizes > 1]
+    histogram: Dict[str, int] = {}
+    lower = 2
+    for upper in GROUP_SIZE_BUCKETS:
+        label = str(lower) if lower == upper else f"{lower}-{upper}"
+        histogram[label] = int(((duplicate_sizes >= lower) & (duplicate_sizes <= upper)).sum())
+        lower = upper + 1
+    histogram[f">{GROUP_SIZE_BUCKETS[-1]}"] = int((duplicate_sizes > GROUP_SIZE_BUCKETS[-1]).sum())
+
+    conflict_groups = 0
+    if eco_friendly is not None:
+        eco = eco_friendly[~missing].to_numpy(dtype=object)
+        has_true = np.bincount(inverse, weights=(eco == True), minlength=len(sizes)) > 0  # noqa: E712
+        has_false = np.bincount(inverse, weights=(eco == False), minlength=len(sizes)) > 0  # noqa: E712
+        conflict_groups = int((has_true & has_false & (sizes > 1)).sum())
+
+    return {
+        'rows': int(len(keys)),
+        'rows_missing_key': int(missing.sum()),
+        'groups': int(len(sizes)),
+        'duplicate_groups': int(len(duplicate_sizes)),
+        'duplicate_rows': int(duplicate_sizes.sum()),
+        'largest_group': int(sizes.max()) if len(sizes) else 0,
+        'group_size_histogram': histogram,
+        'conflict_groups': conflict_groups,
+        'conflict_rate': conflict_groups / len(duplicate_sizes) if len(duplicate_sizes) else 0.0,
+        # Rows without a key are not merged, optimized_merge keeps each of them
+        'output_rows_estimate': int(len(sizes) - conflict_groups + missing.sum()),
+    }
+
+
+def _sample_cost(
+        path: Path,
+        key_column: str,
+        sample_keys: np.ndarray,
+        engine: str,
+        arrow_native: bool
+) -> Dict[str, Any]:
+    """
+    Read, clean and merge the rows of the sampled keys and measure the time and memory per row.
+    """
+    # Filtered read: the file is decoded once, only the sampled rows are converted to pandas
+    start = time.perf_counter()
+    sample_table = pq.read_table(path, filters=[(key_column, 'in', sample_keys.tolist())])
+    decode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sample_df = sample_table.to_pandas(types_mapper=pd.ArrowDtype if arrow_native else None)
+    convert_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sample_df = clean_columns(sample_df)
+    clean_time = time.perf_counter() - start
+
+    # The sample run must not append to the real merge error log
+    with tempfile.TemporaryDirectory() as error_folder:
+        start = time.perf_counter()
+        merge_dataframe_rows(sample_df, key_column=key_column, engine=engine, error_folder=Path(error_folder))
+        merge_time = time.perf_counter() - start
+
+    n_rows = max(len(sample_df), 1)
+    return {
+        'sample_rows': len(sample_df),
+        'sample_groups': len(sample_keys),
+        'decode_seconds': decode_time,
+        'convert_seconds_per_row': convert_time / n_rows,
+        'clean_seconds_per_row': clean_time / n_rows,
+        'merge_seconds_per_row': merge_time / n_rows,
+        'bytes_per_row': int(sample_df.memory_usage(deep=True).sum() / n_rows),
+    }
+
+
+def plan_merge(
+        path: Optional[Union[str, Path]] = None,
+        key_column: str = 'product_title',
+        engine: str = 'sorted',
+        arrow_native: bool = False,
+        sample_groups: int = 200,
+        memory_budget: int = 2 * 2 ** 30,
+        seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Estimate groups, conflicts, time and memory of deduplicating a parquet file.
+
+    Parameters:
+        path: Parquet file (default: DataPaths.file_parquet_original)
+        key_column: Column the duplicates are grouped by
+        engine: Merge engine the per-row cost is measured with
+        arrow_native: Measure with Arrow-backed dtypes (as main(arrow_native=True))
+        sample_groups: Number of duplicate groups merged to measure the cost
+        memory_budget: Memory (bytes) the recommended chunk size is fitted into
+        seed: Random seed of the group sample
+
+    Returns:
+        Dictionary with the group statistics, the cost estimate and the recommendations
+    """
+    if engine not in MERGE_ENGINES:
+        raise ValueError(f"engine must be one of {MERGE_ENGINES}")
+
+    path = Path(path or DataPaths.file_parquet_original)
+    schema = pq.read_schema(path)
+    if key_column not in schema.names:
+        raise ValueError(f"Key column '{key_column}' not found in {path}")
+
+    # Projected read: only the key and the conflict column
+    start = time.perf_counter()
+    columns = [key_column] + (['eco_friendly'] if 'eco_friendly' in schema.names else [])
+    keys_df = pq.read_table(path, columns=columns).to_pandas()
+    key_read_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plan: Dict[str, Any] = {'path': str(path), 'engine': engine}
+    plan.update(_group_statistics(keys_df[key_column], keys_df.get('eco_friendly')))
+    plan['statistics_seconds'] = key_read_time + time.perf_counter() - start
+
+    # Per-row cost from a sample of duplicate groups
+    duplicate_keys = keys_df[key_column][keys_df[key_column].duplicated(keep=False)].dropna().unique()
+    rng = np.random.default_rng(seed)
+    sample_keys = rng.choice(duplicate_keys, size=min(sample_groups, len(duplicate_keys)), replace=False)
+    cost = _sample_cost(path, key_column, sample_keys, engine, arrow_native) if len(sample_keys) else {
+        'sample_rows': 0, 'sample_groups': 0, 'decode_seconds': 0.0, 'convert_seconds_per_row': 0.0,
+        'clean_seconds_per_row': 0.0, 'merge_seconds_per_row': 0.0, 'bytes_per_row': 0,
+    }
+    plan.update(cost)
+
+    # Whole file estimate: decode the file, convert and clean every row, merge the duplicate rows
+    plan['estimated_seconds'] = (
+        cost['decode_seconds']
+        + plan['rows'] * (cost['convert_seconds_per_row'] + cost['clean_seconds_per_row'])
+        + plan['duplicate_rows'] * cost['merge_seconds_per_row']
+    )
+    plan['estimated_frame_bytes'] = plan['rows'] * cost['bytes_per_row']
+    plan['estimated_peak_bytes'] = int(plan['estimated_frame_bytes'] * PEAK_MEMORY_FACTOR)
+
+    # Threads only pay off once the merge takes longer than starting them
+    merge_seconds = plan['duplicate_rows'] * cost['merge_seconds_per_row']
+    cpus = os.cpu_count() or 1
+    plan['recommended_workers'] = 1 if merge_seconds < 1 else min(cpus, 8)
+
+    # Rows per batch so that one batch per worker fits the memory budget
+    bytes_per_row = max(cost['bytes_per_row'], 1)
+    chunk_size = memory_budget / (bytes_per_row * PEAK_MEMORY_FACTOR * plan['recommended_workers'])
+    plan['recommended_chunk_size'] = int(min(max(chunk_size, 10_000), max(plan['rows'], 1)))
+    plan['recommended_chunks'] = math.ceil(plan['rows'] / plan['recommended_chunk_size']) if plan['rows'] else 0
+
+    print_plan(plan)
+    return plan
+
+
+def print_plan(plan: Dict[str, Any]) -> None:
+    """Print a plan returned by plan_merge."""
+    print(f"Plan for {plan['path']} (engine: {plan['engine']})")
+    print(f"  Rows: {plan['rows']:,} ({plan['rows_missing_key']:,} without key)")
+    print(f"  Groups: {plan['groups']:,}, duplicate groups: {plan['duplicate_groups']:,} "
+          f"holding {plan['duplicate_rows']:,} rows, largest group: {plan['largest_group']:,}")
+    print(f"  Group sizes: " + ", ".join(f"{size}: {count:,}" for size, count in plan['group_size_histogram'].items()))
+    print(f"  Conflicting groups: {plan['conflict_groups']:,} ({plan['conflict_rate']:.1%} of duplicate groups)")
+    print(f"  Output rows: ~{plan['output_rows_estimate']:,}")
+    print(f"  Sample: {plan['sample_groups']:,} groups / {plan['sample_rows']:,} rows, "
+          f"merge {plan['merge_seconds_per_row'] * 1e6:,.1f} us/row")
+    print(f"  Estimated time: {plan['estimated_seconds']:,.1f}s, "
+          f"memory: {plan['estimated_frame_bytes'] / 2 ** 20:,.0f} MB frame, "
+          f"{plan['estimated_peak_bytes'] / 2 ** 20:,.0f} MB peak")
+    print(f"  Recommended: workers={plan['recommended_workers']}, chunk_size={plan['recommended_chunk_size']:,} "
+          f"({plan['recommended_chunks']:,} chunks)")
+
+
+if __name__ == "__main__":
+    plan_merge(
+        path=sys.argv[1] if len(sys.argv) > 1 else None,
+        engine=sys.argv[2] if len(sys.argv) > 2 else 'sorted'
+    )
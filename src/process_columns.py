@@ -1,6 +1,9 @@
 """
 Column Cleaning Utilities
 ------------------------------
+Columns backed by pd.ArrowDtype (DataFrames read with types_mapper=pd.ArrowDtype)
+are cleaned with Arrow compute kernels and stay Arrow-backed.
+
 Usage:
    from src.process_column import clean_columns
 
@@ -10,9 +13,27 @@ Usage:
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from typing import List
 
 
+def is_arrow_backed(series: pd.Series) -> bool:
+    """Return True if the series is stored as a pd.ArrowDtype column."""
+    return isinstance(series.dtype, pd.ArrowDtype)
+
+
+def to_arrow_array(series: pd.Series) -> pa.Array:
+    """Values of an Arrow-backed series as one Arrow array (large columns are stored in several chunks)."""
+    values = pa.array(series.array)
+    return values.combine_chunks() if isinstance(values, pa.ChunkedArray) else values
+
+
+def to_arrow_series(values: pa.Array, index: pd.Index) -> pd.Series:
+    """Wrap an Arrow array into an Arrow-backed Series without converting the values."""
+    return pd.Series(pd.arrays.ArrowExtensionArray(values), index=index)
+
+
 def merge_and_drop_descriptions(df: pd.DataFrame) -> pd.DataFrame:
     """
     Merge description and product_summary columns based on the longest string.
@@ -23,6 +44,21 @@ def merge_and_drop_descriptions(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         df: DataFrame
     """
+    if is_arrow_backed(df['description']) and is_arrow_backed(df['product_summary']):
+        description = to_arrow_array(df['description'])
+        product_summary = to_arrow_array(df['product_summary'])
+
+        # Same comparison as len(str(value)) below, where a missing value is printed as 'nan' (3 characters)
+        keep_description = pc.greater_equal(
+            pc.fill_null(pc.utf8_length(description), 3),
+            pc.fill_null(pc.utf8_length(product_summary), 3)
+        )
+        longest = pc.if_else(keep_description, description, product_summary)
+        df['product_description'] = to_arrow_series(pc.fill_null(longest, ''), df.index)
+
+        df.drop(['description', 'product_summary'], axis=1, inplace=True)
+        return df
+
     # Create a new column with the longest text between description and product_summary
     df['product_description'] = df.apply(
         lambda row: row['description'] if len(str(row['description'])) >= len(str(row['product_summary']))
@@ -45,6 +81,21 @@ def combine_materials_ingredients(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         df: DataFrame with new column components dropping initial columns
     """
+    if is_arrow_backed(df['materials']) and is_arrow_backed(df['ingredients']):
+        materials = to_arrow_array(df['materials'])
+        ingredients = to_arrow_array(df['ingredients'])
+
+        # Missing lists compare as null and keep the materials value, like the NaN lengths below
+        mask = pc.and_(
+            pc.equal(pc.list_value_length(materials), 0),
+            pc.greater(pc.list_value_length(ingredients), 0)
+        )
+        components = pc.if_else(pc.fill_null(mask, False), ingredients, materials.cast(ingredients.type))
+        df['components'] = to_arrow_series(components, df.index)
+
+        df.drop(['materials', 'ingredients'], axis=1, inplace=True)
+        return df
+
     df['components'] = df['materials']
 
     # Find rows where materials column is empty (length = 0)
@@ -79,6 +130,36 @@ def drop_columns(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
     return df
 
 
+def _energy_efficiency_to_list(values: pa.Array) -> pa.Array:
+    """
+    Arrow version of the energy_efficiency cleaning: a struct becomes a one element list,
+    a missing value or a list holding a single missing value becomes an empty list.
+
+    Parameters:
+        values: Arrow struct or list<struct> array
+
+    Returns:
+        Arrow list<struct> array without missing rows
+    """
+    if pa.types.is_list(values.type) or pa.types.is_large_list(values.type):
+        lengths = pc.fill_null(pc.list_value_length(values), 0).to_numpy()
+        elements = pc.list_flatten(values)
+        parents = pc.list_parent_indices(values).to_numpy()
+
+        # Drop the element of [None] lists only, None elements of longer lists are kept
+        keep = ~(pc.is_null(elements).to_numpy(zero_copy_only=False) & (lengths[parents] == 1))
+        elements = elements.filter(pa.array(keep))
+        row_lengths = np.bincount(parents[keep], minlength=len(values))
+    else:
+        present = pc.is_valid(values).to_numpy(zero_copy_only=False)
+        elements = values.filter(pa.array(present))
+        row_lengths = present.astype(np.int64)
+
+    offsets = np.concatenate(([0], np.cumsum(row_lengths))).astype(np.int32)
+    # Same 'element' field name as the list columns read from Parquet
+    return pa.ListArray.from_arrays(pa.array(offsets), elements, type=pa.list_(pa.field('element', elements.type)))
+
+
 def clean_energy_efficiency(df: pd.DataFrame) -> pd.DataFrame:
     """
     Transform energy_efficiency column values from dictionary values to numpy arrays
@@ -89,6 +170,12 @@ def clean_energy_efficiency(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         df: Modified DataFrame with energy_efficiency values converted to np.array
     """
+    if is_arrow_backed(df['energy_efficiency']):
+        df['energy_efficiency'] = to_arrow_series(
+            _energy_efficiency_to_list(to_arrow_array(df['energy_efficiency'])), df.index
+        )
+        return df
+
     df['energy_efficiency'] = df['energy_efficiency'].apply(
         lambda x:
         [] if x is None or (isinstance(x, list) and x == [None]) else # Handle None values
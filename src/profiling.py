@@ -0,0 +1,311 @@
+"""
+Aggregation Profiler
+------------------------------
+Opt-in profiling of merge_dataframe_rows, to find the column function and the
+groups behind a slow run.
+
+1. Counters: every aggregation function of the run is wrapped per column and
+   counts its calls, total and slowest time, and keeps the slowest calls.
+   The group keys of the slowest calls are looked up after the merge.
+2. Sampling (optional): a background thread records the Python stack of every
+   thread at a fixed interval, exported as collapsed stacks (one
+   "frame;frame;... count" line per stack) for flamegraph tools.
+
+Without a profiler merge_dataframe_rows runs the plain functions, nothing is
+wrapped or sampled. Vectorized kernels (pairwise, arrow, duckdb engines) do not
+call the aggregation functions, their time only shows in the sampled stacks.
+
+Usage:
+   from src.profiling import AggregationProfiler
+
+   * Counters only, summary printed by the caller after the merge
+   profiler = AggregationProfiler()
+   merged_df = merge_dataframe_rows(df, 'product_title', engine='sorted', profile=profiler)
+   profiler.print_summary()
+
+   * Also sample stacks every 5ms and write them for flamegraph.pl / speedscope
+   profiler = AggregationProfiler(sample_interval=0.005)
+   merged_df = merge_dataframe_rows(df, 'product_title', profile=profiler)
+   profiler.export_collapsed_stacks(Path('data/profile/merge_stacks.txt'))
+"""
+
+import heapq
+import math
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Keys reported per slow call when several groups hold the same values
+MAX_KEYS_PER_CALL = 3
+
+
+class ProfiledAggregation:
+    """
+    Aggregation function of one column, wrapped with call counters.
+
+    Hashes and compares equal to the wrapped function, so the kernel and
+    conflict-check tables keyed by aggregation function still find it.
+    """
+
+    def __init__(self, column: str, func: Callable[[Any], Any], slowest: int):
+        self.column = column
+        self.func = func
+        self.slowest = slowest
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        # Min-heap of (seconds, call number, values) of the slowest calls
+        self.slow_calls: List[Tuple[float, int, Any]] = []
+        # Slowest calls with their group keys, filled by AggregationProfiler.resolve_group_keys
+        self.slowest_groups: Optional[List[Dict[str, Any]]] = None
+
+    def __call__(self, values: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.func(values)
+        finally:
+            seconds = time.perf_counter() - start
+            self.calls += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+            if len(self.slow_calls) < self.slowest:
+                heapq.heappush(self.slow_calls, (seconds, self.calls, values))
+            elif seconds > self.slow_calls[0][0]:
+                heapq.heapreplace(self.slow_calls, (seconds, self.calls, values))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ProfiledAggregation):
+            other = other.func
+        return self.func == other
+
+    def __hash__(self) -> int:
+        return hash(self.func)
+
+
+def _canonical(value: Any) -> Any:
+    """Hashable form of a cell value, the same for numpy arrays, lists and Arrow-converted values."""
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return tuple(_canonical(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted(((key, _canonical(item)) for key, item in value.items()), key=lambda pair: pair[0]))
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _index_groups(
+        group_indices: np.ndarray,
+        first_rows: np.ndarray,
+        column_values: np.ndarray,
+        key_of: Callable[[Any], Any]
+) -> Dict[Any, List[int]]:
+    """Map key_of(first value of the group) to the groups, for the given groups."""
+    index: Dict[Any, List[int]] = {}
+    for group_index in group_indices.tolist():
+        index.setdefault(key_of(column_values[first_rows[group_index]]), []).append(group_index)
+    return index
+
+
+def _matching_groups(
+        candidates: List[int],
+        values: List[Any],
+        column_values: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        same: Callable[[Any, Any], bool]
+) -> List[int]:
+    """Candidate groups whose column values all match `values` (at most MAX_KEYS_PER_CALL)."""
+    matches = []
+    for group_index in candidates:
+        rows = order[offsets[group_index]:offsets[group_index + 1]]
+        if all(same(value, target) for value, target in zip(column_values[rows], values)):
+            matches.append(group_index)
+            if len(matches) == MAX_KEYS_PER_CALL:
+                break
+    return matches
+
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class AggregationProfiler:
+    """
+    Collects the counters (and optionally the stack samples) of merge_dataframe_rows runs.
+
+    Parameters:
+        slowest: Number of slowest calls kept per column
+        sample_interval: Seconds between stack samples, None disables sampling
+    """
+
+    def __init__(self, slowest: int = 5, sample_interval: Optional[float] = None):
+        self.slowest = slowest
+        self.sample_interval = sample_interval
+        self.wrappers: List[ProfiledAggregation] = []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+        self._start = 0.0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def wrap(self, agg_dict: Dict[str, Callable[[Any], Any]]) -> Dict[str, Callable[[Any], Any]]:
+        """Aggregation dictionary with every function wrapped in a ProfiledAggregation."""
+        wrapped = {col: ProfiledAggregation(col, func, self.slowest) for col, func in agg_dict.items()}
+        self.wrappers.extend(wrapped.values())
+        return wrapped
+
+    def start(self) -> None:
+        """Start the clock, and the sampling thread if sample_interval is set."""
+        self._start = time.perf_counter()
+        if self.sample_interval is not None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name='aggregation-profiler', daemon=True)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop the clock and the sampling thread."""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self.seconds += time.perf_counter() - self._start
+
+    def _sample(self) -> None:
+        sampler_id = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def resolve_group_keys(
+            self,
+            df: pd.DataFrame,
+            groups: Tuple[np.ndarray, np.ndarray, pd.Index]
+    ) -> None:
+        """
+        Find the group keys of the slowest calls by their values.
+
+        Engines pass plain value slices without the key, so every slow call is matched
+        with the groups of the same size holding the same values (a few keys are kept
+        when several groups hold identical values). Only the columns wrapped for this
+        merge are resolved, their values are released afterwards.
+
+        Parameters:
+            df: Merged DataFrame
+            groups: (row order, group offsets, group keys) of df, as returned by group_offsets
+        """
+        order, offsets, uniques = groups
+        sizes = np.diff(offsets)
+        first_rows = order[offsets[:-1]]
+        for wrapper in self.wrappers:
+            if wrapper.slowest_groups is not None:
+                continue
+            wrapper.slowest_groups = []
+            if not wrapper.slow_calls:
+                continue
+            column_values = df[wrapper.column].to_numpy(dtype=object)
+            # group size -> object id / canonical form of the first value -> group indices, built on first use
+            by_identity: Dict[int, Dict[Any, List[int]]] = {}
+            by_canonical: Dict[int, Dict[Any, List[int]]] = {}
+            for seconds, _, values in sorted(wrapper.slow_calls, key=lambda slow: -slow[0]):
+                values = list(values)
+                size = len(values)
+                if size not in by_identity:
+                    by_identity[size] = _index_groups(np.flatnonzero(sizes == size), first_rows, column_values, id)
+
+                # Slices hold the objects of the column itself, unless the engine copied them (string, Arrow columns)
+                found = _matching_groups(by_identity[size].get(id(values[0]), []), values, column_values,
+                                         order, offsets, lambda value, target: value is target)
+                if not found:
+                    if size not in by_canonical:
+                        by_canonical[size] = _index_groups(np.flatnonzero(sizes == size), first_rows, column_values, _canonical)
+                    target = [_canonical(value) for value in values]
+                    found = _matching_groups(by_canonical[size].get(target[0], []), target, column_values,
+                                             order, offsets, lambda value, target: _canonical(value) == target)
+
+                wrapper.slowest_groups.append({'seconds': seconds, 'size': size, 'keys': [uniques[group] for group in found]})
+            wrapper.slow_calls = []
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Counters of every column, slowest columns first.
+
+        Returns:
+            Dictionary with the profiled seconds, the seconds spent inside aggregation functions,
+            the number of stack samples and one entry per column
+        """
+        columns: Dict[str, Dict[str, Any]] = {}
+        for wrapper in self.wrappers:
+            stats = columns.setdefault(wrapper.column, {
+                'function': getattr(wrapper.func, '__name__', repr(wrapper.func)),
+                'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'slowest': [],
+            })
+            stats['calls'] += wrapper.calls
+            stats['total_seconds'] += wrapper.total_seconds
+            stats['max_seconds'] = max(stats['max_seconds'], wrapper.max_seconds)
+            stats['slowest'] += wrapper.slowest_groups if wrapper.slowest_groups is not None else [
+                {'seconds': seconds, 'size': len(values), 'keys': None} for seconds, _, values in wrapper.slow_calls
+            ]
+
+        for stats in columns.values():
+            stats['slowest'] = sorted(stats['slowest'], key=lambda slow: -slow['seconds'])[:self.slowest]
+
+        ordered = dict(sorted(columns.items(), key=lambda item: -item[1]['total_seconds']))
+        return {
+            'seconds': self.seconds,
+            'function_seconds': sum(stats['total_seconds'] for stats in ordered.values()),
+            'samples': self.samples,
+            'columns': ordered,
+        }
+
+    def print_summary(self, top: int = 10) -> None:
+        """Print the `top` slowest columns (with calls) and the keys of their slowest groups."""
+        summary = self.summary()
+        print(f"Profile: {summary['seconds']:.2f}s merge, {summary['function_seconds']:.2f}s in aggregation functions"
+              + (f", {summary['samples']:,} stack samples" if self.sample_interval is not None else ""))
+        called = [(col, stats) for col, stats in summary['columns'].items() if stats['calls']]
+        if not called:
+            print("  No aggregation function calls, the engine only ran vectorized kernels (see the stack samples)")
+            return
+        print(f"  {'column':<40} {'function':<24} {'calls':>9} {'total':>9} {'mean':>10} {'max':>10}")
+        for col, stats in called[:top]:
+            mean = stats['total_seconds'] / stats['calls'] if stats['calls'] else 0.0
+            print(f"  {col:<40} {stats['function']:<24} {stats['calls']:>9,} {stats['total_seconds']:>8.3f}s "
+                  f"{mean * 1e6:>8.1f}us {stats['max_seconds'] * 1e3:>8.2f}ms")
+            if stats['slowest']:
+                slow = stats['slowest'][0]
+                keys = ', '.join(repr(key)[:60] for key in slow['keys']) if slow['keys'] else '?'
+                print(f"  {'':<40} slowest group: {slow['seconds'] * 1e3:.2f}ms, {slow['size']:,} rows, key {keys}")
+
+    def export_collapsed_stacks(self, path: Path) -> Path:
+        """
+        Write the sampled stacks in the collapsed format ("frame;frame;... count" per line).
+
+        Returns:
+            Path to the written file
+        """
+        path = Path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        print(f"Exported {len(self.stacks):,} collapsed stacks ({self.samples:,} samples) to: {path}")
+        return path
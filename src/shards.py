@@ -0,0 +1,277 @@
+"""
+Multi-File Runner
+------------------------------
+Deduplicates a directory (or glob) of parquet shards as one dataset.
+
+1. Every shard is read and cleaned in its own process (ProcessPoolExecutor)
+2. Rows are shuffled by a hash of the key into partition files (spilled to disk),
+   so duplicates spanning several shards end up in the same partition
+3. Every partition is merged with optimized_merge, again one process per partition
+
+Progress is printed per shard and per partition. A shard that fails is reported
+and skipped, the run continues with the others. A partition that fails is
+reported too and the other partitions are still merged, then run_shards raises:
+the keys of that partition would be missing from the result. The spill directory
+is kept in that case, its partition folders can be merged again (src.pipeline).
+
+Usage:
+   from src.shards import run_shards
+
+   * Deduplicate all shards of a directory
+   result_df = run_shards('data/parquet/raw/2024-05-01/')
+
+   * Or a glob, with 32 partitions and 4 processes
+   result_df = run_shards('data/parquet/raw/*/part-*.parquet', n_partitions=32, processes=4)
+"""
+
+import csv
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.path import DataPaths
+from src.merge import prepare_error_log
+from src.optimize import optimized_merge
+from src.process_columns import clean_columns
+from src.extract_identifiers import extract_description_identifiers
+from tools.load_data import load_dataframe
+
+PARTITION_FOLDER = 'partition={}'
+ERROR_LOG_NAME = 'merge_errors.csv'
+
+
+def resolve_shards(inputs: Union[str, Path, List[Union[str, Path]]]) -> List[Path]:
+    """
+    Expand the runner input into a sorted list of parquet files.
+
+    Parameters:
+        inputs: Directory (all *.parquet files inside), glob pattern, single file, or a list of those
+
+    Returns:
+        Sorted list of shard paths
+    """
+    if isinstance(inputs, (list, tuple)):
+        return sorted({shard for item in inputs for shard in resolve_shards(item)})
+
+    path = Path(inputs)
+    if path.is_dir():
+        shards = sorted(path.glob('*.parquet'))
+    elif path.is_file():
+        shards = [path]
+    else:
+        shards = sorted(Path(match) for match in glob.glob(str(inputs)))
+
+    if not shards:
+        raise ValueError(f"No parquet files found for '{inputs}'")
+    return shards
+
+
+def key_partitions(keys: pd.Series, n_partitions: int) -> np.ndarray:
+    """
+    Partition index of every row: hash of the key modulo n_partitions.
+
+    Rows with a missing key all go to partition 0, optimized_merge keeps them as unique rows.
+    """
+    partitions = np.zeros(len(keys), dtype=np.int64)
+    present = keys.notna().to_numpy()
+    hashes = pd.util.hash_array(keys[present].astype(str).to_numpy(dtype=object))
+    partitions[present] = (hashes % np.uint64(n_partitions)).astype(np.int64)
+    return partitions
+
+
+def _clean_and_partition_shard(
+        shard: Path,
+        shard_index: int,
+        spill_dir: Path,
+        n_partitions: int,
+        key_column: str,
+        arrow_native: bool,
+        extract_identifiers: bool
+) -> int:
+    """
+    Worker: read and clean one shard, write its rows to the partition folders.
+
+    Files are written under a temporary name and renamed once the whole shard
+    succeeded, so a failing shard never leaves partial partitions behind.
+
+    Returns:
+        Number of rows of the shard
+    """
+    df = clean_columns(load_dataframe(shard, arrow_native=arrow_native))
+    if extract_identifiers:
+        df = extract_description_identifiers(df, workers=1)
+
+    partitions = key_partitions(df[key_column], n_partitions)
+    written: List[Tuple[Path, Path]] = []
+    for partition in np.unique(partitions):
+        folder = spill_dir / PARTITION_FOLDER.format(partition)
+        folder.mkdir(exist_ok=True, parents=True)
+        final_path = folder / f"shard-{shard_index:06d}.parquet"
+        temp_path = final_path.with_suffix('.tmp')
+        df[partitions == partition].to_parquet(temp_path, index=False)
+        written.append((temp_path, final_path))
+
+    for temp_path, final_path in written:
+        temp_path.rename(final_path)
+    return len(df)
+
+
+def read_partition(folder: Path, arrow_native: bool = False) -> pd.DataFrame:
+    """
+    Read all shard files of a partition folder, in shard order, as one DataFrame.
+    """
+    tables = [pq.read_table(path) for path in sorted(folder.glob('shard-*.parquet'))]
+    # Shards may disagree on types of all-null columns
+    table = pa.concat_tables(tables, promote_options='permissive')
+    return table.to_pandas(types_mapper=pd.ArrowDtype if arrow_native else None)
+
+
+def _merge_partition(folder: Path, arrow_native: bool, engine: str, workers: int) -> pd.DataFrame:
+    """
+    Worker: merge one partition, merge errors are logged inside the partition folder.
+    """
+    return optimized_merge(read_partition(folder, arrow_native), engine=engine, workers=workers, error_folder=folder)
+
+
+def _append_error_log(source: Path, destination: Path) -> None:
+    """Append the rows of a partition error log to the main error log (header written once)."""
+    with open(source, encoding='utf-8') as source_file:
+        header = source_file.readline()
+        body = source_file.read()
+
+    destination.parent.mkdir(exist_ok=True, parents=True)
+    write_header = prepare_error_log(destination, next(csv.reader([header])))
+    with open(destination, 'w' if write_header else 'a', encoding='utf-8') as destination_file:
+        if write_header:
+            destination_file.write(header)
+        destination_file.write(body)
+
+
+def run_shards(
+        inputs: Union[str, Path, List[Union[str, Path]]],
+        n_partitions: int = 16,
+        processes: Optional[int] = None,
+        engine: str = 'sorted',
+        workers: int = 1,
+        key_column: str = 'product_title',
+        arrow_native: bool = False,
+        extract_identifiers: bool = False,
+        spill_dir: Optional[Path] = None,
+        report: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Clean, shuffle by key and merge a set of parquet shards.
+
+    Parameters:
+        inputs: Directory, glob pattern or list of shards (see resolve_shards)
+        n_partitions: Number of key hash partitions
+        processes: Number of worker processes (default: number of CPUs)
+        engine: Merge engine passed to optimized_merge
+        workers: Number of threads per process aggregating columns in parallel
+        key_column: Column the duplicates are grouped by (the key optimized_merge builds)
+        arrow_native: Read shards with Arrow-backed dtypes
+        extract_identifiers: Add the extracted_* identifier columns while cleaning each shard
+        spill_dir: Where the partition files are written (default: a temporary directory removed at the end,
+            kept when a partition failed)
+        report: Run report dictionary, filled with the row counts and the failed shards and partitions
+
+    Returns:
+        DataFrame with the merged rows of all partitions
+
+    Raises:
+        RuntimeError: If a partition failed to merge (after all other partitions were merged)
+    """
+    shards = resolve_shards(inputs)
+    processes = processes or os.cpu_count() or 1
+
+    keep_spill = spill_dir is not None
+    spill_dir = Path(spill_dir) if keep_spill else Path(tempfile.mkdtemp(prefix='shards-'))
+    spill_dir.mkdir(exist_ok=True, parents=True)
+
+    start = time.perf_counter()
+    failed: Dict[Path, str] = {}
+    failed_partitions: Dict[Path, str] = {}
+    total_rows = 0
+
+    try:
+        # Clean and shuffle every shard
+        print(f"Cleaning {len(shards):,} shards into {n_partitions} partitions with {processes} processes")
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures: Dict[Any, Path] = {
+                pool.submit(_clean_and_partition_shard, shard, index, spill_dir, n_partitions, key_column,
+                            arrow_native, extract_identifiers): shard
+                for index, shard in enumerate(shards)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                shard = futures[future]
+                try:
+                    rows = future.result()
+                    total_rows += rows
+                    print(f"[{done}/{len(shards)}] {shard.name}: {rows:,} rows")
+                except Exception as error:
+                    failed[shard] = f"{type(error).__name__}: {error}"
+                    print(f"[{done}/{len(shards)}] {shard.name}: FAILED ({failed[shard]}), skipped")
+
+        # Merge every partition
+        folders = sorted(spill_dir.glob(PARTITION_FOLDER.format('*')), key=lambda folder: int(folder.name.split('=')[1]))
+        merged: Dict[Path, pd.DataFrame] = {}
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {pool.submit(_merge_partition, folder, arrow_native, engine, workers): folder for folder in folders}
+            for done, future in enumerate(as_completed(futures), start=1):
+                folder = futures[future]
+                try:
+                    merged[folder] = future.result()
+                    print(f"[{done}/{len(folders)}] {folder.name}: {len(merged[folder]):,} rows after merge")
+                except Exception as error:
+                    failed_partitions[folder] = f"{type(error).__name__}: {error}"
+                    print(f"[{done}/{len(folders)}] {folder.name}: FAILED ({failed_partitions[folder]})")
+
+        # Partition error logs go to the main error log, in partition order
+        for folder in folders:
+            if folder in merged and (folder / ERROR_LOG_NAME).exists():
+                _append_error_log(folder / ERROR_LOG_NAME, DataPaths.error_folder / ERROR_LOG_NAME)
+    finally:
+        if not keep_spill and not failed_partitions:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    frames = [merged[folder] for folder in folders if folder in merged]
+    result_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    elapsed = time.perf_counter() - start
+    print(f"Merged {total_rows:,} rows from {len(shards) - len(failed):,}/{len(shards):,} shards "
+          f"into {len(result_df):,} rows in {elapsed:.2f}s")
+    if failed:
+        print(f"WARNING: {len(failed)} shards failed:")
+        for shard, error in failed.items():
+            print(f"  {shard}: {error}")
+
+    if report is not None:
+        report.update({
+            'shards': len(shards),
+            'failed_shards': {str(shard): error for shard, error in failed.items()},
+            'partitions': len(folders),
+            'failed_partitions': {folder.name: error for folder, error in failed_partitions.items()},
+            'rows_in': total_rows,
+            'rows_out': len(result_df),
+            'seconds': elapsed,
+        })
+
+    if failed_partitions:
+        print(f"WARNING: {len(failed_partitions)} partitions failed, their rows are kept in {spill_dir}:")
+        for folder, error in failed_partitions.items():
+            print(f"  {folder.name}: {error}")
+        raise RuntimeError(f"{len(failed_partitions)} of {len(folders)} partitions failed to merge "
+                           f"(first: {next(iter(failed_partitions.values()))}), partitions kept in {spill_dir}")
+
+    return result_df
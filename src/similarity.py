@@ -0,0 +1,246 @@
+"""
+Description Similarity Merging
+------------------------------
+Finds duplicate products whose titles differ but whose product_description
+text is (almost) the same.
+
+Descriptions are turned into L2 normalized hashed TF-IDF vectors (SciPy sparse,
+no vocabulary, no external model). Candidate pairs are only scored within a block
+(by default rows sharing the same unspsc value) using batched sparse matrix products.
+Pairs above the threshold are grouped into connected components and handed to
+merge_dataframe_rows.
+
+Descriptions of different models are often near copies of each other, so a pair
+is not merged when both rows have an extracted identifier (extracted_model_number,
+extracted_year, see src.extract_identifiers) and the identifiers differ.
+
+Usage:
+   from src.similarity import similarity_merge
+
+   * Merge rows whose descriptions have a cosine similarity >= 0.9 within the same unspsc
+   merged_df = similarity_merge(dataframe, threshold=0.9)
+
+   * Block by the first 10 characters of the title instead
+   merged_df = similarity_merge(dataframe, block_column='product_title', block_prefix=10)
+
+   * Ignore the extracted identifiers
+   merged_df = similarity_merge(extract_description_identifiers(dataframe), identifier_columns=[])
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from typing import List, Optional, Tuple, Union
+
+from src.merge import merge_dataframe_rows
+from src.lineage import RowLineage
+from src.extract_identifiers import IDENTIFIER_PATTERNS, EXTRACTED_COLUMN_PREFIX
+
+TOKEN_PATTERN = r'[a-z0-9]+'
+SIMILARITY_KEY = 'similarity_key'
+
+
+def hashed_tfidf_vectors(texts: pd.Series, n_features: int = 2 ** 20) -> sparse.csr_matrix:
+    """
+    Turn texts into L2 normalized TF-IDF vectors using the hashing trick.
+
+    Parameters:
+        texts: Series of texts, missing values are treated as empty strings
+        n_features: Number of hash buckets (columns of the output matrix)
+
+    Returns:
+        Sparse matrix of shape (len(texts), n_features)
+    """
+    n_rows = len(texts)
+    tokens = texts.reset_index(drop=True).fillna('').astype(str).str.lower().str.findall(TOKEN_PATTERN)
+
+    # One entry per (row, token), rows without tokens explode to NaN and are dropped
+    flat_tokens = tokens.explode().dropna()
+    rows = flat_tokens.index.to_numpy()
+    columns = pd.util.hash_array(flat_tokens.to_numpy(dtype=object)) % n_features
+
+    # Duplicate (row, column) entries are summed, giving the term counts
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns.astype(np.int64))),
+        shape=(n_rows, n_features)
+    )
+
+    # Smoothed inverse document frequency
+    document_frequency = np.bincount(counts.indices, minlength=n_features)
+    idf = np.log((1 + n_rows) / (1 + document_frequency)).astype(np.float32) + 1
+    vectors = counts @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ vectors).tocsr()
+
+
+def score_candidate_pairs(
+        vectors: sparse.csr_matrix,
+        block_codes: np.ndarray,
+        threshold: float,
+        batch_size: int = 2048
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Score all row pairs that share a block and keep those above the threshold.
+
+    Parameters:
+        vectors: Normalized row vectors (output of hashed_tfidf_vectors)
+        block_codes: Integer block id per row, rows with a negative id are not scored
+        threshold: Minimum cosine similarity for a pair to be kept
+        batch_size: Number of rows multiplied against their block at once
+
+    Returns:
+        Tuple of (left row positions, right row positions, scores, number of scored pairs)
+    """
+    order = np.argsort(block_codes, kind='stable')
+    sorted_codes = block_codes[order]
+    offsets = np.concatenate(([0], np.flatnonzero(np.diff(sorted_codes)) + 1, [len(sorted_codes)]))
+
+    left: List[np.ndarray] = []
+    right: List[np.ndarray] = []
+    scores: List[np.ndarray] = []
+    scored_pairs = 0
+
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        if end - start < 2 or sorted_codes[start] < 0:
+            continue
+
+        members = order[start:end]
+        block = vectors[members]
+        block_t = block.T.tocsc()
+        scored_pairs += (end - start) * (end - start - 1) // 2
+
+        for batch_start in range(0, len(members), batch_size):
+            similarities = (block[batch_start:batch_start + batch_size] @ block_t).tocoo()
+            batch_rows = similarities.row + batch_start
+
+            # Keep each unordered pair once and skip the diagonal
+            keep = (similarities.data >= threshold) & (batch_rows < similarities.col)
+
+            left.append(members[batch_rows[keep]])
+            right.append(members[similarities.col[keep]])
+            scores.append(similarities.data[keep])
+
+    if not left:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float32), scored_pairs
+
+    return np.concatenate(left), np.concatenate(right), np.concatenate(scores), scored_pairs
+
+
+def identifier_conflicts(df: pd.DataFrame, left: np.ndarray, right: np.ndarray, columns: List[str]) -> np.ndarray:
+    """
+    Mark the pairs whose rows both have a value in one of the identifier columns and the values differ.
+
+    Parameters:
+        df: DataFrame the pairs point into
+        left: Row positions of the first row of every pair
+        right: Row positions of the second row of every pair
+        columns: Identifier columns (e.g. extracted_model_number)
+
+    Returns:
+        Boolean array, True for the pairs that must not be merged
+    """
+    conflicts = np.zeros(len(left), dtype=bool)
+    for col in columns:
+        # Missing identifiers get code -1
+        codes, _ = pd.factorize(df[col].to_numpy())
+        conflicts |= (codes[left] >= 0) & (codes[right] >= 0) & (codes[left] != codes[right])
+    return conflicts
+
+
+def similarity_merge(
+        df: pd.DataFrame,
+        threshold: float = 0.9,
+        text_column: str = 'product_description',
+        block_column: str = 'unspsc',
+        block_prefix: Optional[int] = None,
+        n_features: int = 2 ** 20,
+        return_lineage: bool = False,
+        identifier_columns: Optional[List[str]] = None
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, RowLineage]]:
+    """
+    Merge rows whose text_column vectors are similar within the same block.
+
+    Similar pairs with different identifiers are dropped before the pairs are chained
+    into groups. Two rows with different identifiers can still end up in one group
+    through a third row similar to both that has no identifier.
+
+    Parameters:
+        df: DataFrame to merge
+        threshold: Minimum cosine similarity for two rows to be merged
+        text_column: Column holding the text to compare
+        block_column: Only rows sharing the same value of this column are compared
+        block_prefix: If set, only the first block_prefix characters of block_column are used
+        n_features: Number of hash buckets used by the vectorizer
+        return_lineage: Also return the RowLineage mapping every output row to its row positions in df
+        identifier_columns: Columns whose values must agree for two rows to be merged
+            (default: the extracted_* columns of src.extract_identifiers present in df)
+
+    Returns:
+        DataFrame where every connected group of similar rows is merged into one row (merged rows
+        first, new RangeIndex; df itself if nothing was merged), or a tuple of (DataFrame, RowLineage) if return_lineage is set
+    """
+    for col in [text_column, block_column]:
+        if col not in df.columns:
+            raise ValueError(f"Column '{col}' not found in DataFrame")
+
+    unchanged = (df, RowLineage.identity(np.arange(len(df)))) if return_lineage else df
+
+    if len(df) < 2:
+        return unchanged
+
+    # Vectorization
+    start = time.perf_counter()
+    vectors = hashed_tfidf_vectors(df[text_column], n_features=n_features)
+    vectorize_time = time.perf_counter() - start
+    print(f"Vectorized {len(df):,} descriptions in {vectorize_time:.2f}s "
+          f"({len(df) / max(vectorize_time, 1e-9):,.0f} rows/s)")
+
+    # Blocking and scoring
+    blocks = df[block_column]
+    if block_prefix is not None:
+        blocks = blocks.str[:block_prefix]
+    block_codes, _ = pd.factorize(blocks.to_numpy())
+
+    start = time.perf_counter()
+    left, right, _, scored_pairs = score_candidate_pairs(vectors, block_codes, threshold)
+    score_time = time.perf_counter() - start
+    print(f"Scored {scored_pairs:,} candidate pairs in {score_time:.2f}s "
+          f"({scored_pairs / max(score_time, 1e-9):,.0f} pairs/s), {len(left):,} above {threshold}")
+
+    if identifier_columns is None:
+        identifier_columns = [f'{EXTRACTED_COLUMN_PREFIX}{name}' for name in IDENTIFIER_PATTERNS
+                              if f'{EXTRACTED_COLUMN_PREFIX}{name}' in df.columns]
+    if identifier_columns and len(left) > 0:
+        conflicts = identifier_conflicts(df, left, right, identifier_columns)
+        left, right = left[~conflicts], right[~conflicts]
+        print(f"Dropped {conflicts.sum():,} similar pairs with different {', '.join(identifier_columns)}")
+
+    if len(left) == 0:
+        return unchanged
+
+    # Similar pairs are chained into groups, each group becomes one merge key
+    graph = sparse.coo_matrix((np.ones(len(left)), (left, right)), shape=(len(df), len(df)))
+    _, labels = connected_components(graph, directed=False)
+    in_group = np.bincount(labels)[labels] > 1
+
+    similar_df = df[in_group].copy()
+    similar_df[SIMILARITY_KEY] = labels[in_group]
+
+    merged = merge_dataframe_rows(similar_df, key_column=SIMILARITY_KEY, return_lineage=return_lineage)
+    merged_df, merged_lineage = merged if return_lineage else (merged, None)
+    merged_df = merged_df.drop(columns=[SIMILARITY_KEY])
+    # New RangeIndex like optimized_merge, the lineage follows row positions
+    result_df = pd.concat([merged_df, df[~in_group]], ignore_index=True)
+
+    if return_lineage:
+        merged_lineage.source_rows = np.flatnonzero(in_group)[merged_lineage.source_rows].astype(np.int32)
+        return result_df, RowLineage.concat([merged_lineage, RowLineage.identity(np.flatnonzero(~in_group))])
+
+    return result_df
@@ -0,0 +1,57 @@
+"""
+Shared test fixtures
+------------------------------
+Makes the repository root importable (main, src.*, tools.*) and keeps every test
+away from the checked-in data folders.
+"""
+
+import sys
+
+import pyarrow.parquet as pq
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.path import DataPaths
+from tests.helpers import raw_table
+
+
+@pytest.fixture(autouse=True)
+def error_folder(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Log merge errors to a temporary folder instead of data/error/."""
+    folder = tmp_path / 'error'
+    folder.mkdir()
+    monkeypatch.setattr(DataPaths, 'error_folder', folder)
+    return folder
+
+
+@pytest.fixture
+def data_paths(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point the input file and every output folder of main() into a temporary directory."""
+    parquet_dir = tmp_path / 'parquet'
+    paths = {
+        'file_parquet_original': parquet_dir / 'raw' / 'raw.snappy.parquet',
+        'parquet_final_dir': parquet_dir / 'final',
+        'file_parquet_final': parquet_dir / 'final' / 'final_data.snappy.parquet',
+        'file_parquet_final_query': parquet_dir / 'final' / 'final_data.zstd.parquet',
+        'dir_parquet_final_partitioned': parquet_dir / 'final' / 'final_data',
+        'lineage_final_dir': parquet_dir / 'final' / 'final_data_lineage',
+        'duplicate_report_dir': parquet_dir / 'report',
+        'visualization_final_dir': tmp_path / 'visualization' / 'final',
+        'profile_dir': tmp_path / 'profile',
+        'cache_dir': tmp_path / 'cache',
+        'file_normalization_cache': tmp_path / 'cache' / 'normalization_cache.json',
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(DataPaths, name, path)
+    return tmp_path
+
+
+@pytest.fixture
+def raw_parquet(data_paths: Path) -> Path:
+    """Synthetic raw dataset written to DataPaths.file_parquet_original."""
+    path = DataPaths.file_parquet_original
+    path.parent.mkdir(parents=True)
+    pq.write_table(raw_table(), path, compression='snappy')
+    return path
@@ -0,0 +1,92 @@
+"""Helpers to compare merged DataFrames in tests."""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import Any, Dict, List
+
+
+def plain(value: Any) -> Any:
+    """Value with numpy arrays as lists and missing values as None, list order kept."""
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def rows(df: pd.DataFrame, key_column: str = 'product_title') -> List[Dict[str, Any]]:
+    """Rows of a merged DataFrame as plain dictionaries, sorted by key."""
+    df = df.sort_values(key_column, kind='stable').reset_index(drop=True)
+    return [{col: plain(value) for col, value in row.items()} for row in df.to_dict('records')]
+
+
+WORDS = ['gear', 'motor', 'valve', 'pump', 'steel', 'brass', 'oil', 'filter', 'bolt', 'cable', 'sensor', 'lamp']
+CATEGORIES = ['Pipe connectors', 'Dispensing tools', 'Fasteners', 'Lamps', 'Pipe connectors | Fasteners']
+DOMAINS = ['a.com', 'b.net', 'c.org', 'd.io']
+
+_STRINGS = pa.list_(pa.string())
+_MEASURE = pa.struct([('qualitative', pa.bool_()), ('type', pa.string()), ('unit', pa.string()), ('value', pa.string())])
+_MEASURES = pa.list_(_MEASURE)
+
+RAW_SCHEMA = pa.schema([
+    ('unspsc', pa.string()), ('root_domain', pa.string()), ('page_url', pa.string()), ('product_title', pa.string()),
+    ('product_summary', pa.string()), ('product_name', pa.string()), ('product_identifier', _STRINGS),
+    ('brand', pa.string()), ('intended_industries', _STRINGS), ('applicability', _STRINGS),
+    ('eco_friendly', pa.bool_()), ('ethical_and_sustainability_practices', _STRINGS),
+    ('production_capacity', _MEASURES), ('price', _MEASURES), ('materials', _STRINGS), ('ingredients', _STRINGS),
+    ('manufacturing_countries', _STRINGS), ('manufacturing_year', pa.int64()), ('manufacturing_type', _STRINGS),
+    ('customization', _STRINGS), ('packaging_type', _STRINGS), ('form', _STRINGS), ('size', _MEASURES),
+    ('color', _MEASURES), ('purity', _MEASURES), ('energy_efficiency', _MEASURE), ('pressure_rating', _MEASURES),
+    ('power_rating', _MEASURES), ('quality_standards_and_certifications', _STRINGS),
+    ('miscellaneous_features', _STRINGS), ('description', pa.string()),
+])
+
+
+def raw_table(n_rows: int = 300, seed: int = 0) -> pa.Table:
+    """
+    Synthetic rows with the schema of the raw dataset: duplicate titles (pairs and larger groups),
+    missing titles, eco_friendly conflicts, URLs with query strings and descriptions with model numbers.
+    """
+    rnd = random.Random(seed)
+    titles = [f"{rnd.choice(WORDS).title()} {rnd.choice(WORDS)} RV{rnd.randint(10, 999)}" for _ in range(n_rows * 2 // 3)]
+
+    def strings() -> List[str]:
+        return rnd.sample(WORDS, rnd.randint(0, 3))
+
+    def measures() -> List[Dict[str, Any]]:
+        return [{'qualitative': rnd.random() < 0.5, 'type': rnd.choice(['exact', 'range']),
+                 'unit': rnd.choice([None, 'kg', 'W']), 'value': str(rnd.randint(1, 5))}
+                for _ in range(rnd.randint(0, 2))]
+
+    rows = []
+    for _ in range(n_rows):
+        title = rnd.choice(titles) if rnd.random() < 0.9 else None
+        domain = rnd.choice(DOMAINS)
+        rows.append({
+            'unspsc': rnd.choice(CATEGORIES + [None]),
+            'root_domain': domain,
+            'page_url': f"https://{domain}/p/{rnd.randint(1, 20)}" + ('?s=' + 'x' * rnd.randint(0, 3) if rnd.random() < 0.5 else ''),
+            'product_title': title,
+            'product_summary': rnd.choice([None, 'short', f"Model NMRV-{rnd.randint(30, 90)} built {rnd.randint(1990, 2023)}"]),
+            'product_name': title,
+            'product_identifier': strings(), 'brand': rnd.choice([None, 'Acme', 'AcmeCorp', '']),
+            'intended_industries': strings(), 'applicability': strings(),
+            'eco_friendly': rnd.choice([None, None, None, True, False]),
+            'ethical_and_sustainability_practices': strings(), 'production_capacity': measures(), 'price': measures(),
+            'materials': strings(), 'ingredients': strings(), 'manufacturing_countries': strings(),
+            'manufacturing_year': -1, 'manufacturing_type': strings(), 'customization': strings(),
+            'packaging_type': strings(), 'form': strings(), 'size': measures(), 'color': measures(),
+            'purity': measures(), 'energy_efficiency': (measures() or [None])[0], 'pressure_rating': measures(),
+            'power_rating': measures(), 'quality_standards_and_certifications': strings(),
+            'miscellaneous_features': strings(),
+            'description': rnd.choice([None, 'A product', f"The {rnd.choice(WORDS)} unit type AB-{rnd.randint(100, 999)} "
+                                                          f"from {rnd.randint(1995, 2024)}"]),
+        })
+    return pa.Table.from_pylist(rows, schema=RAW_SCHEMA)
@@ -0,0 +1,61 @@
+"""Arrow-backed frames: nested columns stay Arrow list / struct types through clean and merge."""
+
+import pandas as pd
+import pyarrow as pa
+
+import main
+from src.merge import merge_dataframe_rows
+from src.process_columns import clean_columns
+from tests.helpers import raw_table, rows
+
+
+def edge_table() -> pa.Table:
+    """Raw rows where some descriptions are missing and the summary is 3 or 4 characters long."""
+    table = raw_table()
+    description = [None if row % 7 == 0 else value for row, value in enumerate(table['description'].to_pylist())]
+    summary = [['abcd', 'abc', 'ab', None][row % 4] if row % 7 == 0 else value
+               for row, value in enumerate(table['product_summary'].to_pylist())]
+    table = table.set_column(table.schema.get_field_index('description'), 'description',
+                             pa.array(description, pa.string()))
+    table = table.set_column(table.schema.get_field_index('product_summary'), 'product_summary',
+                             pa.array(summary, pa.string()))
+    return table
+
+
+def arrow_frame() -> pd.DataFrame:
+    return edge_table().to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def test_arrow_engine_keeps_nested_arrow_columns():
+    df = clean_columns(arrow_frame())
+    result = merge_dataframe_rows(df, 'product_title', engine='arrow')
+
+    for col in ['intended_industries', 'price']:
+        assert isinstance(result[col].dtype, pd.ArrowDtype)
+        assert pa.types.is_list(result[col].dtype.pyarrow_dtype)
+    assert pa.types.is_struct(result['price'].dtype.pyarrow_dtype.value_type)
+
+
+def test_arrow_frames_merge_like_numpy_frames():
+    expected = merge_dataframe_rows(clean_columns(edge_table().to_pandas()), 'product_title', engine='sorted')
+    for engine in ['arrow', 'sorted']:
+        result = merge_dataframe_rows(clean_columns(arrow_frame()), 'product_title', engine=engine)
+        assert rows(result) == rows(expected)
+
+
+def test_missing_description_counts_as_three_characters():
+    table = pa.table({
+        'description': pa.array([None, None, None, 'ab'], pa.string()),
+        'product_summary': pa.array(['abcd', 'abc', None, None], pa.string()),
+    })
+    expected = clean_columns(table.to_pandas())['product_description'].tolist()
+    result = clean_columns(table.to_pandas(types_mapper=pd.ArrowDtype))['product_description'].tolist()
+
+    assert expected == result == ['abcd', '', '', '']
+
+
+def test_main_arrow_native(raw_parquet):
+    expected = main.main(engine='sorted')
+    result = main.main(engine='arrow', arrow_native=True)
+
+    assert sorted(map(repr, rows(result))) == sorted(map(repr, rows(expected)))
@@ -0,0 +1,38 @@
+"""Micro-benchmark harness of the aggregation functions and its baseline check."""
+
+import json
+
+import tools.benchmark_merge as benchmark_merge
+from tools.benchmark_merge import case_name, compare_with_baseline, run_benchmarks
+
+CASE = 'merge_first[group_size=2]'
+
+
+def test_case_names_are_stable():
+    assert case_name('merge_array_simple', {'group_size': 10, 'list_length': 50}) == \
+        'merge_array_simple[group_size=10,list_length=50]'
+    assert set(run_benchmarks(names=[CASE])) == {CASE}
+
+
+def test_compare_flags_cases_over_the_tolerance():
+    results = {'fast': 1.0, 'slow': 1.5, 'new': 2.0}
+    assert compare_with_baseline(results, {'fast': 1.0, 'slow': 1.0}, tolerance=0.25) == ['slow']
+
+
+def test_update_then_check(tmp_path, monkeypatch):
+    baseline = tmp_path / 'baseline.json'
+    assert benchmark_merge.main(['--filter', CASE, '--baseline', str(baseline), '--update']) == 0
+    assert set(json.loads(baseline.read_text())['cases']) == {CASE}
+
+    assert benchmark_merge.main(['--filter', CASE, '--baseline', str(baseline)]) == 0
+
+    # A case 10x slower than its baseline, on every retry
+    monkeypatch.setattr(benchmark_merge, 'time_call', lambda function, values: 1.0)
+    stored = json.loads(baseline.read_text())
+    stored['cases'][CASE] = 0.1
+    baseline.write_text(json.dumps(stored))
+    assert benchmark_merge.main(['--filter', CASE, '--baseline', str(baseline), '--retries', '1']) == 1
+
+
+def test_check_without_baseline(tmp_path):
+    assert benchmark_merge.main(['--filter', CASE, '--baseline', str(tmp_path / 'missing.json')]) == 1
@@ -0,0 +1,49 @@
+"""duckdb_merge_parquet and its use by main(engine='duckdb')."""
+
+import pyarrow.parquet as pq
+import pytest
+
+pytest.importorskip('duckdb')
+
+import main
+from src.optimize import optimized_merge
+from src.duckdb_engine import duckdb_merge_parquet, compare_with_pandas
+from src.path import DataPaths
+from src.process_columns import clean_columns
+from tests.helpers import raw_table, rows
+
+
+def test_parquet_merge_matches_pandas(tmp_path):
+    # A quote in the path must not end up in the SQL
+    path = tmp_path / "it's raw.parquet"
+    pq.write_table(raw_table(), path)
+
+    expected = optimized_merge(clean_columns(raw_table().to_pandas()), engine='sorted')
+    result = duckdb_merge_parquet(path)
+
+    assert list(result.index) == list(range(len(result)))
+    assert sorted(result.columns) == sorted(expected.columns)
+    assert rows(result[expected.columns]) == rows(expected)
+
+
+def test_main_scans_parquet_with_duckdb(raw_parquet, monkeypatch):
+    calls = []
+    monkeypatch.setattr('src.duckdb_engine.duckdb_merge_parquet',
+                        lambda *args, **kwargs: calls.append(args) or duckdb_merge_parquet(*args, **kwargs))
+
+    result = main.main(engine='duckdb')
+
+    assert calls == [(DataPaths.file_parquet_original,)]
+    assert rows(result) == rows(main.main(engine='sorted'))
+    assert DataPaths.file_parquet_final.exists()
+
+
+def test_error_log_matches_pandas(tmp_path, error_folder):
+    path = tmp_path / 'raw.parquet'
+    pq.write_table(raw_table(), path)
+
+    comparison = compare_with_pandas(path, engine='sorted')
+
+    assert comparison['differing_columns'] == []
+    assert comparison['error_logs_equal']
+    assert DataPaths.error_folder == error_folder and not any(error_folder.iterdir())
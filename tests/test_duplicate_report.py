@@ -0,0 +1,41 @@
+"""Before / after duplicate reports of main(duplicate_report=True)."""
+
+import pandas as pd
+import pytest
+
+import main
+from src.optimize import optimized_merge
+from src.path import DataPaths
+from src.process_columns import clean_columns
+from tests.helpers import raw_table
+
+
+def test_reports_hold_the_merged_groups(raw_parquet, error_folder):
+    main.main(engine='sorted', duplicate_report=True, report_csv=True)
+
+    before = pd.read_parquet(DataPaths.duplicate_report_dir / 'duplicates_before_merge.snappy.parquet')
+    after = pd.read_parquet(DataPaths.duplicate_report_dir / 'duplicates_after_merge.snappy.parquet')
+    assert (DataPaths.duplicate_report_dir / 'duplicates_before_merge.csv').exists()
+
+    df = clean_columns(raw_table().to_pandas())
+    titles = df['product_title']
+    logged = set(pd.read_csv(error_folder / 'merge_errors.csv')['product_title'])
+    merged_titles = set(titles[titles.duplicated(keep=False) & titles.notna()]) - logged
+
+    assert set(after['product_title']) == merged_titles and after['product_title'].is_unique
+    assert set(before['product_title']) == merged_titles
+    assert len(before) == titles.isin(merged_titles).sum()
+
+
+def test_sampled_report(tmp_path):
+    optimized_merge(clean_columns(raw_table().to_pandas()), engine='sorted', report_dir=tmp_path, report_sample=5)
+    after = pd.read_parquet(tmp_path / 'duplicates_after_merge.snappy.parquet')
+    before = pd.read_parquet(tmp_path / 'duplicates_before_merge.snappy.parquet')
+
+    assert len(after) == 5
+    assert set(before['product_title']) == set(after['product_title'])
+
+
+def test_report_needs_a_single_input_file(data_paths):
+    with pytest.raises(ValueError, match='duplicate_report'):
+        main.main(inputs=str(data_paths / 'shards'), duplicate_report=True)
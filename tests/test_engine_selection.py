@@ -0,0 +1,67 @@
+"""engine='auto': select_engine on a loaded frame, select_parquet_engine before loading."""
+
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import main
+import src.merge
+from src.merge import merge_dataframe_rows, select_engine, select_parquet_engine, _available_memory
+from src.process_columns import clean_columns
+from tests.helpers import raw_table
+
+
+@pytest.mark.skipif(not Path('/proc/meminfo').exists(), reason='no /proc/meminfo')
+def test_available_memory_is_mem_available():
+    fields = dict(line.split(':', 1) for line in Path('/proc/meminfo').read_text().splitlines())
+    available = int(fields['MemAvailable'].split()[0]) * 1024
+    # MemAvailable moves a little between the two reads
+    assert abs(_available_memory() - available) < 64 * 2 ** 20
+
+
+def test_select_engine_from_the_data_shape(monkeypatch):
+    # Never DuckDB for a frame already in memory, however little memory is left
+    monkeypatch.setattr(src.merge, '_available_memory', lambda: 1)
+
+    pairs = pd.DataFrame({'product_title': ['a', 'a', 'b', 'b', 'c'], 'brand': ['x'] * 5})
+    assert select_engine(pairs, 'product_title')['engine'] == 'pairwise'
+
+    groups = pd.DataFrame({'product_title': ['a'] * 3 + ['b'] * 3 + ['c'], 'brand': ['x'] * 7})
+    assert select_engine(groups, 'product_title')['engine'] == 'sorted'
+
+    arrow = groups.astype(pd.ArrowDtype(pa.string()))
+    assert select_engine(arrow, 'product_title')['engine'] == 'arrow'
+
+
+def test_auto_selection_is_reported_not_printed(capsys):
+    report = {}
+    merge_dataframe_rows(clean_columns(raw_table().to_pandas()), 'product_title', engine='auto', report=report)
+
+    assert report['engine_selection']['engine'] in ['sorted', 'pairwise']
+    assert report['engine_selection']['reason']
+    assert 'Engine auto' not in capsys.readouterr().out
+
+
+@pytest.mark.skipif(importlib.util.find_spec('duckdb') is None, reason='duckdb is not installed')
+def test_parquet_engine_under_memory_pressure(raw_parquet, monkeypatch, capsys):
+    assert select_parquet_engine(raw_parquet) is None
+
+    monkeypatch.setattr(src.merge, '_available_memory', lambda: 2 ** 10)
+    selection = select_parquet_engine(raw_parquet)
+    assert selection['engine'] == 'duckdb' and selection['rows'] == 300
+
+    scanned = []
+    monkeypatch.setattr('src.duckdb_engine.duckdb_merge_parquet',
+                        lambda path, **kwargs: scanned.append(path) or pd.DataFrame({'product_title': ['a']}))
+    main.main(engine='auto')
+
+    assert scanned == [raw_parquet]
+    assert 'Engine auto: duckdb' in capsys.readouterr().out
+
+
+def test_main_prints_the_in_memory_selection(raw_parquet, capsys):
+    main.main(engine='auto')
+    assert 'Engine auto: ' in capsys.readouterr().out
@@ -0,0 +1,37 @@
+"""Rows of conflicting groups are appended to the merge error log under a matching header."""
+
+import pandas as pd
+
+from src.merge import merge_dataframe_rows, ERROR_INFO_COLUMNS
+
+
+def conflicting_frame(brand: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'product_title': ['a', 'a', 'b'],
+        'brand': [brand, brand, brand],
+        'eco_friendly': [True, False, None],
+    })
+
+
+def test_rows_are_appended_under_the_same_header(error_folder):
+    merge_dataframe_rows(conflicting_frame('x'), 'product_title')
+    merge_dataframe_rows(conflicting_frame('y'), 'product_title')
+
+    log = pd.read_csv(error_folder / 'merge_errors.csv')
+    assert list(log.columns) == list(reversed(ERROR_INFO_COLUMNS)) + ['product_title', 'brand', 'eco_friendly']
+    assert list(log['brand']) == ['x', 'x', 'y', 'y']
+    assert list(error_folder.iterdir()) == [error_folder / 'merge_errors.csv']
+
+
+def test_log_with_other_columns_is_moved_aside(error_folder):
+    # Header of a log written by the baseline pipeline, which kept a product_key column
+    old_log = 'error_message,product_title,brand,eco_friendly,product_key\nDifferent brand values,t,x,,t\n'
+    (error_folder / 'merge_errors.csv').write_text(old_log)
+
+    merge_dataframe_rows(conflicting_frame('x'), 'product_title')
+
+    log = pd.read_csv(error_folder / 'merge_errors.csv')
+    assert 'product_key' not in log.columns
+    assert len(log) == 2
+    previous = [path for path in error_folder.iterdir() if path.name != 'merge_errors.csv']
+    assert len(previous) == 1 and previous[0].read_text() == old_log
@@ -0,0 +1,41 @@
+"""Identifier extraction and its use by similarity_merge."""
+
+import pandas as pd
+
+from src.extract_identifiers import extract_description_identifiers
+from src.similarity import similarity_merge
+
+TEXT = 'Stainless steel gear motor with flange, quiet, sealed housing, long warranty, model {}'
+
+
+def test_each_pattern_keeps_the_first_match():
+    df = pd.DataFrame({'product_description': ['NMRV-40 from 2019, replaces RV110 of 2005', 'no identifier', None]})
+    df = extract_description_identifiers(df, workers=1)
+
+    assert df['extracted_model_number'][0] == 'NMRV40'
+    assert df['extracted_model_number'].isna().tolist() == [False, True, True]
+    assert df['extracted_year'][0] == 2019
+    assert df['extracted_year'].isna().tolist() == [False, True, True]
+
+
+def _similar_rows(models):
+    return pd.DataFrame({
+        'product_title': [f'title {i}' for i in range(len(models))],
+        'product_description': [TEXT.format(model) for model in models],
+        'unspsc': ['Motors'] * len(models),
+    })
+
+
+def test_rows_with_different_model_numbers_are_not_merged():
+    df = extract_description_identifiers(_similar_rows(['RV110', 'RV130']), workers=1)
+    assert len(similarity_merge(df, threshold=0.8)) == 2
+
+
+def test_rows_with_the_same_or_one_model_number_are_merged():
+    df = extract_description_identifiers(_similar_rows(['RV-110', 'RV110', '']), workers=1)
+    assert len(similarity_merge(df, threshold=0.8)) == 1
+
+
+def test_identifiers_can_be_ignored():
+    df = extract_description_identifiers(_similar_rows(['RV110', 'RV130']), workers=1)
+    assert len(similarity_merge(df, threshold=0.8, identifier_columns=[])) == 1
@@ -0,0 +1,72 @@
+"""RowLineage and the lineage of main() / optimized_merge."""
+
+import numpy as np
+import pandas as pd
+
+import main
+import src.optimize
+from src.lineage import RowLineage
+from src.optimize import optimized_merge
+from src.path import DataPaths
+from src.process_columns import clean_columns
+from tests.helpers import raw_table
+
+
+def test_from_groups_take_and_compose():
+    # Groups {0, 3}, {1}, {2, 4} in key order
+    lineage = RowLineage.from_groups(np.array([0, 3, 1, 2, 4]), np.array([0, 2, 3, 5]), np.array([2, 0, 1]))
+    assert [lineage.sources(row).tolist() for row in range(len(lineage))] == [[2, 4], [0, 3], [1]]
+
+    taken = lineage.take(np.array([2, 0]))
+    assert [taken.sources(row).tolist() for row in range(len(taken))] == [[1], [2, 4]]
+
+    # A second merge joining output rows 0 and 2
+    outer = RowLineage(np.array([0, 2, 3], dtype=np.int32), np.array([0, 2, 1], dtype=np.int32))
+    composed = outer.compose(lineage)
+    assert [composed.sources(row).tolist() for row in range(len(composed))] == [[2, 4, 1], [0, 3]]
+    assert composed.affected_rows(np.array([3])).tolist() == [1]
+
+
+def test_concat_and_save_load(tmp_path):
+    lineage = RowLineage.concat([RowLineage.identity(np.array([5, 6])), RowLineage.identity(np.array([1]))])
+    loaded = RowLineage.load(lineage.save(tmp_path / 'lineage'))
+
+    assert isinstance(loaded.source_rows, np.memmap)
+    np.testing.assert_array_equal(loaded.offsets, lineage.offsets)
+    np.testing.assert_array_equal(loaded.source_rows, [5, 6, 1])
+
+
+def test_lineage_points_at_the_merged_rows(error_folder):
+    df = clean_columns(raw_table().to_pandas())
+    result_df, lineage = optimized_merge(df, engine='sorted', return_lineage=True)
+
+    # No source row is used twice, the rows of conflicting groups (in the error log) are not used
+    logged = pd.read_csv(error_folder / 'merge_errors.csv')
+    logged_titles = set(logged['product_title'])
+    assert len(lineage) == len(result_df)
+    assert len(lineage.source_rows) == len(df) - len(logged)
+    assert len(set(lineage.source_rows.tolist())) == len(lineage.source_rows)
+    assert not logged_titles & set(df['product_title'].take(lineage.source_rows))
+    for row in range(len(result_df)):
+        titles = df['product_title'].take(lineage.sources(row))
+        assert titles.nunique(dropna=False) == 1
+        assert pd.isna(result_df['product_title'][row]) or titles.iloc[0] == result_df['product_title'][row]
+
+
+def test_lineage_is_only_computed_when_requested(raw_parquet, monkeypatch):
+    requested = []
+    merge = src.optimize.merge_dataframe_rows
+
+    def recording_merge(*args, return_lineage=False, **kwargs):
+        requested.append(return_lineage)
+        return merge(*args, return_lineage=return_lineage, **kwargs)
+
+    monkeypatch.setattr(src.optimize, 'merge_dataframe_rows', recording_merge)
+
+    main.main(engine='sorted')
+    assert requested == [False]
+    assert not DataPaths.lineage_final_dir.exists()
+
+    result_df = main.main(engine='sorted', lineage=True, parquet_layout='query')
+    assert requested == [False, True]
+    assert len(RowLineage.load(DataPaths.lineage_final_dir)) == len(result_df)
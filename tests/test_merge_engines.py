@@ -0,0 +1,115 @@
+"""Every merge engine must return the same rows as the groupby engine."""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.merge
+from src.merge import merge_dataframe_rows, merge_array_simple, shared_key_set, group_offsets
+from src.process_columns import clean_columns
+from tests.helpers import raw_table, rows
+
+needs_duckdb = pytest.mark.skipif(importlib.util.find_spec('duckdb') is None, reason='duckdb is not installed')
+
+ENGINES = ['sorted', 'pairwise', 'arrow', pytest.param('duckdb', marks=needs_duckdb)]
+
+
+def mixed_key_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'product_title': ['a', 'a', 'b', 'b', 'b', 'c'],
+        'price': [
+            [{'value': '1', 'unit': 'USD'}], [{'value': '2', 'unit': 'USD', 'extra': 'x'}],
+            [{'value': '3'}], [], [{'value': '3'}], [{'value': '4', 'unit': 'EUR'}],
+        ],
+        'intended_industries': [['steel', 'oil', 'gas'], ['gas', 'wood'], ['x'], ['y', 'x'], [], ['z']],
+    })
+
+
+def test_merge_array_simple_keeps_first_occurrence():
+    assert merge_array_simple(pd.Series([['b', 'a'], ['c', 'a', 'b'], []])) == ['b', 'a', 'c']
+
+
+def test_shared_key_set():
+    assert shared_key_set(pd.Series([[{'a': 1, 'b': 2}], [{'b': 3, 'a': None}], [], None]).to_numpy())
+    assert not shared_key_set(pd.Series([[{'a': 1}], [{'a': 1, 'b': 2}]]).to_numpy())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_dictionaries_with_different_keys(engine):
+    df = mixed_key_frame()
+    expected = rows(merge_dataframe_rows(df, 'product_title', engine='groupby'))
+    result = rows(merge_dataframe_rows(df, 'product_title', engine=engine))
+
+    assert result == expected
+    assert expected[0]['price'] == [{'value': '1', 'unit': 'USD'}, {'value': '2', 'unit': 'USD', 'extra': 'x'}]
+    assert expected[0]['intended_industries'] == ['steel', 'oil', 'gas', 'wood']
+
+
+def test_arrow_engine_columns_without_values():
+    df = pd.DataFrame({
+        'product_title': ['a', 'a', 'b'],
+        'eco_friendly': [None, None, None],
+        'manufacturing_year': [None, None, None],
+        'root_domain': [None, None, None],
+        'intended_industries': [None, None, None],
+    })
+    expected = rows(merge_dataframe_rows(df, 'product_title', engine='groupby'))
+    assert rows(merge_dataframe_rows(df, 'product_title', engine='arrow')) == expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engine_parity(engine):
+    df = clean_columns(raw_table().to_pandas())
+    expected = merge_dataframe_rows(df, 'product_title', engine='groupby')
+    result = merge_dataframe_rows(df, 'product_title', engine=engine)
+
+    assert rows(result) == rows(expected)
+
+
+# The arrow engine returns Arrow-backed list columns instead
+@pytest.mark.parametrize('engine', ['groupby', 'sorted', 'pairwise', pytest.param('duckdb', marks=needs_duckdb)])
+def test_merged_lists_are_python_lists(engine):
+    result = merge_dataframe_rows(mixed_key_frame(), 'product_title', engine=engine)
+
+    assert all(isinstance(value, list) for value in result['intended_industries'])
+    assert all(isinstance(value, list) for value in result['price'])
+
+
+def test_group_offsets_sorts_rows_by_key_once():
+    order, offsets, uniques = group_offsets(pd.Series(['b', None, 'a', 'b', 'c', 'a']))
+
+    assert uniques.tolist() == ['a', 'b', 'c']
+    assert order.tolist() == [2, 5, 0, 3, 4]
+    assert offsets.tolist() == [0, 2, 4, 5]
+
+
+def test_sorted_engine_passes_numpy_slices_in_row_order(monkeypatch):
+    df = pd.DataFrame({'product_title': ['b', 'a', 'b', 'a', 'b'], 'brand': ['x', 'y', 'z', 'w', 'v']})
+    seen = []
+
+    def record(values):
+        seen.append(values)
+        return values[0]
+
+    monkeypatch.setattr(src.merge, 'build_aggregation_dict', lambda frame, key_column: {'brand': record})
+    result = merge_dataframe_rows(df, 'product_title', engine='sorted')
+
+    assert result['brand'].tolist() == ['y', 'x']
+    assert all(isinstance(values, np.ndarray) for values in seen)
+    assert [values.tolist() for values in seen] == [['y', 'w'], ['x', 'z', 'v']]
+
+
+@pytest.mark.parametrize('engine', ['sorted', 'pairwise', 'arrow'])
+def test_workers_do_not_change_the_result(engine, error_folder):
+    df = clean_columns(raw_table().to_pandas())
+    error_log = error_folder / 'merge_errors.csv'
+
+    expected = merge_dataframe_rows(df, 'product_title', engine=engine)
+    expected_log = pd.read_csv(error_log).drop(columns=['timestamp'])
+    error_log.unlink()
+    result = merge_dataframe_rows(df, 'product_title', engine=engine, workers=4)
+
+    assert rows(result) == rows(expected)
+    pd.testing.assert_frame_equal(pd.read_csv(error_log).drop(columns=['timestamp']), expected_log)
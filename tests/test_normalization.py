@@ -0,0 +1,70 @@
+"""NormalizationCache and merge_unspsc through it."""
+
+import pytest
+
+from src.merge import merge_unspsc
+from src.normalization import NormalizationCache, UNSPSC_CACHE
+from tools.benchmark_merge import measure_hit_rates, run_benchmarks
+
+
+@pytest.fixture(autouse=True)
+def empty_unspsc_cache():
+    UNSPSC_CACHE.clear()
+    yield
+    UNSPSC_CACHE.clear()
+
+
+def test_parts_are_stripped_deduplicated_and_joined_sorted():
+    cache = NormalizationCache()
+    parts = set(cache.parts(' Valves | Pumps | nan |  | Pumps'))
+    parts.update(cache.parts('Valves'))
+    assert cache.parts('Valves | Pumps') == ('Valves', 'Pumps')
+    assert cache.join(parts) == 'Pumps | Valves'
+
+
+def test_memory_is_bounded_by_maxsize():
+    cache = NormalizationCache(maxsize=10)
+    for i in range(100):
+        cache.parts(f"Category {i} | Category {i + 1}")
+    assert len(cache) == 10
+    assert len(cache.to_dict()['entries']) == 10
+    assert len(cache._recent) == 10
+
+    for i in range(3):
+        cache.update_from_dict({'entries': [[f"raw {i} {j}", ['part']] for j in range(8)]})
+    assert list(cache._loaded) == [f"raw {i} {j}" for i, j in [(1, 6), (1, 7)] + [(2, j) for j in range(8)]]
+
+
+def test_hit_rate_and_clear():
+    cache = NormalizationCache()
+    for raw in ['a | b', 'a | b', 'c', 'a | b']:
+        cache.parts(raw)
+    assert (cache.hits, cache.misses, cache.parsed) == (2, 2, 2)
+    assert cache.hit_rate == 0.5
+
+    cache.clear()
+    assert (len(cache), cache.hits, cache.parsed, cache.hit_rate) == (0, 0, 0, 0.0)
+
+
+def test_saved_entries_are_used_without_parsing():
+    cache = NormalizationCache()
+    cache.parts('Pumps | Valves')
+
+    reloaded = NormalizationCache()
+    reloaded.update_from_dict(cache.to_dict())
+    assert reloaded.parts('Pumps | Valves') == ('Pumps', 'Valves')
+    assert reloaded.parsed == 0
+
+
+def test_merge_unspsc():
+    assert merge_unspsc(['Valves | Pumps', None, 'Pumps', float('nan'), 'nan', 42]) == '42 | Pumps | Valves'
+    assert merge_unspsc([]) == ''
+
+
+def test_benchmark_reports_cold_runs_and_hit_rates():
+    warm, cold = 'merge_unspsc[group_size=10]', 'merge_unspsc[group_size=10,cache=cold]'
+    assert set(run_benchmarks(names=[warm, cold])) == {warm, cold}
+
+    hit_rates = measure_hit_rates('merge_unspsc')
+    assert all(name.endswith(',cache=cold]') for name in hit_rates)
+    assert 0.0 < hit_rates[cold] < 1.0
@@ -0,0 +1,40 @@
+"""Split of optimized_merge into duplicate and unique rows, and assembly of its output."""
+
+import pandas as pd
+
+from src.optimize import optimized_merge
+from src.process_columns import clean_columns
+from tests.helpers import plain, raw_table
+
+
+def test_merged_rows_first_then_unique_rows_in_input_order():
+    df = pd.DataFrame({
+        'product_title': ['a', 'u1', 'a', None, 'u2', None],
+        'brand': ['x', 'y', 'x', 'z', 'w', 'v'],
+    })
+    result = optimized_merge(df, engine='sorted')
+
+    assert [plain(title) for title in result['product_title']] == ['a', 'u1', None, 'u2', None]
+    assert result['brand'].tolist() == ['x', 'y', 'z', 'w', 'v']
+    assert isinstance(result.index, pd.RangeIndex)
+
+
+def test_input_is_not_modified():
+    df = clean_columns(raw_table().to_pandas())
+    before = df.copy()
+    optimized_merge(df, engine='sorted')
+
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_unique_rows_are_copied_unchanged():
+    df = clean_columns(raw_table().to_pandas())
+    titles = df['product_title']
+    unique_df = df[~titles.duplicated(keep=False) | titles.isna()]
+
+    result = optimized_merge(df, engine='sorted')
+
+    assert sorted(result.columns) == sorted(df.columns)
+    tail = result.iloc[len(result) - len(unique_df):]
+    for col in df.columns:
+        assert [plain(value) for value in tail[col]] == [plain(value) for value in unique_df[col]], col
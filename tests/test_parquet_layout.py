@@ -0,0 +1,42 @@
+"""Final parquet layouts of main() and the unspsc_segment partition column."""
+
+import pandas as pd
+import pytest
+
+import main
+from src.path import DataPaths
+from tools.save_data import add_unspsc_segment, UNSPSC_SEGMENT_COLUMN
+from tools.scan_benchmark import latest_final_dataset
+
+
+@pytest.mark.parametrize('layout, path_name', [
+    ('default', 'file_parquet_final'),
+    ('query', 'file_parquet_final_query'),
+    ('partitioned', 'dir_parquet_final_partitioned'),
+])
+def test_main_writes_the_data_paths_final_path(raw_parquet, layout, path_name):
+    result = main.main(engine='sorted', parquet_layout=layout)
+
+    path = getattr(DataPaths, path_name)
+    assert path.exists()
+    assert latest_final_dataset() == path
+
+    written = pd.read_parquet(path).drop(columns=[UNSPSC_SEGMENT_COLUMN], errors='ignore')
+    assert len(written) == len(result)
+    assert sorted(written.columns) == sorted(result.columns)
+
+
+def test_latest_final_dataset_without_output(data_paths):
+    with pytest.raises(FileNotFoundError):
+        latest_final_dataset()
+
+
+def test_unspsc_segment_does_not_depend_on_category_order():
+    df = pd.DataFrame({'unspsc': ['Tools | Cables', 'Cables | Tools', ' Tools ', None, '', 'nan | Paint']})
+    segments = add_unspsc_segment(df)[UNSPSC_SEGMENT_COLUMN].tolist()
+    assert segments == ['Cables', 'Cables', 'Tools', 'unknown', 'unknown', 'Paint']
+
+
+def test_unspsc_segment_keeps_the_row_order_of_any_index():
+    df = pd.DataFrame({'unspsc': ['b | a', 'c']}, index=[10, 3])
+    assert add_unspsc_segment(df)[UNSPSC_SEGMENT_COLUMN].tolist() == ['a', 'c']
@@ -0,0 +1,53 @@
+"""run_pipeline: overlapped read / merge / write of key-complete batches."""
+
+import pandas as pd
+import pytest
+
+import src.pipeline
+from src.optimize import optimized_merge
+from src.pipeline import run_pipeline
+from src.process_columns import clean_columns
+from src.shards import key_partitions
+from tests.helpers import raw_table, rows
+
+
+@pytest.fixture
+def key_batches(tmp_path):
+    """Raw rows split into 4 files by key, every key in one file."""
+    df = raw_table().to_pandas()
+    partitions = key_partitions(df['product_title'], 4)
+    folder = tmp_path / 'by_key'
+    folder.mkdir()
+    for partition in range(4):
+        df[partitions == partition].to_parquet(folder / f"batch-{partition}.parquet", index=False)
+    return folder
+
+
+def as_set(df):
+    return sorted(map(repr, rows(df)))
+
+
+def test_batches_merge_like_one_frame(key_batches, tmp_path):
+    expected = optimized_merge(clean_columns(raw_table().to_pandas()), engine='sorted')
+
+    report = run_pipeline(str(key_batches / '*.parquet'), tmp_path / 'out', read_depth=1, write_depth=1)
+    result = pd.concat([pd.read_parquet(path) for path in report['files']], ignore_index=True)
+
+    assert as_set(result) == as_set(expected)
+    assert report['batches'] == 4 and report['rows_in'] == 300 and report['rows_out'] == len(expected)
+    assert all(report['stages'][stage]['batches'] == 4 for stage in src.pipeline.STAGES)
+    assert report['bottleneck'] in src.pipeline.STAGES
+
+
+def test_failing_stage_stops_the_pipeline(key_batches, tmp_path, monkeypatch):
+    def broken_export(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(src.pipeline, 'export_dataframe', broken_export)
+    with pytest.raises(RuntimeError, match="stage 'writer' failed: OSError: disk full"):
+        run_pipeline(str(key_batches / '*.parquet'), tmp_path / 'out', read_depth=1, write_depth=1)
+
+
+def test_depths_must_be_positive(key_batches, tmp_path):
+    with pytest.raises(ValueError):
+        run_pipeline(str(key_batches / '*.parquet'), tmp_path / 'out', read_depth=0)
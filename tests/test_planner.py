@@ -0,0 +1,23 @@
+"""Dry-run plan of plan_merge against the real merge."""
+
+import pandas as pd
+
+from src.optimize import optimized_merge
+from src.path import DataPaths
+from src.planner import plan_merge
+from src.process_columns import clean_columns
+
+
+def test_output_rows_estimate_counts_rows_without_key(raw_parquet, error_folder):
+    plan = plan_merge(raw_parquet, sample_groups=5)
+    df = clean_columns(pd.read_parquet(raw_parquet))
+
+    assert plan['rows_missing_key'] == df['product_title'].isna().sum() > 0
+    assert plan['output_rows_estimate'] == len(optimized_merge(df, engine='sorted'))
+
+
+def test_sample_merge_leaves_the_error_folder_alone(raw_parquet, error_folder):
+    plan_merge(raw_parquet, sample_groups=50)
+
+    assert DataPaths.error_folder == error_folder
+    assert not any(error_folder.iterdir())
@@ -0,0 +1,52 @@
+"""AggregationProfiler in merge_dataframe_rows and main(profile=True)."""
+
+import importlib.util
+
+import pytest
+
+import main
+import src.merge
+from src.merge import merge_dataframe_rows
+from src.path import DataPaths
+from src.process_columns import clean_columns
+from src.profiling import AggregationProfiler
+from tests.helpers import raw_table, rows
+from tests.test_merge_engines import mixed_key_frame
+
+needs_duckdb = pytest.mark.skipif(importlib.util.find_spec('duckdb') is None, reason='duckdb is not installed')
+
+
+@pytest.mark.parametrize('engine', ['sorted', 'pairwise', 'arrow', 'groupby'])
+def test_merge_reports_the_profile_without_printing_it(engine, monkeypatch, capsys):
+    df = clean_columns(raw_table().to_pandas())
+    df = df[df['product_title'].duplicated(keep=False)]
+
+    calls = []
+    original = src.merge.group_offsets
+    monkeypatch.setattr(src.merge, 'group_offsets', lambda keys: calls.append(len(keys)) or original(keys))
+
+    report = {}
+    profiler = AggregationProfiler()
+    merge_dataframe_rows(df, 'product_title', engine=engine, return_lineage=True, report=report, profile=profiler)
+
+    # One grouping pass shared by the engine, the profiler and the lineage
+    assert calls == [len(df)]
+    assert report['profile'] == profiler.summary()
+    assert 'Profile:' not in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('engine', ['groupby', 'sorted', 'pairwise', 'arrow', pytest.param('duckdb', marks=needs_duckdb)])
+@pytest.mark.parametrize('frame', [mixed_key_frame, lambda: clean_columns(raw_table().to_pandas())],
+                         ids=['mixed_keys', 'raw'])
+def test_profiler_does_not_change_the_result(engine, frame):
+    expected = merge_dataframe_rows(frame(), 'product_title', engine=engine)
+    result = merge_dataframe_rows(frame(), 'product_title', engine=engine, profile=AggregationProfiler())
+
+    assert rows(result) == rows(expected)
+
+
+def test_main_prints_the_profile(raw_parquet, capsys):
+    main.main(engine='sorted', profile=True)
+
+    assert capsys.readouterr().out.count('Profile:') == 1
+    assert (DataPaths.profile_dir / 'merge_stacks.txt').exists()
@@ -0,0 +1,93 @@
+"""run_shards: cross-shard deduplication and recovery from failing shards and partitions."""
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import src.shards
+from src.optimize import optimized_merge
+from src.process_columns import clean_columns
+from src.shards import run_shards
+from tests.helpers import raw_table, rows
+
+_merge_partition = src.shards._merge_partition
+
+
+def _fail_partition_zero(folder, *args):
+    if folder.name == 'partition=0':
+        raise ValueError('broken partition')
+    return _merge_partition(folder, *args)
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    table = raw_table()
+    folder = tmp_path / 'shards'
+    folder.mkdir()
+    for index, start in enumerate(range(0, table.num_rows, 100)):
+        pq.write_table(table.slice(start, 100), folder / f"part-{index}.parquet")
+    return folder
+
+
+def as_set(df):
+    return sorted(map(repr, rows(df)))
+
+
+def test_duplicates_across_shards_are_merged(shard_dir):
+    expected = optimized_merge(clean_columns(raw_table().to_pandas()), engine='sorted')
+    report = {}
+
+    result = run_shards(shard_dir, n_partitions=4, processes=2, report=report)
+
+    assert as_set(result) == as_set(expected)
+    assert report['shards'] == 3 and report['failed_shards'] == {} and report['failed_partitions'] == {}
+    assert report['rows_in'] == 300 and report['rows_out'] == len(expected)
+
+
+def test_failing_shard_is_skipped(shard_dir):
+    (shard_dir / 'part-9.parquet').write_bytes(b'broken')
+    report = {}
+
+    result = run_shards(shard_dir, n_partitions=4, processes=2, report=report)
+
+    assert list(report['failed_shards']) == [str(shard_dir / 'part-9.parquet')]
+    assert report['rows_in'] == 300
+    assert len(result) == report['rows_out'] > 0
+
+
+def test_failing_partition_does_not_stop_the_others(shard_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(src.shards, '_merge_partition', _fail_partition_zero)
+    spill_dir = tmp_path / 'spill'
+    report = {}
+
+    with pytest.raises(RuntimeError, match='1 of 4 partitions failed'):
+        run_shards(shard_dir, n_partitions=4, processes=2, spill_dir=spill_dir, report=report)
+
+    assert list(report['failed_partitions']) == ['partition=0']
+    assert 'ValueError: broken partition' in report['failed_partitions']['partition=0']
+    # The three other partitions were merged
+    assert report['rows_out'] > 0
+    assert (spill_dir / 'partition=0').is_dir()
+
+
+def test_partition_errors_are_logged_in_the_partition_folder(tmp_path, error_folder):
+    folder = tmp_path / 'partition=0'
+    folder.mkdir()
+    pq.write_table(raw_table(), folder / 'shard-000000.parquet')
+
+    _merge_partition(folder, False, 'sorted', 1)
+
+    assert src.shards.DataPaths.error_folder == error_folder
+    assert (folder / src.shards.ERROR_LOG_NAME).exists()
+    assert not any(error_folder.iterdir())
+
+
+def test_error_logs_of_the_partitions_are_collected(shard_dir, error_folder, tmp_path):
+    single_run = tmp_path / 'single_run'
+    single_run.mkdir()
+    optimized_merge(clean_columns(raw_table().to_pandas()), engine='sorted', error_folder=single_run)
+
+    run_shards(shard_dir, n_partitions=4, processes=2)
+
+    logged = pd.read_csv(error_folder / src.shards.ERROR_LOG_NAME)
+    assert len(logged) == len(pd.read_csv(single_run / src.shards.ERROR_LOG_NAME))
@@ -0,0 +1,47 @@
+"""Hashed TF-IDF vectors and the blocked pair scoring of similarity_merge."""
+
+import numpy as np
+import pandas as pd
+
+from src.similarity import hashed_tfidf_vectors, score_candidate_pairs, similarity_merge
+
+TEXTS = [
+    'stainless steel gear motor with flange',
+    'Stainless steel gear motor, with flange',
+    'brass valve for oil pipes',
+    None,
+]
+
+
+def test_vectors_are_normalized():
+    vectors = hashed_tfidf_vectors(pd.Series(TEXTS), n_features=2 ** 12)
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+
+    np.testing.assert_allclose(norms, [1, 1, 1, 0], atol=1e-6)
+    assert (vectors[0] @ vectors[1].T).toarray()[0, 0] > 0.99
+
+
+def test_pairs_are_only_scored_within_a_block():
+    vectors = hashed_tfidf_vectors(pd.Series(TEXTS * 2), n_features=2 ** 12)
+    block_codes = np.array([0, 0, 0, 0, 1, 1, 1, -1])
+
+    left, right, scores, scored_pairs = score_candidate_pairs(vectors, block_codes, threshold=0.9, batch_size=2)
+
+    # Block 0 has 4 rows (6 pairs), block 1 has 3 rows (3 pairs), the last row is not blocked
+    assert scored_pairs == 9
+    assert sorted(zip(left.tolist(), right.tolist())) == [(0, 1), (4, 5)]
+    assert (scores >= 0.9).all()
+
+
+def test_similar_rows_are_merged_with_their_lineage():
+    df = pd.DataFrame({
+        'product_title': ['Gear motor', 'Steel gear motor', 'Valve', 'Flange motor'],
+        'product_description': TEXTS,
+        'unspsc': ['Motors', 'Motors', 'Motors', 'Valves'],
+    }, index=[0, 1, 0, 1])
+    result_df, lineage = similarity_merge(df, threshold=0.9, return_lineage=True)
+
+    assert len(result_df) == 3
+    assert isinstance(result_df.index, pd.RangeIndex)
+    assert sorted(lineage.sources(row).tolist() for row in range(len(lineage))) == [[0, 1], [2], [3]]
+    assert len(similarity_merge(df.iloc[:1], threshold=0.9)) == 1
@@ -0,0 +1,309 @@
+"""
+Aggregation Function Micro-Benchmarks
+-----------------------
+Times every aggregation function of src/merge.py on synthetic groups and
+compares the results with a baseline stored in the repository.
+
+Each case is one function on one parameter combination: group size
+(2 to 1000 values), list length for the list columns and dictionary width for
+the list-of-dictionaries columns. A case fails the check when its time per
+call is more than `tolerance` slower than the baseline.
+
+Functions memoized by a normalization cache (merge_unspsc) are timed twice: warm
+(the repeated calls hit the cache) and cold (the cache is cleared before every
+call, cache=cold cases). The hit rate of a single call on an empty cache is
+printed next to the results.
+
+Cases over the tolerance are timed again (--retries) and keep their best time,
+so a short burst of load on the machine does not fail the check. Baselines are
+machine specific: update them (--update) on the machine the check runs on,
+after a deliberate performance change.
+
+Usage:
+   * Check against data/benchmark/merge_baseline.json (exit code 1 on a regression)
+   python -m tools.benchmark_merge
+
+   * Only some functions, with a 50% tolerance
+   python -m tools.benchmark_merge --filter merge_page_url --tolerance 0.5
+
+   * Store the current timings as the new baseline
+   python -m tools.benchmark_merge --update
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.path import DataPaths
+from src.normalization import NormalizationCache, UNSPSC_CACHE
+from src.merge import (
+    merge_unspsc, merge_root_domain, merge_page_url, merge_text_longest, merge_text_shortest,
+    merge_eco_friendly, merge_max_year, merge_first, merge_array_simple, merge_arrays_dictionary
+)
+
+BASELINE_PATH = DataPaths.data_dir / 'benchmark' / 'merge_baseline.json'
+
+GROUP_SIZES = [2, 10, 100, 1000]
+LIST_LENGTHS = [1, 10, 50]
+DICT_WIDTHS = [2, 4, 8]
+
+# Minimum measured time per repeat, calls are batched until it is reached
+MIN_REPEAT_SECONDS = 0.02
+REPEAT = 5
+
+_WORDS = ['gear', 'motor', 'valve', 'pump', 'steel', 'brass', 'oil', 'filter', 'bolt', 'cable', 'sensor', 'lamp']
+
+
+def _object_array(values: List[Any]) -> np.ndarray:
+    """Group values the way the sorted engine passes them (object numpy slice)."""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _pool(rng: random.Random, size: int, make: Callable[[random.Random, int], Any]) -> List[Any]:
+    """Half as many distinct values as the group size, so deduplication has work to do."""
+    return [make(rng, i) for i in range(size // 2 + 1)]
+
+
+def _text_group(rng: random.Random, group_size: int, **_: int) -> np.ndarray:
+    pool = _pool(rng, group_size, lambda r, i: ' '.join(r.choices(_WORDS, k=r.randint(1, 40))))
+    return _object_array([rng.choice(pool + [None]) for _ in range(group_size)])
+
+
+def _unspsc_group(rng: random.Random, group_size: int, **_: int) -> np.ndarray:
+    pool = _pool(rng, group_size, lambda r, i: ' | '.join(f"Category {r.randint(0, 300)}" for _ in range(r.randint(1, 3))))
+    return _object_array([rng.choice(pool + [None]) for _ in range(group_size)])
+
+
+def _domain_group(rng: random.Random, group_size: int, **_: int) -> np.ndarray:
+    pool = _pool(rng, group_size, lambda r, i: f"shop{r.randint(0, 10_000)}.com")
+    return _object_array([rng.choice(pool + [None]) for _ in range(group_size)])
+
+
+def _url_group(rng: random.Random, group_size: int, **_: int) -> np.ndarray:
+    domains = [f"shop{i}.com" for i in range(max(group_size // 5, 1))]
+    return _object_array([
+        f"https://{rng.choice(domains)}/p/{rng.randint(0, 500)}?q={'x' * rng.randint(0, 20)}"
+        for _ in range(group_size)
+    ])
+
+
+def _bool_group(rng: random.Random, group_size: int, **_: int) -> np.ndarray:
+    # No conflicts: merge_eco_friendly raises on True + False
+    return _object_array([rng.choice([True, None, None]) for _ in range(group_size)])
+
+
+def _year_group(rng: random.Random, group_size: int, **_: int) -> np.ndarray:
+    return _object_array([rng.choice([None, *range(1990, 2024)]) for _ in range(group_size)])
+
+
+def _list_group(rng: random.Random, group_size: int, list_length: int = 10, **_: int) -> np.ndarray:
+    pool = [f"{rng.choice(_WORDS)} {i}" for i in range(list_length * 2)]
+    return _object_array([np.array(rng.sample(pool, list_length), dtype=object) for _ in range(group_size)])
+
+
+def _dict_group(rng: random.Random, group_size: int, list_length: int = 2, dict_width: int = 4, **_: int) -> np.ndarray:
+    keys = ['qualitative', 'type', 'unit', 'value', 'min', 'max', 'source', 'note'][:dict_width]
+    pool = [{key: rng.choice([None, True, 'kg', str(rng.randint(0, 9))]) for key in keys} for _ in range(list_length * 2)]
+    return _object_array([np.array(rng.sample(pool, list_length), dtype=object) for _ in range(group_size)])
+
+
+# function -> (input generator, extra parameter grid)
+BENCHMARK_CASES: Dict[Callable[[Any], Any], tuple] = {
+    merge_unspsc: (_unspsc_group, {}),
+    merge_root_domain: (_domain_group, {}),
+    merge_page_url: (_url_group, {}),
+    merge_text_longest: (_text_group, {}),
+    merge_text_shortest: (_text_group, {}),
+    merge_eco_friendly: (_bool_group, {}),
+    merge_max_year: (_year_group, {}),
+    merge_first: (_text_group, {}),
+    merge_array_simple: (_list_group, {'list_length': LIST_LENGTHS}),
+    merge_arrays_dictionary: (_dict_group, {'dict_width': DICT_WIDTHS}),
+}
+
+
+# function -> normalization cache it memoizes through
+CACHED_FUNCTIONS: Dict[Callable[[Any], Any], NormalizationCache] = {
+    merge_unspsc: UNSPSC_CACHE,
+}
+
+
+def _cold(function: Callable[[Any], Any], cache: NormalizationCache) -> Callable[[Any], Any]:
+    """Call `function` on an empty cache every time."""
+    def call(values: Any) -> Any:
+        cache.clear()
+        return function(values)
+    return call
+
+
+def _cases(name_filter: Optional[str], names: Optional[List[str]]) -> Iterator[Tuple[Callable[[Any], Any], Dict[str, int], str, bool]]:
+    """(function, params, name) of every selected case."""
+    for function, (make_group, grid) in BENCHMARK_CASES.items():
+        extra_name, extra_values = next(iter(grid.items()), (None, [None]))
+        for group_size in GROUP_SIZES:
+            for extra in extra_values:
+                params = {'group_size': group_size}
+                if extra_name is not None:
+                    params[extra_name] = extra
+                for cold in ([False, True] if function in CACHED_FUNCTIONS else [False]):
+                    name = case_name(function.__name__, {**params, 'cache': 'cold'} if cold else params)
+                    if (name_filter and name_filter not in name) or (names is not None and name not in names):
+                        continue
+                    yield function, params, name, cold
+
+
+def case_name(function_name: str, params: Dict[str, int]) -> str:
+    """Stable name of a case, used as key in the baseline file."""
+    return f"{function_name}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+def time_call(function: Callable[[Any], Any], values: Any, repeat: int = REPEAT) -> float:
+    """Best time per call over `repeat` batches of calls."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function(values)
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_REPEAT_SECONDS:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function(values)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_benchmarks(name_filter: Optional[str] = None, names: Optional[List[str]] = None, seed: int = 0) -> Dict[str, float]:
+    """
+    Time every case.
+
+    Parameters:
+        name_filter: Only run cases whose name contains this string
+        names: Only run these cases
+        seed: Seed of the synthetic inputs (same inputs for every run)
+
+    Returns:
+        Dictionary mapping case name to seconds per call
+    """
+    results: Dict[str, float] = {}
+    for function, params, name, cold in _cases(name_filter, names):
+        values = BENCHMARK_CASES[function][0](random.Random(seed), **params)
+        results[name] = time_call(_cold(function, CACHED_FUNCTIONS[function]) if cold else function, values)
+    return results
+
+
+def measure_hit_rates(name_filter: Optional[str] = None, seed: int = 0) -> Dict[str, float]:
+    """
+    Hit rate of one call of every cold case, on an empty cache.
+
+    Parameters:
+        name_filter: Only measure cases whose name contains this string
+        seed: Seed of the synthetic inputs (the inputs of run_benchmarks)
+
+    Returns:
+        Dictionary mapping case name to the share of cache lookups that were hits
+    """
+    hit_rates: Dict[str, float] = {}
+    for function, params, name, cold in _cases(name_filter, None):
+        if cold:
+            cache = CACHED_FUNCTIONS[function]
+            _cold(function, cache)(BENCHMARK_CASES[function][0](random.Random(seed), **params))
+            hit_rates[name] = cache.hit_rate
+    return hit_rates
+
+
+def print_hit_rates(hit_rates: Dict[str, float]) -> None:
+    """Print the hit rates returned by measure_hit_rates."""
+    for name, hit_rate in hit_rates.items():
+        print(f"{name:<60} hit rate {hit_rate:>6.1%}")
+
+
+def compare_with_baseline(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """
+    Print every case next to its baseline.
+
+    Returns:
+        Names of the cases slower than baseline * (1 + tolerance)
+    """
+    regressions = []
+    print(f"{'case':<60} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<60} {'-':>12} {seconds * 1e6:>10.1f}us {'new':>7}")
+            continue
+        ratio = seconds / baseline[name]
+        flag = ' SLOWER' if ratio > 1 + tolerance else ''
+        print(f"{name:<60} {baseline[name] * 1e6:>10.1f}us {seconds * 1e6:>10.1f}us {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def _machine() -> Dict[str, str]:
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'processor': platform.processor()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the src/merge.py aggregation functions")
+    parser.add_argument('--update', action='store_true', help="store the current timings as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument('--filter', default=None, help="only run cases whose name contains this string")
+    parser.add_argument('--retries', type=int, default=3, help="times a case over the tolerance is measured again")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help="baseline JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter)
+    hit_rates = measure_hit_rates(args.filter)
+
+    if args.update:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        cases = {**stored.get('cases', {}), **results}
+        baseline = {'machine': _machine(), 'cases': cases}
+        args.baseline.parent.mkdir(exist_ok=True, parents=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print_hit_rates(hit_rates)
+        print(f"Saved {len(results)} baseline timings to: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --update first")
+        return 1
+
+    stored = json.loads(args.baseline.read_text())
+    if stored.get('machine') != _machine():
+        print(f"WARNING: baseline was recorded on {stored.get('machine')}, this is {_machine()}")
+
+    # Time the cases over the tolerance again, a regression has to reproduce
+    for _ in range(args.retries):
+        slow = [name for name, seconds in results.items()
+                if name in stored['cases'] and seconds > stored['cases'][name] * (1 + args.tolerance)]
+        if not slow:
+            break
+        for name, seconds in run_benchmarks(names=slow).items():
+            results[name] = min(results[name], seconds)
+
+    regressions = compare_with_baseline(results, stored['cases'], args.tolerance)
+    print_hit_rates(hit_rates)
+    if regressions:
+        print(f"FAILED: {len(regressions)} cases more than {args.tolerance:.0%} slower than the baseline")
+        return 1
+    print(f"OK: {len(results)} cases within {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Duplicate Report Export
+-----------------------
+Writes the duplicates_before_merge / duplicates_after_merge reports from the
+groups a merge already computed (its RowLineage), instead of repeating the
+duplicated() / groupby() work on the full frame.
+
+Both reports keep the merge key column so every merged row can be matched with
+the rows it was built from. Groups with merge conflicts are not merged, their
+rows are in the merge error log instead.
+
+Usage:
+   from tools.duplicate_report import export_duplicate_report
+
+   * Full report as parquet
+   export_duplicate_report(duplicates_df, merged_df, lineage, output_dir)
+
+   * 500 sampled groups, also as CSV
+   export_duplicate_report(duplicates_df, merged_df, lineage, output_dir, sample_groups=500, csv=True)
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.lineage import RowLineage
+from tools.save_data import export_dataframe
+
+
+def export_duplicate_report(
+        duplicates_df: pd.DataFrame,
+        merged_df: pd.DataFrame,
+        lineage: RowLineage,
+        output_dir: Path,
+        sample_groups: Optional[int] = None,
+        csv: bool = False,
+        seed: int = 0
+) -> Dict[str, Path]:
+    """
+    Export the rows of merged groups before and after the merge
+
+    Args:
+        duplicates_df: Rows that were merged (input of merge_dataframe_rows)
+        merged_df: Merged rows (output of merge_dataframe_rows)
+        lineage: RowLineage of merged_df, positions in duplicates_df
+        output_dir: Directory of the report files
+        sample_groups: Only report this many randomly chosen groups (default: all groups)
+        csv: Also write the reports as CSV
+        seed: Random seed of the group sample
+
+    Returns:
+        Dictionary mapping report name to the saved file
+    """
+    groups = np.arange(len(lineage))
+    if sample_groups is not None and sample_groups < len(groups):
+        groups = np.sort(np.random.default_rng(seed).choice(groups, size=sample_groups, replace=False))
+
+    sample_lineage = lineage.take(groups)
+    reports = {
+        'duplicates_before_merge': duplicates_df.iloc[np.asarray(sample_lineage.source_rows)],
+        'duplicates_after_merge': merged_df.iloc[groups],
+    }
+
+    paths: Dict[str, Path] = {}
+    for name, report_df in reports.items():
+        paths[name] = export_dataframe(report_df, output_dir, name, file_format='parquet')
+        if csv:
+            paths[f"{name}_csv"] = export_dataframe(report_df, output_dir, name, file_format='csv')
+
+    print(f"Duplicate report: {len(groups):,} of {len(lineage):,} merged groups, "
+          f"{len(sample_lineage.source_rows):,} rows before merge")
+    return paths
@@ -0,0 +1,47 @@
+"""
+DataFrame Loading Utility
+-----------------------
+Loads Parquet files into pandas DataFrames, either with the default NumPy
+backed dtypes or with Arrow-backed dtypes (pd.ArrowDtype).
+
+Arrow-backed loading keeps list and list<struct> columns as Arrow arrays
+instead of materializing one Python list of dicts per row, which is what
+the 'arrow' merge engine expects.
+
+Usage:
+   from tools.load_data import load_dataframe
+
+   * Load with NumPy / object dtypes (same as pd.read_parquet)
+   df = load_dataframe(DataPaths.file_parquet_original)
+
+   * Load with Arrow-backed dtypes
+   df = load_dataframe(DataPaths.file_parquet_original, arrow_native=True)
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import List, Optional, Union
+
+
+def load_dataframe(
+        path: Union[str, Path],
+        arrow_native: bool = False,
+        columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Load a Parquet file into a DataFrame
+
+    Args:
+        path: Path to the Parquet file
+        arrow_native: Keep every column Arrow-backed (pd.ArrowDtype) instead of converting to NumPy/objects
+        columns: Only read these columns (default: all columns)
+
+    Returns:
+        Loaded DataFrame
+    """
+    if not arrow_native:
+        return pd.read_parquet(path, columns=columns)
+
+    table = pq.read_table(path, columns=columns)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
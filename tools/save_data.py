@@ -15,17 +15,67 @@ Usage:
 
    * Export as Snappy-compressed Parquet
    parquet_path = export_dataframe(df, output_dir, "my_dataset", file_format="parquet")
+
+   * Export with a layout readers can prune (sorted, zstd, row group statistics, page index)
+   parquet_path = export_dataframe(df, output_dir, "my_dataset", file_format="parquet", **QUERY_PARQUET_LAYOUT)
+
+   * Hive partitioned dataset directory (one folder per top-level unspsc category)
+   df = add_unspsc_segment(df)
+   dataset_path = export_dataframe(df, output_dir, "my_dataset", file_format="parquet",
+                                   partition_cols=[UNSPSC_SEGMENT_COLUMN], **QUERY_PARQUET_LAYOUT)
 """
 
 import pandas as pd
+import pyarrow.parquet as pq
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+UNSPSC_SEGMENT_COLUMN = 'unspsc_segment'
+
+# Layout of the final dataset for readers filtering by category / title:
+# sorted rows give tight min/max statistics per row group and page, so filters skip most of the file
+QUERY_PARQUET_LAYOUT: Dict[str, Any] = {
+    'sort_by': ['unspsc', 'product_title'],
+    'row_group_size': 10_000,
+    'compression': 'zstd',
+    'write_page_index': True,
+}
+
+
+def add_unspsc_segment(df: pd.DataFrame, source_column: str = 'unspsc') -> pd.DataFrame:
+    """
+    Add the unspsc category a row is partitioned by as a partition column
+
+    The unspsc column holds category names, not UNSPSC codes, so there is no code
+    hierarchy to take the segment from. A row with several " | " joined categories
+    is put in the alphabetically first one: the same set of categories always lands
+    in the same partition, whatever order the source listed them in.
+
+    Args:
+        df: DataFrame with the unspsc column
+        source_column: Column holding the " | " joined categories
+
+    Returns:
+        df: DataFrame with the unspsc_segment column added ('unknown' for missing values)
+    """
+    categories = pd.Series(df[source_column].to_numpy(), dtype='string').str.split(' | ', regex=False).explode().str.strip()
+    categories = categories[categories.notna() & ~categories.isin(['', 'nan'])]
+    segments = categories.groupby(level=0).min().reindex(range(len(df)))
+    df[UNSPSC_SEGMENT_COLUMN] = segments.fillna('unknown').to_numpy(dtype=object)
+    return df
 
 
 def export_dataframe(
         df: pd.DataFrame,
         output_dir: Path,
         filename: str,
-        file_format: str = 'csv'
+        file_format: str = 'csv',
+        compression: Union[str, Dict[str, str]] = 'snappy',
+        row_group_size: Optional[int] = None,
+        use_dictionary: Union[bool, List[str]] = True,
+        sort_by: Optional[List[str]] = None,
+        partition_cols: Optional[List[str]] = None,
+        write_page_index: bool = False
 ) -> Path:
     """
     Export a DataFrame to CSV or Parquet (Snappy) format
@@ -35,9 +85,15 @@ def export_dataframe(
         output_dir: Path object pointing to the output directory
         filename: Name for the output file (without extension)
         file_format: 'csv' or 'parquet' (default: 'csv')
+        compression: Parquet codec, or a codec per column (e.g. {'product_description': 'zstd'})
+        row_group_size: Maximum number of rows per Parquet row group (default: pyarrow's)
+        use_dictionary: Dictionary encode all columns, none, or only the listed columns
+        sort_by: Sort the rows by these columns first (tighter statistics for predicate pushdown)
+        partition_cols: Write a Hive partitioned dataset directory (column=value/ folders) instead of a file
+        write_page_index: Write the Parquet page index (page level min/max statistics)
 
     Returns:
-        Path to the saved file
+        Path to the saved file (or dataset directory)
     """
 
     if not isinstance(output_dir, Path):
@@ -52,8 +108,29 @@ def export_dataframe(
         output_path = output_dir / f"{filename}.csv"
         df.to_csv(output_path, index=False)
     else:
-        output_path = output_dir / f"{filename}.snappy.parquet"
-        df.to_parquet(output_path, compression='snappy')
+        parquet_options: Dict[str, Any] = {'compression': compression, 'use_dictionary': use_dictionary}
+        if row_group_size is not None:
+            parquet_options['row_group_size'] = row_group_size
+        if write_page_index:
+            parquet_options['write_page_index'] = True
+
+        if sort_by:
+            df = df.sort_values(sort_by, kind='stable', na_position='last')
+            # Recorded in the file metadata so readers know the order
+            parquet_options['sorting_columns'] = [
+                pq.SortingColumn(df.columns.get_loc(col), nulls_first=False) for col in sort_by
+            ]
+
+        if partition_cols:
+            output_path = output_dir / filename
+            # Partition columns leave the files, the column positions of sorting_columns would not match
+            parquet_options.pop('sorting_columns', None)
+            df.to_parquet(output_path, partition_cols=partition_cols, existing_data_behavior='delete_matching',
+                          **parquet_options)
+        else:
+            suffix = compression if isinstance(compression, str) else 'mixed'
+            output_path = output_dir / f"{filename}.{suffix}.parquet"
+            df.to_parquet(output_path, **parquet_options)
 
     print(f"Exported data to: {output_path}")
     return output_path
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Parquet Scan Benchmark
+-----------------------
+Measures how fast selective queries (a single unspsc category, a product_title prefix)
+scan the final dataset written with different Parquet layouts.
+
+The same DataFrame is exported with the default layout (export_dataframe defaults),
+with QUERY_PARQUET_LAYOUT and as a Hive partitioned dataset. Every query is then
+run against each layout with pyarrow.dataset filters, so row groups (and partitions)
+whose statistics exclude the filter value are skipped.
+
+Usage:
+   from tools.scan_benchmark import benchmark_layouts
+
+   * Benchmark the final dataset (writes the layouts to a temporary directory)
+   results = benchmark_layouts(pd.read_parquet(latest_final_dataset()))
+
+   * From the command line (default: the final data main() wrote last, in any layout)
+   python -m tools.scan_benchmark [path/to/final_data.snappy.parquet]
+"""
+
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow.dataset as ds
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.path import DataPaths
+from tools.save_data import export_dataframe, add_unspsc_segment, QUERY_PARQUET_LAYOUT, UNSPSC_SEGMENT_COLUMN
+
+
+def latest_final_dataset() -> Path:
+    """
+    Final data written last by main(), whatever its parquet_layout (see the DataPaths final paths).
+
+    Raises:
+        FileNotFoundError: If main() has not written the final data yet
+    """
+    candidates = [DataPaths.file_parquet_final, DataPaths.file_parquet_final_query]
+    if DataPaths.dir_parquet_final_partitioned.is_dir() and any(DataPaths.dir_parquet_final_partitioned.rglob('*.parquet')):
+        candidates.append(DataPaths.dir_parquet_final_partitioned)
+
+    existing = [path for path in candidates if path.exists()]
+    if not existing:
+        raise FileNotFoundError(f"No final data in {DataPaths.parquet_final_dir}, run main() first")
+    return max(existing, key=lambda path: path.stat().st_mtime)
+
+
+def _path_size(path: Path) -> int:
+    """Size in bytes of a file, or of all files below a directory."""
+    if path.is_dir():
+        return sum(file.stat().st_size for file in path.rglob('*') if file.is_file())
+    return path.stat().st_size
+
+
+def _open_dataset(path: Path) -> ds.Dataset:
+    """Open a single Parquet file or a Hive partitioned directory."""
+    if path.is_dir():
+        return ds.dataset(path, format='parquet', partitioning='hive')
+    return ds.dataset(path, format='parquet')
+
+
+def _row_groups_read(dataset: ds.Dataset, filter_expression: ds.Expression) -> Tuple[int, int]:
+    """Number of row groups left after partition and statistics pruning, and the total number."""
+    total = sum(fragment.num_row_groups for fragment in dataset.get_fragments())
+    read = sum(
+        len(fragment.split_by_row_group(filter_expression))
+        for fragment in dataset.get_fragments(filter=filter_expression)
+    )
+    return read, total
+
+
+def selective_queries(df: pd.DataFrame, n_categories: int = 3) -> List[Tuple[str, ds.Expression]]:
+    """
+    Build selective queries from the data: the most common, a median and a rare unspsc category,
+    and a product_title prefix range.
+
+    Returns:
+        List of (query description, filter expression)
+    """
+    counts = df['unspsc'].dropna().astype(str)
+    counts = counts[counts != ''].value_counts()
+    picks = sorted({0, len(counts) // 2, len(counts) - 1})[:n_categories] if len(counts) else []
+
+    queries: List[Tuple[str, ds.Expression]] = [
+        (f"unspsc == {counts.index[i]!r} ({counts.iloc[i]:,} rows)", ds.field('unspsc') == counts.index[i])
+        for i in picks
+    ]
+
+    titles = df['product_title'].dropna().astype(str)
+    if len(titles):
+        prefix = titles.sort_values().iloc[len(titles) // 2][:2]
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else prefix
+        queries.append((
+            f"product_title starts with {prefix!r}",
+            (ds.field('product_title') >= prefix) & (ds.field('product_title') < upper)
+        ))
+    return queries
+
+
+def benchmark_layouts(
+        df: pd.DataFrame,
+        output_dir: Optional[Path] = None,
+        repeat: int = 3,
+        columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Write df with every layout and time the selective queries against each one.
+
+    Args:
+        df: Final (deduplicated) DataFrame
+        output_dir: Where the layouts are written (default: a temporary directory)
+        repeat: Number of runs per query, the fastest one is reported
+        columns: Columns read by the queries (default: product_title, unspsc, root_domain)
+
+    Returns:
+        DataFrame with one row per (layout, query): scan time, rows matched, row groups read
+    """
+    output_dir = Path(output_dir or tempfile.mkdtemp())
+    columns = columns or ['product_title', 'unspsc', 'root_domain']
+
+    layouts: Dict[str, Path] = {
+        'default': export_dataframe(df, output_dir, 'default', file_format='parquet'),
+        'query': export_dataframe(df, output_dir, 'query', file_format='parquet', **QUERY_PARQUET_LAYOUT),
+    }
+    if UNSPSC_SEGMENT_COLUMN not in df.columns:
+        df = add_unspsc_segment(df.copy())
+    layouts['partitioned'] = export_dataframe(
+        df, output_dir, 'partitioned', file_format='parquet', partition_cols=[UNSPSC_SEGMENT_COLUMN], **QUERY_PARQUET_LAYOUT
+    )
+
+    queries = selective_queries(df)
+    results: List[Dict[str, Any]] = []
+
+    for layout, path in layouts.items():
+        dataset = _open_dataset(path)
+        for description, filter_expression in queries:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                table = dataset.to_table(columns=columns, filter=filter_expression)
+                timings.append(time.perf_counter() - start)
+
+            row_groups_read, row_groups_total = _row_groups_read(dataset, filter_expression)
+            results.append({
+                'layout': layout,
+                'query': description,
+                'scan_ms': min(timings) * 1000,
+                'rows': table.num_rows,
+                'row_groups_read': f"{row_groups_read}/{row_groups_total}",
+                'size_mb': _path_size(path) / 2 ** 20,
+            })
+
+    results_df = pd.DataFrame(results)
+    with pd.option_context('display.width', 200, 'display.max_colwidth', 60):
+        print(results_df.to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+    return results_df
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else latest_final_dataset()
+    # A partitioned dataset reads its partition column back, benchmark_layouts adds it again
+    benchmark_layouts(pd.read_parquet(source).drop(columns=[UNSPSC_SEGMENT_COLUMN], errors='ignore'))